@@ -4,8 +4,183 @@
 """
 RPN Console Program
 
+Without arguments, starts the interactive shell.
+
+Script:
+    python3 -m rpn script.rpn
+
+Batch mode:
+    python3 -m rpn --csv data.csv --expr "price qty * fee -" --out out.csv
+    python3 -m rpn --csv data.csv --expr "price qty * fee -" --format npy --out out.npy
+
+Streaming mode, one expression per line of standard input:
+    python3 -m rpn --stream --format raw < expressions.txt > results.bin
+
+Cluster worker:
+    python3 -m rpn --worker 0.0.0.0:7100 --credits 4
 """
 
-from src._cmd import RpnShell
+import sys
+import time
+import argparse
+
+# Support both `python3 -m rpn` and `python3 ./rpn`.
+try:
+    from .src._cluster import serve
+    from .src._cmd import RpnShell
+    from .src._csvio import evaluate_csv
+    from .src._rpn import Rpn
+    from .src._sinks import FORMATS, open_sink
+    from .src._script import ScriptError, source
+except ImportError:
+    from src._cluster import serve
+    from src._cmd import RpnShell
+    from src._csvio import evaluate_csv
+    from src._rpn import Rpn
+    from src._sinks import FORMATS, open_sink
+    from src._script import ScriptError, source
+
+
+def run_csv(args) -> int:
+    rpn = Rpn()
+    analysis = rpn.analyze(args.expr)
+    if not analysis.valid:
+        print(analysis.message, file = sys.stderr)
+        return 1
+    program = rpn.compile(args.expr)
+
+    fmt = args.format or "csv"
+    try:
+        dst = open_output(args.out, fmt)
+    except OSError as e:
+        print(e, file = sys.stderr)
+        return 1
+    try:
+        sink = open_sink(fmt, dst) if fmt != "csv" else None
+        with open(args.csv, newline = "") as src:
+            n_rows, seconds = evaluate_csv(program, src, dst, args.chunk_rows, sink = sink)
+        if sink is not None:
+            sink.close()
+    except (OSError, ValueError) as e:
+        print(e, file = sys.stderr)
+        return 1
+    finally:
+        close_output(dst)
+
+    report(n_rows, seconds)
+    return 0
+
+
+def run_stream(args) -> int:
+    rpn = Rpn()
+    fmt = args.format or "ndjson"
+    if fmt == "csv":
+        print("Streaming mode writes raw, npy or ndjson.", file = sys.stderr)
+        return 1
+    start = time.perf_counter()
+    n_rows = 0
+    try:
+        dst = open_output(args.out, fmt)
+    except OSError as e:
+        print(e, file = sys.stderr)
+        return 1
+    try:
+        with open_sink(fmt, dst) as sink:
+            for line in sys.stdin:
+                if not line.strip():
+                    continue
+                try:
+                    code, msg, value = rpn.compile(line).run()
+                except ValueError as e:
+                    code, msg, value = 1, str(e), None
+                sink.write(code, value, msg)
+                n_rows += 1
+    except (OSError, ValueError) as e:
+        print(e, file = sys.stderr)
+        return 1
+    finally:
+        close_output(dst)
+
+    report(n_rows, time.perf_counter() - start)
+    return 0
+
+
+def open_output(path: str, fmt: str):
+    """Open output file, or standard output, in binary mode for the
+    binary formats.
+    """
+    binary = fmt in ("raw", "npy")
+    if fmt == "npy" and not path:
+        raise OSError("The npy format needs an --out file.")
+    if path:
+        return open(path, "wb") if binary else open(path, "w", newline = "")
+    return sys.stdout.buffer if binary else sys.stdout
+
+
+def close_output(dst) -> None:
+    if dst is sys.stdout or dst is sys.stdout.buffer:
+        dst.flush()
+    else:
+        dst.close()
+
+
+def report(n_rows: int, seconds: float) -> None:
+    rate = n_rows / seconds if seconds > 0 else float("inf")
+    print(f"{n_rows} rows in {seconds:.3f}s ({rate:,.0f} rows/s)", file = sys.stderr)
+
+
+def run_script(path: str) -> int:
+    try:
+        source(path, Rpn(), sys.stdout)
+    except (OSError, ScriptError) as e:
+        print(f"{path}: {e}", file = sys.stderr)
+        return 1
+    return 0
+
+
+def run_worker(args) -> int:
+    host, _, port = args.worker.rpartition(":")
+    try:
+        serve(host or "127.0.0.1", int(port), args.credits,
+              ready = lambda address: print(f"Worker listening on {address[0]}:{address[1]}", file = sys.stderr))
+    except (OSError, ValueError) as e:
+        print(e, file = sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(prog = "rpn", description = "Reverse Polish Notation calculator.")
+    parser.add_argument("script", nargs = "?", help = "Script to run instead of starting the shell.")
+    parser.add_argument("--csv", help = "Evaluate EXPR for every row of this CSV file.")
+    parser.add_argument("--expr", help = "Expression; variables are bound to CSV columns by header.")
+    parser.add_argument("--out", help = "Output CSV file.  Defaults to standard output.")
+    parser.add_argument("--chunk-rows", type = int, default = 1 << 14, help = "Rows evaluated at a time.")
+    parser.add_argument("--format", choices = ("csv",) + tuple(FORMATS),
+                        help = "Output format.  Defaults to csv in batch mode and ndjson in streaming mode.")
+    parser.add_argument("--stream", action = "store_true", help = "Evaluate one expression per line of standard input.")
+    parser.add_argument("--worker", metavar = "HOST:PORT", help = "Serve as a cluster worker on this address.")
+    parser.add_argument("--credits", type = int, default = 4, help = "Shards a coordinator may have in flight on the worker.")
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        if not args.expr:
+            parser.error("--csv requires --expr")
+        return run_csv(args)
+    if args.stream:
+        return run_stream(args)
+    if args.worker:
+        if args.credits < 1:
+            parser.error("--credits must be at least 1")
+        return run_worker(args)
+    if args.script:
+        return run_script(args.script)
+
+    RpnShell().cmdloop()
+    return 0
+
 
-RpnShell().cmdloop()
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Approximate transcendental operators against `math` and NumPy.
+
+Usage:
+    python3 -m rpn.bench.bench_approx [--size N] [--table N] [--repeat N]
+"""
+
+import math
+import time
+import random
+import argparse
+
+from rpn.src import _approx, _vector
+
+REFERENCE = {
+    "sin": (math.sin, "sin", -100.0, 100.0),
+    "cos": (math.cos, "cos", -100.0, 100.0),
+    "tanh": (math.tanh, "tanh", -5.0, 5.0),
+    "acos": (math.acos, "arccos", -1.0, 1.0),
+    "e": (math.exp, "exp", -50.0, 50.0),
+}
+
+
+def best_of(fn, repeat: int) -> float:
+    _best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        _best = min(_best, time.perf_counter() - start)
+    return _best
+
+
+def main(argv = None) -> None:
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type = int, default = 1_000_000)
+    parser.add_argument("--table", type = int, default = 4096)
+    parser.add_argument("--repeat", type = int, default = 5)
+    args = parser.parse_args(argv)
+
+    s = _approx.approx_set(args.table)
+    rng = random.Random(0)
+    np = _vector.np
+    print(f"table size {args.table}, {args.size:,} values")
+    for alias, (fn, np_name, lo, hi) in REFERENCE.items():
+        values = [rng.uniform(lo, hi) for _ in range(args.size)]
+        approx = getattr(s, alias)
+        t_math = best_of(lambda: list(map(fn, values)), args.repeat)
+        t_scalar = best_of(lambda: list(map(approx, values)), args.repeat)
+        _line = f"  {alias:<5} bound {s.bounds[alias]:.1e}  scalar: {t_math / t_scalar:5.2f}x"
+        if np is not None:
+            x = np.array(values)
+            t_np = best_of(lambda: getattr(np, np_name)(x), args.repeat)
+            t_vec = best_of(lambda: approx(x), args.repeat)
+            _line += f"  numpy: {t_np / t_vec:5.2f}x  ({args.size / t_vec / 1e6:,.0f} M values/s)"
+        print(_line)
+
+
+if __name__ == "__main__":
+    main()
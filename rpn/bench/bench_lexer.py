@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Lexer throughput on one very long line, in MB/s.
+
+Usage:
+    python3 -m rpn.bench.bench_lexer [--mb N] [--repeat N]
+"""
+
+import time
+import argparse
+import tracemalloc
+from collections import deque
+
+from rpn.src._rpn import Rpn
+from rpn.src._lexer import lex
+from rpn.src._cmd import parse_arg
+
+CHUNK = b"1.5 + 3.25 * 4 - 0.5 / "
+
+
+def best_of(fn, repeat: int) -> float:
+    _best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        _best = min(_best, time.perf_counter() - start)
+    return _best
+
+
+def peak_mb(fn) -> float:
+    tracemalloc.start()
+    fn()
+    _peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return _peak / 1e6
+
+
+def main(argv = None) -> None:
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--mb", type = int, default = 64)
+    parser.add_argument("--repeat", type = int, default = 3)
+    args = parser.parse_args(argv)
+
+    rpn = Rpn()
+    # Operators keep the stack at depth two, so memory use is all lexing.
+    data = b"0 " + CHUNK * (args.mb * 1_000_000 // len(CHUNK))
+    text = data.decode()
+    size = len(data) / 1e6
+    print(f"one line of {size:,.0f} MB")
+
+    cases = {
+        "parse_arg (str)": lambda: parse_arg(text, rpn),
+        "lex (bytes)": lambda: deque(lex(data, rpn.registry), maxlen = 0),
+        "evaluate_stream": lambda: rpn.evaluate_stream(data),
+    }
+    for name, fn in cases.items():
+        _seconds = best_of(fn, args.repeat)
+        print(f"  {name:<16} {size / _seconds:>7.1f} MB/s  peak {peak_mb(fn):>8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+numexpr backend against the NumPy ufunc path.
+
+Usage:
+    python3 -m rpn.bench.bench_numexpr [--size N] [--repeat N]
+"""
+
+import time
+import argparse
+
+from rpn.src._rpn import Rpn
+from rpn.src import _numexpr, _vector
+
+EXPRESSION = "x y * 2 ^ x 1 + / y sin +"
+
+
+def best_of(fn, repeat: int) -> float:
+    _best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        _best = min(_best, time.perf_counter() - start)
+    return _best
+
+
+def main(argv = None) -> None:
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type = int, default = 10_000_000)
+    parser.add_argument("--repeat", type = int, default = 5)
+    args = parser.parse_args(argv)
+
+    np = _vector.np
+    if np is None:
+        print("NumPy is not installed; skipping.")
+        return
+
+    rng = np.random.default_rng(0)
+    bindings = {"x": rng.random(args.size), "y": rng.random(args.size)}
+    program = Rpn().compile(EXPRESSION)
+    print(f"{EXPRESSION!r} over {args.size:,} rows")
+    print(f"numexpr: {_numexpr.to_numexpr(program)}")
+
+    t_numpy = best_of(lambda: _numexpr.evaluate(program, bindings, "numpy"), args.repeat)
+    print(f"  numpy:   {t_numpy * 1e3:>9.1f} ms  ({args.size / t_numpy / 1e6:,.1f} M rows/s)")
+
+    if _numexpr.numexpr is None:
+        print("  numexpr: not installed")
+        return
+    t_ne = best_of(lambda: _numexpr.evaluate(program, bindings, "numexpr"), args.repeat)
+    print(f"  numexpr: {t_ne * 1e3:>9.1f} ms  ({args.size / t_ne / 1e6:,.1f} M rows/s, {t_numpy / t_ne:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
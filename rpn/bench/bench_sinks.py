@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Result output throughput, in million results per second.
+
+Usage:
+    python3 -m rpn.bench.bench_sinks [--rows N] [--repeat N]
+"""
+
+import io
+import csv
+import random
+import time
+import argparse
+
+from rpn.src._sinks import open_sink
+
+
+def best_of(fn, repeat: int) -> float:
+    _best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        _best = min(_best, time.perf_counter() - start)
+    return _best
+
+
+def write_csv(values: list) -> None:
+    csv.writer(io.StringIO()).writerows([v] for v in values)
+
+
+def write_print(values: list) -> None:
+    out = io.StringIO()
+    for v in values:
+        print(f"Result: {v}", file = out)
+
+
+def reparse_csv(values: list) -> None:
+    f = io.StringIO()
+    csv.writer(f).writerows([v] for v in values)
+    f.seek(0)
+    [float(row[0]) for row in csv.reader(f)]
+
+
+def write_sink(fmt: str, values: list, codes: list, many: bool) -> None:
+    with open_sink(fmt, io.StringIO() if fmt == "ndjson" else io.BytesIO()) as sink:
+        if many:
+            sink.write_many(codes, values)
+        else:
+            for c, v in zip(codes, values):
+                sink.write(c, v)
+
+
+def main(argv = None) -> None:
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type = int, default = 1_000_000)
+    parser.add_argument("--repeat", type = int, default = 3)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    values = [rng.uniform(-1e6, 1e6) for _ in range(args.rows)]
+    codes = [0] * args.rows
+    print(f"{args.rows:,} results")
+
+    cases = {
+        "print": lambda: write_print(values),
+        "csv": lambda: write_csv(values),
+        "csv + re-parse": lambda: reparse_csv(values),
+        "ndjson": lambda: write_sink("ndjson", values, codes, False),
+        "raw": lambda: write_sink("raw", values, codes, False),
+        "raw write_many": lambda: write_sink("raw", values, codes, True),
+        "npy write_many": lambda: write_sink("npy", values, codes, True),
+    }
+    for name, fn in cases.items():
+        _seconds = best_of(fn, args.repeat)
+        print(f"  {name:<16} {args.rows / _seconds / 1e6:>7.2f} M/s")
+
+
+if __name__ == "__main__":
+    main()
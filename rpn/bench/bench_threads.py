@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Thread scaling benchmark.
+
+Each task evaluates an expression on its own `Rpn` instance.  Throughput
+only scales with threads on a free-threaded CPython build (3.13t+); on a
+regular build the GIL serializes evaluation and this doubles as a stress
+test for shared state.
+
+Usage:
+    python3 -m rpn.bench.bench_threads [--tasks N] [--threads 1,2,4,8]
+"""
+
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from rpn.src._rpn import Rpn
+
+EXPRESSION = "5 1 2 + 4 * + 3 - 2 ^ 7 / 1 +".split()
+EXPECTED = 29.0
+
+
+def work(n_evals: int) -> int:
+    """Evaluate EXPRESSION n_evals times on a fresh instance and
+    return the number of wrong results.
+    """
+    rpn = Rpn()
+    # Custom operator per instance, to exercise registry updates.
+    rpn.add_expression("hyp", lambda a, b: (a * a + b * b) ** 0.5)
+    _wrong = 0
+    for _ in range(n_evals):
+        rpn.evaluate(EXPRESSION)
+        if rpn.stack.head != EXPECTED:
+            _wrong += 1
+    return _wrong
+
+
+def run(threads: int, tasks: int, evals: int) -> float:
+    """Run tasks on a pool of given size and return evaluations per second.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = threads) as pool:
+        _wrong = sum(pool.map(work, [evals] * tasks))
+    elapsed = time.perf_counter() - start
+    if _wrong:
+        raise AssertionError(f"{_wrong} wrong results with {threads} threads.")
+    return tasks * evals / elapsed
+
+
+def main(argv = None) -> None:
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type = int, default = 32)
+    parser.add_argument("--evals", type = int, default = 2000)
+    parser.add_argument("--threads", default = "1,2,4,8")
+    args = parser.parse_args(argv)
+
+    _gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if _gil else 'disabled'}")
+
+    base = None
+    for n in map(int, args.threads.split(",")):
+        rate = run(n, args.tasks, args.evals)
+        base = base or rate
+        print(f"{n:>3} threads: {rate:>12,.0f} evals/s  ({rate / base:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Static validation of expressions.
+
+One pass over the tokens tracks how many values the stack holds, using
+each operator's arity, so malformed expressions are rejected before any
+arithmetic runs.  A reduction (`ARITY_ALL`) may leave anywhere from one
+value to as many as it received, so the depth is tracked as a range and
+only operators that cannot have enough values are errors.
+"""
+
+__all__ = [
+    "Analysis",
+    "analyze",
+    ]
+
+from typing import NamedTuple
+
+from ._rpn import ARITY_ALL, ComparisonMixin, Registry
+from . import _vector
+
+
+class Analysis(NamedTuple):
+    valid: bool
+    # Position of the first invalid token, or None.
+    position: int
+    message: str
+    # Variables in order of first use.
+    variables: tuple
+    # Most values on the stack at any one time.
+    max_depth: int
+    # Fewest and most values left on the stack.
+    depth: tuple
+
+
+def analyze(tokens, registry: Registry) -> Analysis:
+    """Check tokens without executing them.
+
+    Parameters
+    ----------
+    tokens : StrList
+        Expression tokens.  Identifiers that are not operators are
+        variables, as in `Program`.
+    registry : Registry
+        Operators to resolve tokens against.
+
+    Returns
+    -------
+    Analysis
+        An operator short of values, including one applied to a lone
+        value, makes the expression invalid at its position.
+    """
+    _variables = {}
+    lo = hi = max_depth = 0
+    aliases, index, expressions = registry.aliases, registry.index, registry.expressions
+    is_number = ComparisonMixin.is_number
+
+    for i, t in enumerate(tokens):
+        if t in aliases:
+            arity = expressions[index(t)].arity
+            need = 1 if arity == ARITY_ALL else arity
+            if hi < need:
+                return Analysis(False, i, "Not enough values to perform operation.",
+                                tuple(_variables), max_depth, (lo, hi))
+            if arity == ARITY_ALL:
+                lo = 1
+            else:
+                lo, hi = max(lo - arity, 0) + 1, hi - arity + 1
+            continue
+
+        if is_number(t):
+            pass
+        elif _vector.is_literal(t):
+            try:
+                _vector.parse(t)
+            except ValueError as e:
+                return Analysis(False, i, str(e), tuple(_variables), max_depth, (lo, hi))
+        elif t.isidentifier():
+            _variables.setdefault(t, None)
+        else:
+            return Analysis(False, i, f"Invalid token {t!r} at position {i}.",
+                            tuple(_variables), max_depth, (lo, hi))
+        lo, hi = lo + 1, hi + 1
+        max_depth = max(max_depth, hi)
+
+    return Analysis(True, None, "", tuple(_variables), max_depth, (lo, hi))
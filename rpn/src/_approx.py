@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Approximate transcendental operators.
+
+Each function is reduced to a short interval and read from a table of
+samples with linear interpolation.  With NumPy, a whole vector operand
+is handled by a few array passes.  Linear interpolation on a grid of
+step h is off by at most h^2 / 8 times the largest second derivative,
+so every function has a documented bound that shrinks four-fold each
+time the table size doubles.  Bounds hold for inputs of magnitude up to
+1e6, beyond which range reduction itself loses accuracy:
+
+    sin, cos    absolute error   (2 pi / size)^2 / 8
+    tanh        absolute error   (10 / size)^2 / 8 * 0.77, at least 4.2e-9
+    acos        absolute error   (1 / size)^2 / 8 * 2
+    e           relative error   (ln 2 / size)^2 / 8 * sqrt(2)
+    log         absolute error   (0.5 / size)^2 / 8 * 4 on ln(n) and ln(base),
+                plus rounding of a few ulp of ln(n)
+
+`ApproxSet.bounds` holds these values, plus a little rounding slack,
+for a given table size.
+
+The set is off by default: CPython's `math` calls and NumPy's
+vectorized ufuncs are hard to beat from Python, so measure with
+`rpn/bench/bench_approx.py` on the target machine before enabling it.
+"""
+
+__all__ = [
+    "ApproxSet",
+    "approx_set",
+    ]
+
+import math
+from functools import lru_cache
+
+from . import _vector
+
+LN2 = math.log(2)
+# tanh(x) is taken as +/-1 beyond this point.
+TANH_LIMIT = 10.0
+# Slack for rounding in reduction and interpolation.
+ROUNDING = 1e-15
+
+
+class Table:
+    """Samples of a function on a uniform grid over [lo, hi].
+
+    Parameters
+    ----------
+    fn : FuncReturnNum
+        Function to sample.
+    lo : float
+        Start of the grid.
+    hi : float
+        End of the grid.
+    size : int
+        Number of grid intervals.  Periodic tables need a power of two.
+    periodic : bool
+        Whether the function repeats with period hi - lo, in which case
+        any input is accepted.  Otherwise inputs must lie within [lo, hi].
+    """
+    __slots__ = ("lo", "scale", "size", "periodic", "values", "slopes", "np_values", "np_slopes")
+
+    def __init__(self, fn, lo: float, hi: float, size: int, periodic: bool = False) -> None:
+        self.lo = lo
+        self.scale = size / (hi - lo)
+        self.size = size
+        self.periodic = periodic
+        self.values = [fn(lo + (hi - lo) * i / size) for i in range(size + 1)]
+        self.slopes = [self.values[i + 1] - self.values[i] for i in range(size)] + [0.0]
+        if _vector.np is not None:
+            self.np_values = _vector.np.array(self.values)
+            self.np_slopes = _vector.np.array(self.slopes)
+
+    def __call__(self, x: float) -> float:
+        u = (x - self.lo) * self.scale
+        if self.periodic:
+            i = math.floor(u)
+            t = u - i
+            i &= self.size - 1
+        else:
+            # Rounding may put u just outside [0, size]; a negative index
+            # would wrap around to the other end of the table.
+            i = max(0, min(math.floor(u), self.size))
+            t = u - i
+        return self.values[i] + t * self.slopes[i]
+
+    def array(self, x):
+        """Interpolate every element of a NumPy array.
+        """
+        np = _vector.np
+        u = (x - self.lo) * self.scale
+        if self.periodic:
+            i = np.floor(u)
+            t = u - i
+            i = i.astype(np.intp) & (self.size - 1)
+        else:
+            i = np.clip(np.floor(u), 0, self.size)
+            t = u - i
+            i = i.astype(np.intp)
+        return self.np_values[i] + t * self.np_slopes[i]
+
+
+def _is_array(x) -> bool:
+    return _vector.np is not None and isinstance(x, _vector.np.ndarray)
+
+
+class ApproxSet:
+    """Table-driven versions of `sin`, `cos`, `tanh`, `acos`, `e` and `log`.
+
+    Functions take a scalar or a vector operand, and raise the same
+    errors as `math` for scalars outside their domain.  NumPy arrays get
+    NaN there instead, like the NumPy functions they replace.
+
+    Parameters
+    ----------
+    size : int
+        Number of intervals per table, a power of two.  Memory use is
+        about 100 bytes per interval over all tables.
+
+    Attributes
+    ----------
+    bounds : dict
+        Maximum error by operator alias, see module docstring.
+    """
+    def __init__(self, size: int = 4096) -> None:
+        if size < 4 or size & (size - 1):
+            raise ValueError("Table size must be a power of two of at least 4.")
+        self.size = size
+        self._expressions = None
+        self._sin = Table(math.sin, 0.0, 2 * math.pi, size, periodic = True)
+        self._cos = Table(math.cos, 0.0, 2 * math.pi, size, periodic = True)
+        self._tanh = Table(math.tanh, 0.0, TANH_LIMIT, size)
+        # acos(x) = g(sqrt(1 - x)) for x >= 0, with g smooth on [0, 1].
+        self._acos = Table(lambda s: math.acos(1 - s * s), 0.0, 1.0, size)
+        self._exp = Table(math.exp, -LN2 / 2, LN2 / 2, size)
+        self._ln = Table(math.log, 0.5, 1.0, size)
+
+        self.bounds = {
+            "sin": (2 * math.pi / size) ** 2 / 8 + ROUNDING,
+            "cos": (2 * math.pi / size) ** 2 / 8 + ROUNDING,
+            "tanh": max((TANH_LIMIT / size) ** 2 / 8 * 0.7699, 1 - math.tanh(TANH_LIMIT)) + ROUNDING,
+            "acos": (1 / size) ** 2 / 8 * 2 + 4 * ROUNDING,
+            "e": (LN2 / size) ** 2 / 8 * math.sqrt(2) + ROUNDING,
+            "log": (0.5 / size) ** 2 / 8 * 4 + ROUNDING,
+        }
+
+    @staticmethod
+    def _periodic(table: Table, n: float) -> float:
+        if math.isfinite(n):
+            return table(n)
+        if n != n:
+            return n
+        raise ValueError("math domain error")
+
+    @staticmethod
+    def _periodic_array(table: Table, n):
+        np = _vector.np
+        _finite = np.isfinite(n)
+        return np.where(_finite, table.array(np.where(_finite, n, 0.0)), np.nan)
+
+    def sin(self, n):
+        if type(n) in _vector.SCALARS:
+            return self._periodic(self._sin, n)
+        if _is_array(n):
+            return self._periodic_array(self._sin, n)
+        return _vector._elementwise(lambda v: self._periodic(self._sin, v), n)
+
+    def cos(self, n):
+        if type(n) in _vector.SCALARS:
+            return self._periodic(self._cos, n)
+        if _is_array(n):
+            return self._periodic_array(self._cos, n)
+        return _vector._elementwise(lambda v: self._periodic(self._cos, v), n)
+
+    def _tanh_scalar(self, n: float) -> float:
+        if n != n:
+            return n
+        if abs(n) >= TANH_LIMIT:
+            return math.copysign(1.0, n)
+        return math.copysign(self._tanh(abs(n)), n)
+
+    def tanh(self, n):
+        if type(n) in _vector.SCALARS:
+            return self._tanh_scalar(n)
+        if _is_array(n):
+            np = _vector.np
+            _abs = np.abs(n)
+            # fmin maps NaN to the limit, keeping table indices in range.
+            _result = np.where(_abs >= TANH_LIMIT, 1.0, self._tanh.array(np.fmin(_abs, TANH_LIMIT)))
+            return np.where(np.isnan(n), n, np.copysign(_result, n))
+        return _vector._elementwise(self._tanh_scalar, n)
+
+    def _acos_scalar(self, n: float) -> float:
+        if n != n:
+            return n
+        if not -1.0 <= n <= 1.0:
+            raise ValueError("math domain error")
+        if n >= 0:
+            return self._acos(math.sqrt(1.0 - n))
+        return math.pi - self._acos(math.sqrt(1.0 + n))
+
+    def acos(self, n):
+        if type(n) in _vector.SCALARS:
+            return self._acos_scalar(n)
+        if _is_array(n):
+            np = _vector.np
+            with np.errstate(invalid = "ignore"):
+                _valid = np.abs(n) <= 1.0
+                _g = self._acos.array(np.sqrt(1.0 - np.where(_valid, np.abs(n), 0.0)))
+                return np.where(_valid, np.where(n >= 0, _g, math.pi - _g), np.nan)
+        return _vector._elementwise(self._acos_scalar, n)
+
+    def _exp_scalar(self, n: float) -> float:
+        if n != n:
+            return n
+        # Beyond these, math.exp overflows or underflows anyway.
+        if n > 710.0:
+            if math.isinf(n):
+                return n
+            raise OverflowError("math range error")
+        if n < -746.0:
+            return 0.0
+        k = round(n / LN2)
+        return math.ldexp(self._exp(n - k * LN2), k)
+
+    def e(self, n):
+        if type(n) in _vector.SCALARS:
+            return self._exp_scalar(n)
+        if _is_array(n):
+            np = _vector.np
+            with np.errstate(over = "ignore", invalid = "ignore"):
+                _n = np.clip(np.where(np.isnan(n), 0.0, n), -746.0, 710.0)
+                k = np.rint(_n / LN2)
+                return np.where(np.isnan(n), n, np.ldexp(self._exp.array(_n - k * LN2), k.astype(np.int32)))
+        return _vector._elementwise(self._exp_scalar, n)
+
+    def _ln_scalar(self, n: float) -> float:
+        if n <= 0:
+            raise ValueError("math domain error")
+        if math.isinf(n) or n != n:
+            return n
+        m, k = math.frexp(n)
+        return k * LN2 + self._ln(m)
+
+    def _ln_array(self, n):
+        np = _vector.np
+        with np.errstate(invalid = "ignore"):
+            m, k = np.frexp(np.where((n > 0) & np.isfinite(n), n, 1.0))
+            _result = k * LN2 + self._ln.array(m)
+            return np.where(n > 0, np.where(np.isinf(n), n, _result), np.where(n == 0, -np.inf, np.nan))
+
+    def log(self, n, base):
+        if type(n) in _vector.SCALARS and type(base) in _vector.SCALARS:
+            return self._ln_scalar(n) / self._ln_scalar(base)
+        if _vector.np is not None:
+            np = _vector.np
+            with np.errstate(divide = "ignore", invalid = "ignore"):
+                return self._ln_array(np.asarray(n, dtype = float)) / self._ln_array(np.asarray(base, dtype = float))
+        return _vector._elementwise(lambda a, b: self._ln_scalar(a) / self._ln_scalar(b), n, base)
+
+    @property
+    def expressions(self) -> tuple:
+        """Return one expression per approximated operator, built on
+        first use.
+        """
+        if self._expressions is None:
+            self._expressions = self.__build_expressions()
+        return self._expressions
+
+    def __build_expressions(self) -> tuple:
+        # Imported here, as `_rpn` builds on this module.
+        from ._rpn import Expression
+        _fns = {
+            "sin": lambda n: self.sin(n),
+            "cos": lambda n: self.cos(n),
+            "tanh": lambda n: self.tanh(n),
+            "acos": lambda n: self.acos(n),
+            "e": lambda n: self.e(n),
+            "log": lambda n, base: self.log(n, base),
+        }
+        return tuple(Expression(alias, fn, f"~{alias}, error <= {self.bounds[alias]:.1e}", native = True)
+                     for alias, fn in _fns.items())
+
+
+@lru_cache(maxsize = None)
+def approx_set(size: int = 4096) -> ApproxSet:
+    """Return shared `ApproxSet` for table size, building it on first use.
+    """
+    return ApproxSet(size)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Multiprocess batch evaluation with shared-memory results.
+
+Workers write each result straight into a shared float64 array, and its
+return code into a parallel int8 array, at the expression's position.
+Only slice bounds travel back to the parent, so nothing is pickled per
+result and the parent reads both arrays without copying.
+
+State of impure operators, such as the rolling windows of `_rolling`,
+lives in each worker, so results would depend on how the batch is
+sliced.  A batch using any runs in order on a single worker, with the
+same results as evaluating its expressions one after another on one
+`Rpn`.
+"""
+
+__all__ = [
+    "BatchResult",
+    "evaluate_batch",
+    ]
+
+import math
+import os
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+from ._budget import Budget
+from ._rpn import Rpn
+from ._vector import is_operand
+
+# Worker process state, set by `_init_worker`.
+_worker = {}
+
+
+class BatchResult:
+    """Results of `evaluate_batch`, backed by shared memory.
+
+    Use as a context manager, or call `close`, to release the shared
+    memory blocks once done with the views.
+
+    Attributes
+    ----------
+    values : memoryview
+        float64 results, NaN where evaluation failed.
+    status : memoryview
+        int8 return codes, as returned by `Rpn.execute_next` and `_budget`.
+    """
+    def __init__(self, values_shm: SharedMemory, status_shm: SharedMemory, size: int) -> None:
+        self._values_shm = values_shm
+        self._status_shm = status_shm
+        self.size = size
+        self.values = values_shm.buf[:8 * size].cast("d")
+        self.status = status_shm.buf[:size].cast("b")
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __enter__(self) -> "BatchResult":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def as_numpy(self) -> tuple:
+        """Return values and status as NumPy arrays sharing the same memory.
+        """
+        import numpy as np
+        return np.frombuffer(self.values, dtype = np.float64), np.frombuffer(self.status, dtype = np.int8)
+
+    def close(self) -> None:
+        """Release views and free the shared memory blocks.  Any views
+        handed out by `as_numpy` must be dropped first.
+        """
+        if self._values_shm is None:
+            return
+        self.values.release()
+        self.status.release()
+        for shm in (self._values_shm, self._status_shm):
+            shm.close()
+            shm.unlink()
+        self._values_shm = self._status_shm = None
+
+
+def _init_worker(values_name: str, status_name: str, size: int, budget: Budget) -> None:
+    values_shm, status_shm = SharedMemory(values_name), SharedMemory(status_name)
+    _worker.update(
+        rpn = Rpn(),
+        budget = budget,
+        shm = (values_shm, status_shm),
+        values = values_shm.buf[:8 * size].cast("d"),
+        status = status_shm.buf[:size].cast("b"),
+        )
+
+
+def _evaluate_slice(start: int, expressions: list) -> int:
+    rpn, budget = _worker["rpn"], _worker["budget"]
+    values, status = _worker["values"], _worker["status"]
+    for i, expr in enumerate(expressions, start):
+        tokens = expr.split() if isinstance(expr, str) else expr
+        try:
+            code, _ = rpn.evaluate(tokens, budget)
+        except (ArithmeticError, ValueError, TypeError):
+            # One bad expression fails its own slot, not the batch.
+            code = 1
+        value = rpn.stack.head if rpn.stack_size > 0 else math.nan
+        # Vectors do not fit a slot; NumPy scalars do.
+        if code in (0, -1) and is_operand(value):
+            code, value = 1, math.nan
+        values[i] = float(value) if code in (0, -1) else math.nan
+        status[i] = code
+    return len(expressions)
+
+
+def _impure(registry, expressions: list) -> bool:
+    """Return True if any expression uses an impure operator.
+    """
+    _aliases = {e.alias for e in registry.expressions if not e.pure}
+    return any(not _aliases.isdisjoint(expr.split() if isinstance(expr, str) else expr) for expr in expressions)
+
+
+def evaluate_batch(expressions: list, processes: int = None, chunk_size: int = None,
+                   budget: Budget = None) -> BatchResult:
+    """Evaluate expressions on a process pool.
+
+    Batches with impure operators run in order on one worker process,
+    whatever `processes` and `chunk_size` say.
+
+    Parameters
+    ----------
+    expressions : list
+        Expressions as strings or lists of tokens.
+    processes : int
+        Number of worker processes.  Defaults to `os.cpu_count()`.
+    chunk_size : int
+        Number of expressions sent to a worker at a time.
+    budget : Budget
+        Optional resource limits for each expression.
+
+    Returns
+    -------
+    BatchResult
+        Result at the same position as its expression.
+    """
+    size = len(expressions)
+    processes = processes or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(size / (processes * 4)))
+    if _impure(Rpn().registry, expressions):
+        processes, chunk_size = 1, max(1, size)
+
+    # Zero-sized blocks are not allowed.
+    values_shm = SharedMemory(create = True, size = max(8, 8 * size))
+    status_shm = SharedMemory(create = True, size = max(1, size))
+    try:
+        with Pool(processes, _init_worker, (values_shm.name, status_shm.name, size, budget)) as pool:
+            _jobs = [(i, expressions[i:i + chunk_size]) for i in range(0, size, chunk_size)]
+            pool.starmap(_evaluate_slice, _jobs)
+    except BaseException:
+        for shm in (values_shm, status_shm):
+            shm.close()
+            shm.unlink()
+        raise
+    return BatchResult(values_shm, status_shm, size)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Per-evaluation resource budgets.
+
+Exceeding a budget stops evaluation with one of the return codes below,
+in the same (code, message) form returned by `Rpn.execute_next`.
+"""
+
+__all__ = [
+    "Budget",
+    "BUDGET_TOKENS",
+    "BUDGET_DEPTH",
+    "BUDGET_TIME",
+    "BUDGET_MAGNITUDE",
+    "CANCELLED",
+    ]
+
+import time
+
+from ._types import Num
+
+# Return codes, continuing from those of `Rpn.execute_next`.
+BUDGET_TOKENS = 2
+BUDGET_DEPTH = 3
+BUDGET_TIME = 4
+BUDGET_MAGNITUDE = 5
+CANCELLED = 6
+
+
+class Budget:
+    """Limits for a single evaluation.  Limits left as None are not enforced.
+
+    Parameters
+    ----------
+    max_tokens : int
+        Maximum number of tokens to execute.
+    max_depth : int
+        Maximum stack size.
+    max_seconds : float
+        Maximum wall time, in seconds.
+    max_magnitude : Num
+        Maximum absolute value of any result pushed to the stack.
+    check_every : int
+        Number of tokens between wall time and cancellation checks.
+    """
+    def __init__(self, max_tokens: int = None, max_depth: int = None, max_seconds: float = None,
+                 max_magnitude: Num = None, check_every: int = 256) -> None:
+        self.max_tokens = max_tokens
+        self.max_depth = max_depth
+        self.max_seconds = max_seconds
+        self.max_magnitude = max_magnitude
+        self.check_every = max(1, check_every)
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        """Request evaluation to stop at its next check.  Safe to call
+        from another thread.
+        """
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def deadline(self) -> float:
+        """Return `time.perf_counter` value at which time runs out,
+        or None if wall time is not limited.
+        """
+        if self.max_seconds is None:
+            return None
+        return time.perf_counter() + self.max_seconds
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Operator catalog for the `ops` listing.
+
+Column widths are kept as counts of every length in each column, so
+adding or removing an operator updates them in constant time instead
+of rescanning every expression.  Aliases are indexed twice: sorted, for
+prefix lookups with `bisect`, and by trigram, for substring lookups.
+"""
+
+__all__ = [
+    "Catalog",
+    ]
+
+import fnmatch
+import itertools
+from bisect import bisect_left, insort
+from collections import Counter
+
+# Length of the substrings indexed for substring search.
+GRAM = 3
+WILDCARDS = "*?["
+
+
+def _grams(alias: str) -> set:
+    return {alias[i:i + GRAM] for i in range(len(alias) - GRAM + 1)}
+
+
+class Catalog:
+    """Searchable table of expressions with cached column widths.
+
+    Parameters
+    ----------
+    expressions : Iterable[Expression]
+        Expressions in listing order.
+    columns : tuple
+        Column headings, one per item of `Expression.values`.
+    """
+    def __init__(self, expressions = (), columns: tuple = ("Oper", "Args", "Function")) -> None:
+        self.columns = columns
+        # Rows by serial number, which keeps listing order through removals.
+        self.rows = {}
+        self._serial = itertools.count()
+        self._lengths = [Counter() for _ in columns]
+        self._by_alias = {}
+        self._sorted = []
+        self._grams = {}
+        for e in expressions:
+            self.add(e)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, expr) -> None:
+        """Append expression to the catalog.
+        """
+        n = next(self._serial)
+        self.rows[n] = expr
+        for counter, length in zip(self._lengths, expr.lengths):
+            counter[length] += 1
+        _serials = self._by_alias.setdefault(expr.alias, [])
+        if not _serials:
+            insort(self._sorted, expr.alias)
+            for g in _grams(expr.alias):
+                self._grams.setdefault(g, set()).add(expr.alias)
+        _serials.append(n)
+
+    def remove(self, expr) -> None:
+        """Remove first row holding expression.  Unknown ones are ignored.
+        """
+        _serials = self._by_alias.get(expr.alias, [])
+        n = next((s for s in _serials if self.rows[s] is expr), None)
+        if n is None:
+            return
+        del self.rows[n]
+        _serials.remove(n)
+        for counter, length in zip(self._lengths, expr.lengths):
+            counter[length] -= 1
+            if counter[length] == 0:
+                del counter[length]
+        if not _serials:
+            del self._by_alias[expr.alias]
+            del self._sorted[bisect_left(self._sorted, expr.alias)]
+            for g in _grams(expr.alias):
+                self._grams[g].discard(expr.alias)
+
+    def widths(self, padding: float = 1.5) -> list:
+        """Return column widths, as `OperatorsMixin.set_length_data` does.
+        """
+        p = padding if padding < 10.0 else padding / 100
+        return [int(max(max(counter, default = 0), len(c)) * p) for counter, c in zip(self._lengths, self.columns)]
+
+    def __prefixed(self, prefix: str) -> list:
+        _start = bisect_left(self._sorted, prefix)
+        return list(itertools.takewhile(lambda a: a.startswith(prefix), self._sorted[_start:]))
+
+    def __containing(self, part: str) -> set:
+        if len(part) < GRAM:
+            return {a for a in self._sorted if part in a}
+        _sets = sorted((self._grams.get(g, set()) for g in _grams(part)), key = len)
+        return {a for a in _sets[0].intersection(*_sets[1:]) if part in a}
+
+    def aliases(self, pattern: str = None) -> list:
+        """Return sorted aliases matching pattern.
+
+        Parameters
+        ----------
+        pattern : str
+            Glob pattern, such as "log*" or "*cos*".  Without wildcards,
+            aliases containing the pattern match.  None matches all.
+
+        Returns
+        -------
+        list
+        """
+        if not pattern:
+            return list(self._sorted)
+        if not any(w in pattern for w in WILDCARDS):
+            return sorted(self.__containing(pattern))
+
+        # Narrow down with the index, then check the whole pattern.
+        _runs = _literal_runs(pattern)
+        _prefix, _literal = _runs[0], max(_runs, key = len)
+        if _prefix:
+            _candidates = self.__prefixed(_prefix)
+        elif _literal:
+            _candidates = sorted(self.__containing(_literal))
+        else:
+            _candidates = self._sorted
+        return [a for a in _candidates if fnmatch.fnmatchcase(a, pattern)]
+
+    def search(self, pattern: str = None) -> list:
+        """Return expressions whose alias matches pattern, in listing order.
+        """
+        if not pattern:
+            return list(self.rows.values())
+        _serials = sorted(n for a in self.aliases(pattern) for n in self._by_alias[a])
+        return [self.rows[n] for n in _serials]
+
+    def render(self, expressions: list, padding: float = 1.5) -> list:
+        """Return table lines for expressions, headed by column names.
+        """
+        _widths = self.widths(padding)
+        _lines = ["".join(f"{c:<{w}}" for c, w in zip(self.columns, _widths)), "-" * sum(_widths)]
+        _lines.extend("".join(f"{v:<{w}}" for v, w in zip(e.values, _widths)) for e in expressions)
+        return _lines
+
+
+def _literal_runs(pattern: str) -> list:
+    """Return the parts of a glob pattern between wildcards.
+    """
+    _runs, _current, i = [], "", 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c in "*?":
+            _runs.append(_current)
+            _current = ""
+        elif c == "[":
+            _end = pattern.find("]", i + 2)
+            if _end < 0:
+                _current += c
+            else:
+                _runs.append(_current)
+                _current = ""
+                i = _end
+        else:
+            _current += c
+        i += 1
+    _runs.append(_current)
+    return _runs
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Distributed evaluation over TCP.
+
+A `Cluster` coordinator splits a stream of expressions into shards and
+sends them to worker servers, any number per host, started with `serve`,
+`start_workers` or `python -m rpn --worker HOST:PORT`.  Messages are JSON
+objects framed by a 4-byte big-endian length:
+
+    worker -> coordinator   {"op": "hello", "credits": N}
+    coordinator -> worker   {"op": "eval", "shard": id, "items": [[expr, bindings], ...]}
+    worker -> coordinator   {"op": "result", "shard": id, "results": [[code, msg, value], ...]}
+
+Flow control is credit based: a worker grants N credits on connecting,
+the coordinator never has more than N shards in flight on it, and each
+result returns a credit.  Shards in flight on a worker that disconnects,
+or that stops answering within `timeout`, are sent again to the others.
+Results are yielded in input order, holding at most a window of shards.
+
+Workers keep one warm `Rpn` and a cache of compiled programs across
+shards and connections.
+"""
+
+__all__ = [
+    "Cluster",
+    "ClusterError",
+    "LocalWorker",
+    "Worker",
+    "serve",
+    "start_workers",
+    ]
+
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+import multiprocessing
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import NamedTuple
+
+from ._rpn import Rpn
+from . import _vector
+
+FRAME = struct.Struct(">I")
+# Largest frame accepted, guarding against garbage lengths.
+MAX_FRAME = 1 << 26
+DEFAULT_CREDITS = 4
+# Compiled programs kept per worker.
+CACHE_SIZE = 1024
+
+
+class ClusterError(ConnectionError):
+    """Raised when no worker is left, or a shard failed on too many workers.
+    """
+
+
+def _send(sock: socket.socket, message: dict) -> None:
+    _data = json.dumps(message, separators = (",", ":")).encode()
+    sock.sendall(FRAME.pack(len(_data)) + _data)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    _buf = bytearray()
+    while len(_buf) < n:
+        _chunk = sock.recv(n - len(_buf))
+        if not _chunk:
+            return None
+        _buf += _chunk
+    return bytes(_buf)
+
+
+def _recv(sock: socket.socket) -> dict:
+    """Return next message, or None once the peer has closed.
+    """
+    _header = _recv_exact(sock, FRAME.size)
+    if _header is None:
+        return None
+    (n,) = FRAME.unpack(_header)
+    if n > MAX_FRAME:
+        raise ConnectionError(f"Frame of {n} bytes exceeds limit.")
+    _data = _recv_exact(sock, n)
+    if _data is None:
+        return None
+    return json.loads(_data)
+
+
+def _plain(value):
+    """Return value as JSON-serializable floats and lists.
+    """
+    if value is None or type(value) in _vector.SCALARS:
+        return value
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value.tolist()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Worker
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class Worker:
+    """Evaluates shards, reusing one calculator and its compiled programs.
+
+    Parameters
+    ----------
+    cache_size : int
+        Number of compiled programs kept, least recently used dropped first.
+    """
+    def __init__(self, cache_size: int = CACHE_SIZE) -> None:
+        self.rpn = Rpn()
+        self.cache_size = cache_size
+        self.served = 0
+        self._programs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def program(self, expr: str):
+        """Return compiled program for expression, from the cache if seen.
+
+        Raises
+        ------
+        ValueError
+            If the expression has an invalid token.
+        """
+        with self._lock:
+            _program = self._programs.get(expr)
+            if _program is not None:
+                self._programs.move_to_end(expr)
+                return _program
+        _program = self.rpn.compile(expr)
+        with self._lock:
+            self._programs[expr] = _program
+            if len(self._programs) > self.cache_size:
+                self._programs.popitem(last = False)
+        return _program
+
+    def evaluate(self, items: list) -> list:
+        """Return [code, msg, value] for each [expression, bindings] item.
+
+        An item that fails in any way, malformed ones included, gets
+        code 1 and the error, so one bad item never drops the connection.
+        """
+        _results = []
+        for item in items:
+            try:
+                expr, bindings = item
+                _program = self.program(expr)
+                _bindings = {k: v if type(v) in _vector.SCALARS else _vector.as_operand(v) for k, v in bindings.items()}
+                code, msg, value = _program.run(_bindings)
+                _results.append([code, msg, _plain(value)])
+            except Exception as e:
+                _results.append([1, str(e) or type(e).__name__, None])
+        return _results
+
+    def handle(self, conn: socket.socket, credits: int, max_shards: int = None,
+               stop: threading.Event = None) -> None:
+        """Serve one coordinator connection until it closes.
+        """
+        with conn:
+            _send(conn, {"op": "hello", "credits": credits})
+            while stop is None or not stop.is_set():
+                message = _recv(conn)
+                if message is None or message.get("op") != "eval":
+                    break
+                _results = self.evaluate(message["items"])
+                _send(conn, {"op": "result", "shard": message["shard"], "results": _results})
+                with self._lock:
+                    self.served += 1
+                    _done = max_shards is not None and self.served >= max_shards
+                if _done:
+                    if stop is not None:
+                        stop.set()
+                    break
+
+
+def serve(host: str = "127.0.0.1", port: int = 0, credits: int = DEFAULT_CREDITS,
+          max_shards: int = None, ready = None) -> None:
+    """Run worker server, one thread per coordinator connection.
+
+    Parameters
+    ----------
+    host, port : str, int
+        Address to listen on.  Port 0 picks a free port.
+    credits : int
+        Shards a coordinator may have in flight on this worker.
+    max_shards : int
+        Stop after serving this many shards, dropping any still queued,
+        e.g. for rolling restarts.  None serves until interrupted.
+    ready : Callable
+        Called with the (host, port) listened on, once listening.
+
+    Raises
+    ------
+    ValueError
+        If credits is less than 1, as no shard could ever be sent.
+    """
+    if credits < 1:
+        raise ValueError("Credits must be at least 1.")
+    worker = Worker()
+    stop = threading.Event()
+    with socket.create_server((host, port)) as server:
+        server.settimeout(0.2)
+        if ready is not None:
+            ready(server.getsockname()[:2])
+        while not stop.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            conn.settimeout(None)
+            threading.Thread(target = worker.handle, args = (conn, credits, max_shards, stop), daemon = True).start()
+
+
+class LocalWorker(NamedTuple):
+    process: multiprocessing.Process
+    address: tuple
+
+
+def _serve_process(pipe, host: str, credits: int, max_shards: int) -> None:
+    def ready(address):
+        pipe.send(address)
+        pipe.close()
+    serve(host, 0, credits, max_shards, ready)
+
+
+def start_workers(count: int, host: str = "127.0.0.1", credits: int = DEFAULT_CREDITS,
+                  max_shards: int = None) -> list:
+    """Start worker servers in local processes, each on a free port.
+
+    Returns
+    -------
+    list
+        `LocalWorker` per process.  Terminate the processes once done.
+
+    Raises
+    ------
+    ValueError
+        If credits is less than 1.
+    """
+    if credits < 1:
+        raise ValueError("Credits must be at least 1.")
+    _workers = []
+    for _ in range(count):
+        parent, child = multiprocessing.Pipe(duplex = False)
+        process = multiprocessing.Process(target = _serve_process, args = (child, host, credits, max_shards), daemon = True)
+        process.start()
+        child.close()
+        _workers.append(LocalWorker(process, tuple(parent.recv())))
+        parent.close()
+    return _workers
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Coordinator
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class _Connection:
+    __slots__ = ("address", "sock", "credits", "in_flight", "alive")
+
+    def __init__(self, address: tuple, sock: socket.socket, credits: int) -> None:
+        self.address = address
+        self.sock = sock
+        self.credits = credits
+        # Shard id -> (items, time sent).
+        self.in_flight = {}
+        self.alive = True
+
+
+class Cluster:
+    """Coordinator sharding expressions across worker servers.
+
+    Use as a context manager, or call `close`, to disconnect.
+
+    Parameters
+    ----------
+    addresses : list
+        (host, port) of each worker.  Unreachable ones, and ones granting
+        no credits, are skipped.
+    shard_size : int
+        Expressions sent per shard.
+    max_retries : int
+        Times a shard is sent again after its worker failed.
+    timeout : float
+        Seconds a worker may take to answer its oldest shard before it
+        counts as dead.  None waits as long as the connection is open.
+    connect_timeout : float
+        Seconds allowed for connecting to each worker.
+
+    Raises
+    ------
+    ClusterError
+        If no worker could be reached.
+    """
+    def __init__(self, addresses: list, shard_size: int = 256, max_retries: int = 3,
+                 timeout: float = None, connect_timeout: float = 5.0) -> None:
+        if shard_size < 1:
+            raise ValueError("Shard size must be at least 1.")
+        self.shard_size = shard_size
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.stats = {"shards": 0, "sent": 0, "retried": 0, "workers_lost": 0}
+        self._events = queue.Queue()
+        self._connections = []
+        # Shard ids run on across calls of `map`, so that late results
+        # of an abandoned call are told apart.
+        self._next_shard = 0
+        for address in addresses:
+            try:
+                sock = socket.create_connection(tuple(address), connect_timeout)
+                sock.settimeout(None)
+                hello = _recv(sock)
+            except OSError:
+                continue
+            # A worker granting no credits would never be sent a shard.
+            if not hello or hello.get("op") != "hello" or not int(hello.get("credits", 0)) > 0:
+                sock.close()
+                continue
+            conn = _Connection(tuple(address), sock, int(hello["credits"]))
+            self._connections.append(conn)
+            threading.Thread(target = self.__receive, args = (conn,), daemon = True).start()
+        if not self._connections:
+            raise ClusterError("No worker could be reached.")
+
+    def __enter__(self) -> "Cluster":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def workers(self) -> list:
+        """Return addresses of the workers still connected.
+        """
+        return [c.address for c in self._connections if c.alive]
+
+    def close(self) -> None:
+        for conn in self._connections:
+            self.__drop(conn)
+
+    def __receive(self, conn: _Connection) -> None:
+        try:
+            while True:
+                message = _recv(conn.sock)
+                if message is None:
+                    break
+                self._events.put((conn, message))
+        except (OSError, ValueError):
+            pass
+        self._events.put((conn, None))
+
+    def __drop(self, conn: _Connection) -> None:
+        if conn.alive:
+            conn.alive = False
+            try:
+                conn.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.sock.close()
+
+    def __lose(self, conn: _Connection, pending: deque, attempts: dict) -> None:
+        """Drop connection and queue its shards to be sent again first.
+        """
+        if not conn.alive:
+            return
+        self.__drop(conn)
+        self.stats["workers_lost"] += 1
+        for shard in sorted(conn.in_flight, reverse = True):
+            attempts[shard] = attempts.get(shard, 0) + 1
+            if attempts[shard] > self.max_retries:
+                raise ClusterError(f"Shard {shard} failed on {attempts[shard]} workers.")
+            pending.appendleft((shard, conn.in_flight[shard][0]))
+            self.stats["retried"] += 1
+        conn.in_flight.clear()
+        if not self.workers:
+            raise ClusterError("All workers were lost.")
+
+    def map(self, items):
+        """Evaluate expressions on the workers, yielding results in order.
+
+        Parameters
+        ----------
+        items : Iterable
+            Expressions, as strings or token lists, or (expression,
+            bindings) pairs.  Read lazily, a window of shards at a time.
+
+        Yields
+        ------
+        tuple
+            Return code, message and value, as returned by `Program.run`.
+            Vector values are returned as lists.
+
+        Raises
+        ------
+        ClusterError
+            If every worker is lost, or a shard fails on too many workers.
+        """
+        it = iter(items)
+        pending = deque()
+        done = {}
+        attempts = {}
+        first = next_id = next_out = self._next_shard
+        exhausted = False
+
+        while True:
+            _live = [c for c in self._connections if c.alive]
+            _credits = sum(c.credits + len(c.in_flight) for c in _live)
+            # Read ahead no further than a window of shards past the
+            # oldest one not yet yielded.
+            while not exhausted and len(pending) < _credits and next_id - next_out < 4 * _credits:
+                _chunk = [self.__item(i) for i in islice(it, self.shard_size)]
+                if not _chunk:
+                    exhausted = True
+                    break
+                pending.append((next_id, _chunk))
+                next_id += 1
+                self._next_shard = next_id
+                self.stats["shards"] += 1
+
+            for conn in _live:
+                while conn.alive and conn.credits > 0 and pending:
+                    shard, _chunk = pending.popleft()
+                    try:
+                        _send(conn.sock, {"op": "eval", "shard": shard, "items": _chunk})
+                    except OSError:
+                        pending.appendleft((shard, _chunk))
+                        self.__lose(conn, pending, attempts)
+                        break
+                    conn.in_flight[shard] = (_chunk, time.monotonic())
+                    conn.credits -= 1
+                    self.stats["sent"] += 1
+
+            while next_out in done:
+                yield from done.pop(next_out)
+                next_out += 1
+            if exhausted and next_out == next_id:
+                return
+
+            if self.timeout is not None:
+                self.__expire(pending, attempts)
+            try:
+                conn, message = self._events.get(timeout = 0.2 if self.timeout is not None else None)
+            except queue.Empty:
+                continue
+            if message is None:
+                self.__lose(conn, pending, attempts)
+            elif conn.alive and message.get("shard") in conn.in_flight:
+                shard = message["shard"]
+                del conn.in_flight[shard]
+                conn.credits += 1
+                if shard >= first:
+                    done[shard] = [tuple(r) for r in message["results"]]
+
+    def __expire(self, pending: deque, attempts: dict) -> None:
+        _now = time.monotonic()
+        for conn in self._connections:
+            if conn.alive and any(_now - sent > self.timeout for _, sent in conn.in_flight.values()):
+                self.__lose(conn, pending, attempts)
+
+    @staticmethod
+    def __item(item) -> list:
+        if isinstance(item, str):
+            return [item, {}]
+        if isinstance(item, tuple):
+            expr, bindings = item
+            _bindings = {k: _plain(v) for k, v in (bindings or {}).items()}
+            return [expr if isinstance(expr, str) else " ".join(expr), _bindings]
+        return [" ".join(item), {}]
+
+    def evaluate(self, items) -> list:
+        """Return list of results of `map`.
+        """
+        return list(self.map(items))
@@ -8,10 +8,14 @@ __all__ = [
 
 import re
 import cmd
+import sys
 import subprocess
 from os import linesep
 
 from ._rpn import Expression, Rpn
+from ._trace import Tracer, replay
+from ._script import ScriptError, source
+from ._vector import is_literal
 from ._types import StrList
 from ._colors import SGRColors as C
 
@@ -29,15 +33,12 @@ header_lines = [
 PROMPT = f"{C.cyan}~~> {C.end}"
 HEADER = "\n" + "\n".join(header_lines)
 
-# Instance Rpn() class
-RPN = Rpn()
-
 
 def exit_program():
     println(f"{linesep}Goodbye!")
     exit(0)
 
-def parse_arg(string: str) -> StrList:
+def parse_arg(string: str, rpn_cls: Rpn) -> StrList:
     """Returns list of characters from a string that are valid
     operators or numeric values.
 
@@ -45,6 +46,8 @@ def parse_arg(string: str) -> StrList:
     ----------
     string : str
         Input string object to parse.
+    rpn_cls : Rpn
+        Calculator instance whose operators are recognized.
 
     Returns
     -------
@@ -52,13 +55,9 @@ def parse_arg(string: str) -> StrList:
         List of string objects.
     """
     if string and len(string) > 0:
-        string = RPN.clean_up_whitespace(string)
-
-        # if len(string) == 2 and RPN.is_number(string):
-        #     return [string]
-
-        res = " ".join([c for c in string.split() if c in RPN.operators or RPN.is_number(c)])
-        return list(res.split())
+        # str.split already collapses and strips whitespace.
+        _operators = rpn_cls.operators
+        return [c for c in string.split() if c in _operators or rpn_cls.is_number(c) or is_literal(c)]
 
 
 def toggle_first_entry(rpn_cls: Rpn, min_numbers = 2) -> bool:
@@ -106,15 +105,21 @@ class RpnShell(cmd.Cmd):
     prompt = PROMPT
     ruler = "-"
 
-    rpn = RPN
-    # Helper to determine whether or not to auto-print result.
-    first_entry = False
-    # Helper to determine whether or not to auto-print result.
-    last_entry = False    
-    # Keep history alive unless 'do_ce()' called
-    persistory = []
-    _verbose: bool = False
-
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # All state is per shell, so shells in different threads
+        # do not share a calculator.
+        self.rpn = Rpn()
+        self.rpn.load_plugins()
+        # Helper to determine whether or not to auto-print result.
+        self.first_entry = False
+        # Helper to determine whether or not to auto-print result.
+        self.last_entry = False
+        # Keep history alive unless 'do_ce()' called
+        self.persistory = []
+        # Trail of the last completed expression, kept for `edit`.
+        self.last_trail = None
+        self._verbose = False
 
     def reset_entries(self):
         """Helper method to reset first and last entry flags.
@@ -141,7 +146,7 @@ class RpnShell(cmd.Cmd):
             print(f"{C.yellow_lt}{line}{C.end}")
 
             # Clean-up arguments
-            _tmp: list = parse_arg(line)
+            _tmp: list = parse_arg(line, self.rpn)
 
             # If more than one argument found, pass each
             # individually for evaluation and updating of
@@ -196,6 +201,90 @@ class RpnShell(cmd.Cmd):
         self.rpn.remove_last
         self.do_state(arg)
 
+    def do_save(self, arg) -> None:
+        """Save current session to a file.
+        """
+        if not arg:
+            print("Usage: save FILE")
+            return
+        try:
+            self.rpn.save(arg.strip())
+        except (OSError, ValueError) as e:
+            print(e)
+
+    def do_load(self, arg) -> None:
+        """Load session from a file written by `save`.
+        """
+        if not arg:
+            print("Usage: load FILE")
+            return
+        try:
+            self.rpn.load(arg.strip())
+        except (OSError, ValueError) as e:
+            print(e)
+            return
+        self.reset_entries()
+        self.do_state(None)
+
+    def do_undo(self, arg) -> None:
+        """Undo last step, including operator applications.
+        """
+        if not self.rpn.undo():
+            print("Nothing to undo!")
+        self.do_state(arg)
+
+    def do_redo(self, arg) -> None:
+        """Redo last undone step.
+        """
+        if not self.rpn.redo():
+            print("Nothing to redo!")
+        self.do_state(arg)
+
+    def do_source(self, arg) -> None:
+        """Run script file, see `_script`.
+        """
+        try:
+            source(arg.strip(), self.rpn, sys.stdout)
+        except (OSError, ScriptError) as e:
+            print(f"{C.red}{e}{C.end}")
+        self.reset_entries()
+
+    def do_trace(self, arg) -> None:
+        """Record, show and replay executed steps, see `_trace`.
+        """
+        _args = (arg or "").split()
+        _cmd = _args[0] if _args else "dump"
+        _n = int(_args[1]) if len(_args) > 1 and _args[1].isdigit() else None
+        if _cmd == "on":
+            self.rpn.tracer = Tracer(_n or 4096)
+            print(f"Tracing the last {self.rpn.tracer.capacity} steps.")
+        elif _cmd == "off":
+            self.rpn.tracer = None
+            print("Tracing is off.")
+        elif self.rpn.tracer is None:
+            print("Tracing is off.  Type 'trace on' to start.")
+        elif _cmd == "dump":
+            printh(self.rpn.tracer.dump(_n))
+        elif _cmd == "replay":
+            _mismatches = replay(self.rpn.tracer.records(), self.rpn.registry)
+            for r, value in _mismatches:
+                print(f"Step {r.step}: {r.token} gave {r.output!r}, replay gives {value!r}.")
+            print(f"{len(_mismatches)} of {len(self.rpn.tracer)} steps differ on replay.")
+        elif _cmd == "clear":
+            self.rpn.tracer.clear()
+        else:
+            self.help_trace()
+
+    def do_rolling(self, arg) -> None:
+        """Show or clear rolling operator windows, see `_rolling`.
+        """
+        if (arg or "").strip() == "clear":
+            self.rpn.rolling.clear()
+            print("Rolling windows cleared.")
+            return
+        _lines = self.rpn.rolling.describe()
+        printh(_lines if _lines else ["No rolling windows yet."])
+
     def do_history(self, arg) -> None:
         """Print persistent history to stdout.
         """
@@ -205,7 +294,9 @@ class RpnShell(cmd.Cmd):
         print(_out)
 
     def do_operators(self, arg) -> None:
-        self.rpn.descriptions()
+        _args = (arg or "").split()
+        _page = int(_args.pop()) if _args and _args[-1].isdigit() else 1
+        self.rpn.descriptions(pattern = _args[0] if _args else None, page = _page)
 
     def do_result(self, arg) -> None:
         """Determine output and send to stdout.
@@ -213,8 +304,38 @@ class RpnShell(cmd.Cmd):
         Resets calculator once called.
         """
         print(f"{C.grn_blink}Result: {self.rpn.result}{C.end}")
+        self.last_trail = self.rpn.trail
         self.do_reset(None)
 
+    def do_edit(self, arg) -> None:
+        """Replace token at a given position of the current, or last
+        completed, expression and re-run it from the nearest checkpoint.
+        """
+        _args = arg.split()
+        if len(_args) != 2 or not self.rpn.is_int(_args[0]):
+            print("Usage: edit POSITION TOKEN")
+            return
+
+        _trail = self.rpn.trail if len(self.rpn.trail) > 0 else self.last_trail
+        if _trail is None or len(_trail) == 0:
+            print("No expression to edit!")
+            return
+
+        _pos, _token = int(_args[0]), _args[1]
+        if not 0 <= _pos < len(_trail):
+            print(f"Position must be between 0 and {len(_trail) - 1}.")
+            return
+
+        _tokens = list(_trail.tokens)
+        _tokens[_pos] = _token
+        g, msg = self.rpn.reevaluate(_tokens, _trail)
+        if g == 1:
+            print(msg)
+        elif self.rpn.stack_size == 1:
+            self.do_result(None)
+        else:
+            self.do_state(None)
+
 
     def do_reset(self, arg) -> None:
         """Reset RPN state.
@@ -254,7 +375,7 @@ class RpnShell(cmd.Cmd):
     def do_ops(self, arg):
         """Alias for `operators`.
         """
-        self.do_operators(None)
+        self.do_operators(arg)
 
     # -/ END: Aliases
 
@@ -305,11 +426,70 @@ class RpnShell(cmd.Cmd):
         lines = "$ del", "Remove the last statement from the RPN stack."
         printh(lines)
 
+    def help_save(self):
+        lines = "$ save FILE", "Save stack, history and the names of custom operators to FILE."
+        printh(lines)
+
+    def help_load(self):
+        lines = (
+            "$ load FILE",
+            "Restore session saved with `save`.",
+            "NOTE: This replaces the current stack.  Custom operators the session",
+            "uses must be added again first.",
+            )
+        printh(lines)
+
+    def help_undo(self):
+        lines = "$ undo", "Undo the last step, including operators and resets."
+        printh(lines)
+
+    def help_redo(self):
+        lines = "$ redo", "Redo the last undone step."
+        printh(lines)
+
+    def help_edit(self):
+        lines = (
+            "$ edit POSITION TOKEN",
+            "Replace token at zero-based POSITION of the current, or last",
+            "completed, expression and re-run it.",
+            )
+        printh(lines)
+
+    def help_source(self):
+        lines = (
+            "$ source FILE",
+            "Run a script of expressions and commands, one per line.",
+            "The whole file is checked first; execution stops at the first",
+            "failing line.  Commands: result, reset, c, ce, state, ops [PATTERN].",
+            )
+        printh(lines)
+
+    def help_trace(self):
+        lines = (
+            "$ trace on [N]       Record the last N steps (default 4096).",
+            "$ trace off          Stop recording.",
+            "$ trace dump [N]     Show recorded steps, or only the last N.",
+            "$ trace replay       Re-apply each recorded step and report differences.",
+            "$ trace clear        Forget recorded steps.",
+            )
+        printh(lines)
+
+    def help_rolling(self):
+        lines = (
+            "$ rolling            Show windows of rsum, rmean, rmin, rmax and ewma.",
+            "$ rolling clear      Forget every window.",
+            "Windows carry across results and resets, and are not undone by undo.",
+            )
+        printh(lines)
+
     def help_operators(self):
-        lines = """Display list of currently available operators
-        within the program.
-        """.strip().split(linesep)
-        print(f"{linesep}".join(lines))       
+        lines = (
+            "$ operators [PATTERN] [PAGE]",
+            "Display list of currently available operators within the program.",
+            "PATTERN filters by alias, e.g. 'log*' or '*cos*'; plain text matches",
+            "any alias containing it.  Long lists are shown one PAGE at a time.",
+            )
+        printh(lines)
 
     def help_clear(self):
         lines = "$ clear", "Clear current prompt."
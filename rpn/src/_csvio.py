@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Chunked CSV batch evaluation.
+
+Columns named like program variables are bound to them by header.  The
+program is compiled once per file and run once per chunk of rows, with
+every bound column passed as a vector operand.  Results are written as a
+CSV column, or to a sink from `_sinks` along with their return codes.
+
+Programs that are not `Program.elementwise` run one row at a time
+instead: reductions, `dot`, `matmul` and vector literals would mix rows
+together, and impure operators, such as the rolling windows of
+`_rolling`, must advance in file order from one chunk to the next.
+"""
+
+__all__ = [
+    "evaluate_csv",
+    ]
+
+import csv
+import math
+import time
+from array import array
+
+from ._program import Program
+from . import _vector
+
+
+def _to_float(cell: str) -> float:
+    try:
+        return float(cell)
+    except ValueError:
+        return math.nan
+
+
+def _column(rows: list, index: int):
+    _values = array("d", (_to_float(r[index]) if index < len(r) else math.nan for r in rows))
+    return _vector.np.frombuffer(_values, dtype = _vector.np.float64) if _vector.np is not None else _values
+
+
+def _evaluate_chunk(program: Program, rows: list, indices: dict, vectorize: bool = True) -> tuple:
+    """Return lists of results and return codes for a chunk of rows,
+    NaN where a row fails.
+    """
+    bindings = {name: _column(rows, i) for name, i in indices.items()}
+    if vectorize:
+        code, _, value = program.run(bindings)
+        if code in (0, -1) and value is not None and not _vector.is_operand(value):
+            return [float(value)] * len(rows), [code] * len(rows)
+        if code in (0, -1) and _vector._rank(value) == 1 and len(value) == len(rows):
+            return list(value), [code] * len(rows)
+
+    # Evaluate chunk row by row, so one bad row does not fail the others.
+    _results, _codes = [], []
+    for i in range(len(rows)):
+        # Bind floats: NumPy scalars would take the vector path of operators.
+        code, _, value = program.run({k: float(v[i]) for k, v in bindings.items()})
+        # A vector or matrix is not a row's value.
+        _ok = code in (0, -1) and value is not None and not _vector.is_operand(value)
+        _results.append(float(value) if _ok else math.nan)
+        _codes.append(code if _ok else 1)
+    return _results, _codes
+
+
+def evaluate_csv(program: Program, src, dst, chunk_rows: int = 1 << 14, column: str = "result",
+                 sink = None) -> tuple:
+    """Evaluate program for every row of a CSV file.
+
+    Parameters
+    ----------
+    program : Program
+        Compiled program.  Each variable must match a header of `src`.
+    src : TextIO
+        CSV input with a header row.
+    dst : TextIO
+        CSV output, written one chunk at a time.
+    chunk_rows : int
+        Number of rows evaluated at a time.
+    column : str
+        Header of the result column.
+    sink : RawSink or NdjsonSink
+        Sink to write results and codes to instead of `dst`.
+
+    Returns
+    -------
+    tuple
+        Number of rows and elapsed seconds.
+
+    Raises
+    ------
+    ValueError
+        If a variable has no matching column.
+    """
+    start = time.perf_counter()
+    reader = csv.reader(src)
+    writer = csv.writer(dst) if sink is None else None
+
+    header = next(reader, [])
+    _positions = {name.strip(): i for i, name in enumerate(header)}
+    _missing = [v for v in program.variables if v not in _positions]
+    if _missing:
+        raise ValueError(f"No CSV column for: {', '.join(_missing)}.")
+    indices = {v: _positions[v] for v in program.variables}
+    vectorize = program.elementwise
+
+    def emit(chunk: list) -> None:
+        values, codes = _evaluate_chunk(program, chunk, indices, vectorize)
+        if sink is None:
+            writer.writerows([v] for v in values)
+        else:
+            sink.write_many(codes, values)
+
+    if sink is None:
+        writer.writerow([column])
+    n_rows = 0
+    chunk = []
+    for row in reader:
+        chunk.append(row)
+        if len(chunk) == chunk_rows:
+            emit(chunk)
+            n_rows += len(chunk)
+            chunk = []
+    if chunk:
+        emit(chunk)
+        n_rows += len(chunk)
+
+    return n_rows, time.perf_counter() - start
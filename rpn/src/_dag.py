@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Common-subexpression elimination across a batch of programs.
+
+All programs are folded into one hash-consed DAG: a constant, a variable
+or a pure operator applied to the same child nodes is created only once,
+however many programs contain it.  Running the DAG evaluates every shared
+node once per set of bindings and fans its value out to each program.
+"""
+
+__all__ = [
+    "Dag",
+    ]
+
+import itertools
+
+from ._rpn import ARITY_ALL
+from ._program import Program, OP, PUSH, VAR
+from . import _vector
+
+# Node kind for a whole program evaluated with `Program.run`.
+RUN = 3
+
+class _Failed:
+    """Marks a node whose evaluation raised, so dependents fail too.
+    """
+    __slots__ = ("msg",)
+
+    def __init__(self, msg: str) -> None:
+        self.msg = msg
+
+
+class Dag:
+    """Hash-consed DAG over a batch of compiled programs.
+
+    Parameters
+    ----------
+    programs : list
+        Compiled programs.
+
+    Attributes
+    ----------
+    nodes : list
+        (kind, payload, children) triples in evaluation order.
+    roots : list
+        (code, msg, node index, stack) per program, with node index None
+        when the program fails structurally or leaves an empty stack, and
+        code None when the node runs the whole program.  Stack holds the
+        nodes left on the program's stack, any of which failing fails the
+        program, as it would have failed a sequential run.
+    """
+    def __init__(self, programs: list) -> None:
+        self.programs = list(programs)
+        self.nodes = []
+        self.roots = []
+        self._keys = {}
+        # Impure operators get a unique key per occurrence.
+        self._unique = itertools.count()
+        for p in self.programs:
+            self.roots.append(self.__add_program(p))
+        self.order = self.__reachable()
+
+    def __node(self, key, kind, payload, children = ()) -> int:
+        _idx = self._keys.get(key)
+        if _idx is None:
+            _idx = len(self.nodes)
+            self.nodes.append((kind, payload, children))
+            self._keys[key] = _idx
+        return _idx
+
+    def __add_program(self, program: Program) -> tuple:
+        # Whole-stack reductions may push several values, which a single
+        # node cannot stand for.  Programs that keep going after one are
+        # evaluated as a whole, still only once per distinct token list
+        # unless impure.
+        _ops = [p for k, p in program.instructions if k == OP]
+        if any(p.arity == ARITY_ALL for p in _ops[:-1]) or (
+                _ops and _ops[-1].arity == ARITY_ALL and program.instructions[-1][0] != OP):
+            _key = (RUN, program.tokens) if program.pure else (RUN, next(self._unique))
+            _idx = self.__node(_key, RUN, program)
+            return None, "", _idx, (_idx,)
+
+        stack = []
+        for kind, payload in program.instructions:
+            if kind == PUSH:
+                # repr keeps 0.0 and -0.0, and every NaN, apart.
+                _key = (PUSH, repr(payload)) if type(payload) in _vector.SCALARS else (PUSH, next(self._unique))
+                stack.append(self.__node(_key, PUSH, payload))
+            elif kind == VAR:
+                stack.append(self.__node((VAR, payload), VAR, payload))
+            else:
+                arity = payload.arity
+                if len(stack) == 0:
+                    return 1, "Not enough values to perform operation.", None, ()
+                if arity == ARITY_ALL:
+                    children = tuple(reversed(stack))
+                    stack = []
+                elif arity == 1:
+                    children = (stack.pop(),)
+                elif len(stack) == 1:
+                    # Lone value stands as result, as in `Rpn.execute_next`.
+                    return -1, "", stack[-1], tuple(stack)
+                elif len(stack) < arity:
+                    return 1, "Not enough values to perform operation.", None, ()
+                else:
+                    children = tuple(stack.pop() for _ in range(arity))
+
+                _key = (OP, id(payload), children) if payload.pure else (OP, next(self._unique))
+                stack.append(self.__node(_key, OP, payload, children))
+
+        return 0, "", stack[-1] if stack else None, tuple(stack)
+
+    def __reachable(self) -> list:
+        """Return indices of nodes some root depends on, in evaluation order.
+        """
+        needed = set()
+        pending = [i for _, _, _, _stack in self.roots for i in _stack]
+        while pending:
+            i = pending.pop()
+            if i not in needed:
+                needed.add(i)
+                pending.extend(self.nodes[i][2])
+        return sorted(needed)
+
+    @property
+    def operator_count(self) -> int:
+        """Return number of operator nodes evaluated per run.
+        """
+        return sum(1 for i in self.order if self.nodes[i][0] == OP)
+
+    def run(self, bindings: dict = None) -> list:
+        """Evaluate every program.
+
+        Parameters
+        ----------
+        bindings : dict
+            Value of each variable.  Scalars or vector operands.
+
+        Returns
+        -------
+        list
+            (code, msg, value) per program, as returned by `Program.run`.
+        """
+        bindings = bindings or {}
+        values = {}
+        scalars = _vector.SCALARS
+        for i in self.order:
+            kind, payload, children = self.nodes[i]
+            if kind == PUSH:
+                values[i] = payload
+            elif kind == RUN:
+                values[i] = payload.run(bindings)
+            elif kind == VAR:
+                values[i] = bindings[payload] if payload in bindings else _Failed(f"Missing value for variable {payload!r}.")
+            else:
+                args = [values[c] for c in children]
+                _failed = next((a for a in args if isinstance(a, _Failed)), None)
+                if _failed is not None:
+                    values[i] = _failed
+                    continue
+                try:
+                    if payload.arity == ARITY_ALL:
+                        _message = f"Operator {payload.alias!r} takes scalar values only."
+                        if any(map(_vector.is_operand, args)):
+                            raise ValueError(_message)
+                        try:
+                            _result = payload.function(args)
+                        except TypeError:
+                            raise ValueError(_message) from None
+                        if isinstance(_result, list):
+                            # Reductions are always a root, where None stands for an empty stack.
+                            _result = _result[-1] if _result else None
+                    elif all(type(a) in scalars for a in args):
+                        _result = payload.function(*args)
+                    else:
+                        _result = _vector.apply(payload, *args)
+                except (ArithmeticError, ValueError) as e:
+                    _result = _Failed(str(e))
+                values[i] = _result
+
+        _results = []
+        for code, msg, root, _stack in self.roots:
+            value = values[root] if root is not None else None
+            _failed = next((values[i] for i in _stack if isinstance(values[i], _Failed)), None)
+            if code is None:
+                _results.append(value)
+            elif _failed is not None:
+                _results.append((1, _failed.msg, None))
+            else:
+                _results.append((code, msg, value))
+        return _results
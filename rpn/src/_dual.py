@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Forward-mode automatic differentiation.
+
+Every stack value is a `Dual`: its value plus one partial derivative per
+program variable.  One evaluation therefore yields the result and its
+full gradient, instead of two extra evaluations per variable with finite
+differences.  With NumPy, values and partials can be whole arrays, so a
+batch of inputs is differentiated in one pass.
+"""
+
+__all__ = [
+    "Dual",
+    "gradient",
+    "RULES",
+    ]
+
+import math
+
+from ._program import Program, PUSH, VAR
+from . import _vector
+
+
+class Dual:
+    """Value with partial derivatives.
+
+    Parameters
+    ----------
+    value : Any
+        Scalar or NumPy array.
+    grad : tuple
+        One partial derivative per variable, same shape as `value`.
+    """
+    __slots__ = ("value", "grad")
+
+    def __init__(self, value, grad: tuple) -> None:
+        self.value = value
+        self.grad = grad
+
+    def __repr__(self):
+        return f"<Dual {self.value} {self.grad} >"
+
+    def scaled(self, factor) -> tuple:
+        """Return partials multiplied by factor.
+        """
+        return tuple(g * factor for g in self.grad)
+
+
+def _backend(value):
+    """Return math module for scalars, NumPy for arrays.
+    """
+    return math if type(value) in _vector.SCALARS else _vector.np
+
+
+def _add(a: Dual, b: Dual) -> Dual:
+    return Dual(b.value + a.value, tuple(gb + ga for ga, gb in zip(a.grad, b.grad)))
+
+
+def _sub(a: Dual, b: Dual) -> Dual:
+    return Dual(b.value - a.value, tuple(gb - ga for ga, gb in zip(a.grad, b.grad)))
+
+
+def _mul(a: Dual, b: Dual) -> Dual:
+    return Dual(b.value * a.value, tuple(gb * a.value + ga * b.value for ga, gb in zip(a.grad, b.grad)))
+
+
+def _div(a: Dual, b: Dual) -> Dual:
+    if _backend(a.value) is math:
+        if a.value == 0:
+            return Dual(math.inf, tuple(math.nan for _ in a.grad))
+        return Dual(b.value / a.value, tuple((gb * a.value - b.value * ga) / (a.value * a.value)
+                                             for ga, gb in zip(a.grad, b.grad)))
+    np = _vector.np
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        _zero = a.value == 0
+        _value = np.where(_zero, np.inf, b.value / a.value)
+        _grad = tuple(np.where(_zero, np.nan, (gb * a.value - b.value * ga) / (a.value * a.value))
+                      for ga, gb in zip(a.grad, b.grad))
+    return Dual(_value, _grad)
+
+
+def _pow(a: Dual, b: Dual) -> Dual:
+    m = _backend(a.value)
+    _value = m.pow(b.value, a.value) if m is math else m.power(b.value, a.value)
+    _d_base = a.value * (m.pow(b.value, a.value - 1) if m is math else m.power(b.value, a.value - 1))
+    # Only take the logarithm of the base when the exponent varies, so that
+    # constant exponents of negative bases stay defined.
+    if any(_nonzero(g) for g in a.grad):
+        _d_exp = _value * m.log(b.value)
+        _grad = tuple(gb * _d_base + ga * _d_exp for ga, gb in zip(a.grad, b.grad))
+    else:
+        _grad = b.scaled(_d_base)
+    return Dual(_value, _grad)
+
+
+def _log(a: Dual, b: Dual) -> Dual:
+    # math.log(n, base) with n on top of the stack.
+    m = _backend(a.value)
+    ln_n, ln_base = m.log(a.value), m.log(b.value)
+    return Dual(ln_n / ln_base, tuple(ga / (a.value * ln_base) - ln_n * gb / (b.value * ln_base * ln_base)
+                                      for ga, gb in zip(a.grad, b.grad)))
+
+
+def _nonzero(g) -> bool:
+    return bool(g != 0) if type(g) in _vector.SCALARS else bool(_vector.np.any(g != 0))
+
+
+def _sin(a: Dual) -> Dual:
+    m = _backend(a.value)
+    return Dual(m.sin(a.value), a.scaled(m.cos(a.value)))
+
+
+def _cos(a: Dual) -> Dual:
+    m = _backend(a.value)
+    return Dual(m.cos(a.value), a.scaled(-m.sin(a.value)))
+
+
+def _tanh(a: Dual) -> Dual:
+    _value = _backend(a.value).tanh(a.value)
+    return Dual(_value, a.scaled(1 - _value * _value))
+
+
+def _acos(a: Dual) -> Dual:
+    m = _backend(a.value)
+    _value = m.acos(a.value) if m is math else m.arccos(a.value)
+    return Dual(_value, a.scaled(-1 / m.sqrt(1 - a.value * a.value)))
+
+
+def _exp(a: Dual) -> Dual:
+    _value = _backend(a.value).exp(a.value)
+    return Dual(_value, a.scaled(_value))
+
+
+# Derivative rules by operator alias.  Like the scalar expressions, binary
+# rules take the top of the stack first.
+RULES = {
+    "+": _add,
+    "-": _sub,
+    "*": _mul,
+    "/": _div,
+    "^": _pow,
+    "log": _log,
+    "sin": _sin,
+    "cos": _cos,
+    "tanh": _tanh,
+    "acos": _acos,
+    "e": _exp,
+}
+
+
+def _run(program: Program, bindings: dict) -> tuple:
+    """Evaluate program on dual numbers.
+
+    Returns
+    -------
+    tuple
+        Return code, message and resulting `Dual` (None on error).
+    """
+    n = len(program.variables)
+    zeros = (0.0,) * n
+    seeds = {v: tuple(1.0 if j == i else 0.0 for j in range(n)) for i, v in enumerate(program.variables)}
+    stack = []
+    try:
+        for kind, payload in program.instructions:
+            if kind == PUSH:
+                if type(payload) not in _vector.SCALARS:
+                    return 1, "Vector literals are not supported.", None
+                stack.append(Dual(payload, zeros))
+            elif kind == VAR:
+                stack.append(Dual(bindings[payload], seeds[payload]))
+            else:
+                rule = RULES.get(payload.alias)
+                if rule is None:
+                    return 1, f"No derivative rule for {payload.alias!r}.", None
+                if len(stack) == 0:
+                    return 1, "Not enough values to perform operation.", None
+                if payload.arity == 1:
+                    stack.append(rule(stack.pop()))
+                elif len(stack) == 1:
+                    # Lone value stands as result, as in `Rpn.execute_next`.
+                    return -1, "", stack[-1]
+                else:
+                    a, b = stack.pop(), stack.pop()
+                    stack.append(rule(a, b))
+    except KeyError as e:
+        return 1, f"Missing value for variable {e.args[0]!r}.", None
+    except (ArithmeticError, ValueError) as e:
+        return 1, str(e), None
+
+    return 0, "", stack[-1] if stack else None
+
+
+def gradient(program: Program, bindings: dict) -> tuple:
+    """Return value of program and its partial derivatives with respect
+    to every variable, in one forward pass.
+
+    Parameters
+    ----------
+    program : Program
+        Compiled program.
+    bindings : dict
+        Value of each variable.  Sequences evaluate a batch, vectorized
+        with NumPy and row by row without it.
+
+    Returns
+    -------
+    tuple
+        Value and dict of partial derivatives by variable name.
+
+    Raises
+    ------
+    ValueError
+        If the program cannot be evaluated.
+    """
+    _batched = any(type(v) not in _vector.SCALARS for v in bindings.values())
+    if _batched and _vector.np is None:
+        _size = next(len(v) for v in bindings.values() if type(v) not in _vector.SCALARS)
+        _rows = [gradient(program, {k: v if type(v) in _vector.SCALARS else v[i] for k, v in bindings.items()})
+                 for i in range(_size)]
+        return [r[0] for r in _rows], {v: [r[1][v] for r in _rows] for v in program.variables}
+
+    if _batched:
+        bindings = {k: _vector.np.asarray(v, dtype = float) for k, v in bindings.items()}
+    code, msg, result = _run(program, bindings)
+    if code == 1 or result is None:
+        raise ValueError(msg or "Program leaves no value on the stack.")
+    return result.value, dict(zip(program.variables, result.grad))
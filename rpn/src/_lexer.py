@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Lazy lexer for very long input lines.
+
+Input, which may be `bytes`, `bytearray`, `memoryview`, `mmap` or `str`,
+is split one fixed-size block at a time, never as a whole, and each token
+is turned into the same (kind, payload) instructions as a compiled
+`Program` as it is reached.  A line of any length is therefore evaluated
+with memory bounded by the block size and its stack depth.
+"""
+
+__all__ = [
+    "evaluate",
+    "lex",
+    ]
+
+from functools import lru_cache
+
+from ._rpn import ComparisonMixin, Registry
+from ._program import Program, OP, PUSH, VAR
+from . import _vector
+
+# Bytes or characters split at a time.
+BLOCK_SIZE = 1 << 16
+# Distinct numbers and variables remembered per input.
+CACHE_SIZE = 1 << 12
+
+
+def _split(data, block_size: int):
+    """Yield whitespace separated tokens, splitting one block at a time
+    and carrying a token cut by a block boundary over to the next block.
+    """
+    if isinstance(data, memoryview):
+        data = data.cast("B")
+    # Tokens must be hashable, so split bytes rather than bytearray views.
+    as_bytes = not isinstance(data, (bytes, str))
+    size = len(data)
+    carry = "" if isinstance(data, str) else b""
+    for start in range(0, size, block_size):
+        block = data[start:start + block_size]
+        if as_bytes:
+            block = bytes(block)
+        block = carry + block if carry else block
+        tokens = block.split()
+        carry = tokens.pop() if tokens and start + block_size < size and not block[-1:].isspace() else block[:0]
+        yield from tokens
+    if carry:
+        yield carry
+
+
+@lru_cache(maxsize = 8)
+def _operators(registry: Registry, is_text: bool) -> dict:
+    """Return instruction by operator alias.  Aliases that read as
+    numbers stay numbers, as in `Program`.  Registries are immutable,
+    so the table is built once per registry.
+    """
+    return {a if is_text else a.encode(): (OP, registry.expressions[i]) for a, i in registry.positions.items()
+            if not ComparisonMixin.is_number(a)}
+
+
+def lex(data, registry: Registry, block_size: int = BLOCK_SIZE):
+    """Yield instructions for each whitespace separated token.
+
+    Tokens are resolved as in `Program`: operators first, then numbers,
+    vector literals and identifiers, which become variables.
+
+    Parameters
+    ----------
+    data : bytes-like or str
+        Input.  Bytes are decoded per token, as ASCII or UTF-8.
+    registry : Registry
+        Operators to resolve tokens against.
+    block_size : int
+        Bytes, or characters, split at a time.
+
+    Yields
+    ------
+    tuple
+        (kind, payload) instruction, see `_program`.
+
+    Raises
+    ------
+    ValueError
+        At the first token that is not valid, with its position.
+    """
+    is_text = isinstance(data, str)
+    # Instruction by token text, seeded with operators.
+    _known = dict(_operators(registry, is_text))
+    _limit = len(_known) + CACHE_SIZE
+
+    for i, raw in enumerate(_split(data, block_size)):
+        _instruction = _known.get(raw)
+        if _instruction is not None:
+            yield _instruction
+            continue
+        try:
+            # float() takes bytes as they are, as it does str.
+            _instruction = PUSH, float(raw)
+        except ValueError:
+            try:
+                t = raw if is_text else raw.decode()
+            except UnicodeDecodeError:
+                raise ValueError(f"Invalid token {raw!r} at position {i}.") from None
+            if _vector.is_literal(t):
+                # Not cached, so that every literal is a new operand.
+                yield PUSH, _vector.parse(t)
+                continue
+            if not t.isidentifier():
+                raise ValueError(f"Invalid token {t!r} at position {i}.")
+            _instruction = VAR, t
+
+        if len(_known) < _limit:
+            _known[raw] = _instruction
+        yield _instruction
+
+
+def evaluate(data, registry: Registry, bindings: dict = None) -> tuple:
+    """Evaluate input as it is lexed.
+
+    Parameters
+    ----------
+    data : bytes-like or str
+        Input expression.
+    registry : Registry
+        Operators to resolve tokens against.
+    bindings : dict
+        Values for variables.
+
+    Returns
+    -------
+    tuple
+        Return code, message and value, as returned by `Program.run`.
+        Invalid tokens give code 1.
+    """
+    return Program.execute(lex(data, registry), bindings)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bulk evaluation over memory-mapped float64 columns.
+
+Input and output files are raw, native-endian float64 values, as written
+by `array.tofile` or `numpy.ndarray.tofile`.  Programs are evaluated one
+chunk at a time, so resident memory stays bounded by the chunk size no
+matter how large the files are.
+
+Only programs that are `Program.elementwise` run once per chunk.  Others
+run one row at a time, as in `_csvio`: reductions, `dot` and `matmul`
+would mix rows together, and impure operators, such as the rolling
+windows of `_rolling`, must see each row once, in order.
+"""
+
+__all__ = [
+    "evaluate_mapped",
+    ]
+
+import math
+import mmap
+from array import array
+from contextlib import ExitStack
+
+from ._program import Program
+from . import _vector
+
+ITEMSIZE = 8
+
+
+def _map_file(stack: ExitStack, path: str, size: int = None) -> memoryview:
+    """Memory-map file and return a float64 view over it.  Files are
+    created with `size` values when given, and mapped read-only otherwise.
+    """
+    if size is None:
+        f = stack.enter_context(open(path, "rb"))
+        mm = stack.enter_context(mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ))
+    else:
+        f = stack.enter_context(open(path, "w+b"))
+        f.truncate(size * ITEMSIZE)
+        mm = stack.enter_context(mmap.mmap(f.fileno(), 0))
+    view = memoryview(mm).cast("d")
+    stack.callback(view.release)
+    return view
+
+
+def _chunk(view: memoryview, start: int, stop: int):
+    """Return operand for a slice of a mapped column, without copying
+    when NumPy is available.
+    """
+    if _vector.np is not None:
+        return _vector.np.frombuffer(view[start:stop], dtype = _vector.np.float64)
+    _result = array("d")
+    _result.frombytes(view[start:stop].cast("B"))
+    return _result
+
+
+def _evaluate_rows(program: Program, bindings: dict, size: int) -> array:
+    """Fallback evaluating a chunk one row at a time, storing NaN for
+    rows that fail.
+    """
+    _result = array("d", [math.nan]) * size
+    for i in range(size):
+        # Bind floats: NumPy scalars would take the vector path of operators.
+        code, _, value = program.run({k: float(v[i]) for k, v in bindings.items()})
+        # NumPy scalars are kept; vectors are not a row's value.
+        if code in (0, -1) and value is not None and not _vector.is_operand(value):
+            _result[i] = float(value)
+    return _result
+
+
+def evaluate_mapped(program: Program, inputs: dict, out: str, chunk_size: int = 1 << 16) -> int:
+    """Evaluate program over memory-mapped input columns.
+
+    Parameters
+    ----------
+    program : Program
+        Compiled program.
+    inputs : dict
+        Path of the float64 column for each program variable.
+    out : str
+        Path of the float64 result file, created or overwritten.
+    chunk_size : int
+        Number of rows evaluated at a time.
+
+    Returns
+    -------
+    int
+        Number of rows written.
+
+    Raises
+    ------
+    ValueError
+        If a variable has no input or input columns differ in length.
+    """
+    _missing = [v for v in program.variables if v not in inputs]
+    if _missing:
+        raise ValueError(f"No input column for: {', '.join(_missing)}.")
+
+    with ExitStack() as stack:
+        columns = {}
+        for name in program.variables:
+            with open(inputs[name], "rb") as f:
+                _empty = f.seek(0, 2) == 0
+            # Empty files cannot be mapped.
+            columns[name] = memoryview(array("d")) if _empty else _map_file(stack, inputs[name])
+
+        sizes = {len(c) for c in columns.values()}
+        if len(sizes) > 1:
+            raise ValueError("Input columns differ in length.")
+        size = sizes.pop() if sizes else 0
+
+        if size == 0:
+            open(out, "wb").close()
+            return 0
+        result = _map_file(stack, out, size)
+        vectorize = program.elementwise
+
+        for start in range(0, size, chunk_size):
+            stop = min(start + chunk_size, size)
+            bindings = {k: _chunk(v, start, stop) for k, v in columns.items()}
+            code, value = 1, None
+            if vectorize:
+                code, _, value = program.run(bindings)
+                if _vector.is_operand(value) and (_vector._rank(value) != 1 or len(value) != stop - start):
+                    code = 1
+
+            if code not in (0, -1) or value is None:
+                value = _evaluate_rows(program, bindings, stop - start)
+            elif not _vector.is_operand(value):
+                value = array("d", [float(value)]) * (stop - start)
+            elif _vector.np is not None:
+                value = _vector.np.ascontiguousarray(value, dtype = _vector.np.float64)
+            result[start:stop] = memoryview(value).cast("B").cast("d")
+            # Drop views into the mapped files before they are closed.
+            del bindings, value
+
+        return size
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+numexpr backend for large array workloads.
+
+A compiled `Program` is translated into a single numexpr expression
+string, which numexpr evaluates in cache-sized blocks on all cores
+without a temporary array per operator.  When numexpr is not installed,
+`evaluate` falls back to running the program on NumPy arrays, one ufunc
+call per operator, or on `array('d')` without NumPy.
+"""
+
+__all__ = [
+    "evaluate",
+    "to_numexpr",
+    ]
+
+import math
+
+from ._program import Program, PUSH, VAR
+from . import _vector
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+# Templates take the top of the stack as `a` and the value below as `b`,
+# matching the scalar expressions.
+TEMPLATES = {
+    "+": "({b} + {a})",
+    "-": "({b} - {a})",
+    "*": "({b} * {a})",
+    "/": "where({a} != 0, {b} / {a}, _inf)",
+    "^": "({b} ** {a})",
+    "log": "(log({a}) / log({b}))",
+    "sin": "sin({a})",
+    "cos": "cos({a})",
+    "tanh": "tanh({a})",
+    "acos": "arccos({a})",
+    "e": "exp({a})",
+}
+
+# Names provided to every numexpr evaluation.
+CONSTANTS = {"_inf": math.inf, "_nan": math.nan}
+
+
+def _constant(value: float) -> str:
+    if math.isnan(value):
+        return "_nan"
+    if math.isinf(value):
+        return "_inf" if value > 0 else "(-_inf)"
+    return repr(value)
+
+
+def to_numexpr(program: Program) -> str:
+    """Translate program to a numexpr expression string.
+
+    Raises
+    ------
+    ValueError
+        If the program uses an operator or operand numexpr cannot express,
+        or does not leave a value on the stack.
+    """
+    stack = []
+    for kind, payload in program.instructions:
+        if kind == PUSH:
+            if type(payload) not in _vector.SCALARS:
+                raise ValueError("Vector literals cannot be translated to numexpr.")
+            stack.append(_constant(payload))
+        elif kind == VAR:
+            stack.append(payload)
+        else:
+            _template = TEMPLATES.get(payload.alias)
+            if _template is None or payload.arity not in (1, 2):
+                raise ValueError(f"Operator {payload.alias!r} has no numexpr translation.")
+            if len(stack) == 0:
+                raise ValueError("Not enough values to perform operation.")
+            if payload.arity == 1:
+                stack.append(_template.format(a = stack.pop()))
+            elif len(stack) == 1:
+                # Lone value stands as result, as in `Rpn.execute_next`.
+                break
+            else:
+                a, b = stack.pop(), stack.pop()
+                stack.append(_template.format(a = a, b = b))
+
+    if len(stack) == 0:
+        raise ValueError("Program leaves no value on the stack.")
+    return stack[-1]
+
+
+def evaluate(program: Program, bindings: dict, backend: str = "auto"):
+    """Evaluate program over arrays.
+
+    Parameters
+    ----------
+    program : Program
+        Compiled program.
+    bindings : dict
+        Array (or scalar) for each program variable.
+    backend : str
+        "numexpr", "numpy" or "auto", which uses numexpr when it is
+        installed and the program can be translated.
+
+    Returns
+    -------
+    Any
+        Result array, or scalar for programs without variables.
+
+    Raises
+    ------
+    ValueError
+        If evaluation fails or the requested backend is not available.
+    """
+    if backend not in ("auto", "numexpr", "numpy"):
+        raise ValueError(f"Unknown backend {backend!r}.")
+
+    if backend != "numpy" and numexpr is not None:
+        try:
+            _expr = to_numexpr(program)
+        except ValueError:
+            if backend == "numexpr":
+                raise
+        else:
+            return numexpr.evaluate(_expr, local_dict = {**CONSTANTS, **bindings})
+    elif backend == "numexpr":
+        raise ValueError("numexpr is not installed.")
+
+    if _vector.np is not None:
+        bindings = {k: _vector.np.asarray(v, dtype = float) for k, v in bindings.items()}
+    code, msg, value = program.run(bindings)
+    if code == 1:
+        raise ValueError(msg)
+    return value
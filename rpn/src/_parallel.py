@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Parallel evaluation of independent subtrees of one large expression.
+
+In postfix, every subtree is a contiguous slice of tokens that leaves
+exactly one value on an empty stack.  Large, disjoint subtrees are sent
+to a process pool as token slices, and each slice is replaced by its
+value before the remaining program runs in this process.  Every operator
+still sees the same operands in the same order, so the result is
+identical to a sequential run.
+"""
+
+__all__ = [
+    "evaluate_parallel",
+    "subtrees",
+    ]
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from ._rpn import ARITY_ALL, OperatorsMixin
+from ._program import Program, OP, PUSH
+
+
+def _evaluate_slice(tokens: tuple, bindings: dict) -> tuple:
+    # Workers only know the built-in operators, see `subtrees`.
+    return Program(tokens, OperatorsMixin.BUILTINS).run(bindings)
+
+
+def subtrees(program: Program, target: int, threshold: int) -> list:
+    """Return disjoint subtrees worth evaluating on their own.
+
+    Subtrees are taken as large as `target` instructions, and kept when
+    they have at least `threshold` instructions and only use built-in
+    operators.
+
+    Parameters
+    ----------
+    program : Program
+        Compiled program.
+    target : int
+        Largest subtree size to take whole.
+    threshold : int
+        Smallest subtree size worth sending to another process.
+
+    Returns
+    -------
+    list
+        (start, stop) instruction slices in program order.  Empty when
+        the program cannot be split, e.g. when it uses a whole-stack
+        reduction or runs out of operands.
+    """
+    builtins = {id(e) for e in OperatorsMixin.BUILTINS.expressions}
+    n = len(program.instructions)
+    # First instruction of the subtree ending at each instruction, its
+    # child subtrees, and whether workers can evaluate it.
+    start, children, portable = [0] * n, [()] * n, [True] * n
+    stack = []
+    for i, (kind, payload) in enumerate(program.instructions):
+        if kind == OP:
+            arity = payload.arity
+            if arity == ARITY_ALL or len(stack) < arity or len(stack) == 1 and arity != 1:
+                return []
+            _children = tuple(stack[-arity:])
+            del stack[-arity:]
+            start[i] = start[_children[0]]
+            children[i] = _children
+            portable[i] = id(payload) in builtins and all(portable[c] for c in _children)
+        else:
+            start[i] = i
+        stack.append(i)
+
+    _result = []
+    pending = list(reversed(stack))
+    while pending:
+        i = pending.pop()
+        size = i - start[i] + 1
+        if size > target:
+            pending.extend(reversed(children[i]))
+        elif size >= threshold and portable[i]:
+            _result.append((start[i], i + 1))
+    return _result
+
+
+def evaluate_parallel(program: Program, bindings: dict = None, processes: int = None,
+                      threshold: int = 1 << 14) -> tuple:
+    """Evaluate program, running large independent subtrees concurrently.
+
+    Parameters
+    ----------
+    program : Program
+        Compiled program.
+    bindings : dict
+        Values for the program's variables.  Must be picklable.
+    processes : int
+        Number of worker processes.  Defaults to `os.cpu_count()`.
+    threshold : int
+        Smallest subtree, in tokens, evaluated in a worker.
+
+    Returns
+    -------
+    tuple
+        Return code, message and value, as returned by `Program.run`.
+    """
+    bindings = bindings or {}
+    processes = processes or os.cpu_count() or 1
+    # Several subtrees per worker, so uneven subtrees balance out.
+    target = max(threshold, len(program) // (processes * 4))
+    slices = subtrees(program, target, threshold)
+    if len(slices) < 2:
+        return program.run(bindings)
+
+    with ProcessPoolExecutor(min(processes, len(slices))) as pool:
+        _jobs = [pool.submit(_evaluate_slice, program.tokens[a:b], bindings) for a, b in slices]
+        _results = [j.result() for j in _jobs]
+
+    if any(code != 0 for code, _, _ in _results):
+        # Let the sequential run report the first failure in token order.
+        return program.run(bindings)
+
+    instructions = []
+    position = 0
+    for (a, b), (_, _, value) in zip(slices, _results):
+        instructions.extend(program.instructions[position:a])
+        instructions.append((PUSH, value))
+        position = b
+    instructions.extend(program.instructions[position:])
+
+    return Program.execute(instructions, bindings)
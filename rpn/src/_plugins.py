@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Operator plugins declared through entry points.
+
+A package provides operators by declaring entry points in the
+`rpn.operators` group, named "alias/arity" and pointing at the function:
+
+    [project.entry-points."rpn.operators"]
+    "gcd/2" = "mathops.integer:gcd"
+    "spread/all" = "mathops.stats:spread"
+    "tick/1/impure" = "mathops.clock:tick"
+
+An optional "/impure" suffix marks operators whose result depends on
+more than their arguments, so engines never share or cache their
+applications; "/pure", the default, may also be given.
+
+Reading the declarations imports nothing.  Each operator is registered
+as a `LazyExpression`, whose module is imported the first time the
+operator is applied, so aliases are known at startup for free.  Like
+built-in operators, functions take the top of the stack first.
+"""
+
+__all__ = [
+    "LazyExpression",
+    "PLUGIN_GROUP",
+    "discover",
+    ]
+
+import string
+import threading
+import warnings
+from importlib.metadata import entry_points
+
+from ._rpn import ARITY_ALL, Expression
+
+PLUGIN_GROUP = "rpn.operators"
+
+
+class LazyExpression(Expression):
+    """Expression whose function is imported on first use.
+
+    Parameters
+    ----------
+    alias_or_name : str
+        Operator alias.
+    arity : int or str
+        Number of values taken from the stack, or `ARITY_ALL`.
+    loader : Callable[[], FuncReturnNum]
+        Returns the function, e.g. `EntryPoint.load`.
+    target : str
+        Where the function lives, as "module:callable".
+    pure : bool
+        See `Expression`.
+    """
+    def __init__(self, alias_or_name: str, arity, loader, target: str, pure: bool = True) -> None:
+        if len(alias_or_name) == 0:
+            raise ValueError("Alias or name needs to be at least one character long.")
+        self.alias = alias_or_name
+        self.arity = arity
+        self.pure = pure
+        self.native = False
+        self.func_string = target
+        self.signature = "(values)" if arity == ARITY_ALL else f"({', '.join(string.ascii_lowercase[:arity])})"
+        self.len_alias = len(self.alias)
+        self.len_func = len(self.func_string)
+        self.len_sig = len(self.signature)
+        self._loader = loader
+        self._function = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """Return True once the function has been imported.
+        """
+        return self._function is not None
+
+    @property
+    def function(self):
+        """Return the function, importing it on first use.
+
+        Raises
+        ------
+        ValueError
+            If the function cannot be imported.
+        """
+        if self._function is None:
+            with self._lock:
+                if self._function is None:
+                    try:
+                        self._function = self._loader()
+                    except (ImportError, AttributeError) as e:
+                        raise ValueError(f"Cannot load operator {self.alias!r} from {self.func_string}: {e}") from e
+        return self._function
+
+
+def _parse_name(name: str) -> tuple:
+    """Return alias, arity and purity from an entry point name like
+    "gcd/2" or "tick/1/impure".
+
+    Raises
+    ------
+    ValueError
+        If the name has no valid arity.
+    """
+    pure = True
+    _head, _, _flag = name.rpartition("/")
+    if _head and _flag in ("pure", "impure"):
+        pure = _flag == "pure"
+    else:
+        _head = name
+    alias, _, arity = _head.rpartition("/")
+    if not alias:
+        raise ValueError(f"Plugin operator {name!r} is not named 'alias/arity'.")
+    if arity == ARITY_ALL:
+        return alias, ARITY_ALL, pure
+    if not arity.isdigit() or int(arity) < 1:
+        raise ValueError(f"Plugin operator {name!r} has an invalid arity.")
+    return alias, int(arity), pure
+
+
+def discover(group: str = PLUGIN_GROUP) -> tuple:
+    """Return a `LazyExpression` for every operator declared in group,
+    without importing any of them.
+
+    Parameters
+    ----------
+    group : str
+        Entry point group.
+
+    Returns
+    -------
+    tuple
+        Expressions in discovery order.  Entry points not named
+        "alias/arity" are skipped with a warning.
+    """
+    _result = []
+    for ep in entry_points(group = group):
+        try:
+            alias, arity, pure = _parse_name(ep.name)
+        except ValueError as e:
+            warnings.warn(str(e))
+            continue
+        _result.append(LazyExpression(alias, arity, ep.load, ep.value, pure))
+    return tuple(_result)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compiled RPN programs.
+
+A `Program` resolves every token once: numbers are parsed, operators are
+looked up in a registry, and any other identifier becomes an input
+variable.  Running it needs no string handling and works the same on
+scalars and on vector operands, so a single run can evaluate a whole
+column of inputs.
+"""
+
+__all__ = [
+    "OP",
+    "Program",
+    "PUSH",
+    "VAR",
+    ]
+
+from ._rpn import ARITY_ALL, ComparisonMixin, Registry
+from ._types import StrList
+from . import _vector
+
+# Instruction kinds.
+PUSH = 0
+VAR = 1
+OP = 2
+
+
+class Program:
+    """RPN program compiled against an operator registry.
+
+    Parameters
+    ----------
+    tokens : StrList
+        Program tokens.
+    registry : Registry
+        Operators to resolve tokens against.
+
+    Raises
+    ------
+    ValueError
+        If a token is neither a number, literal, operator nor identifier.
+    """
+    def __init__(self, tokens: StrList, registry: Registry) -> None:
+        self.tokens = tuple(tokens)
+        self.registry = registry
+        self.instructions = []
+        _variables = {}
+
+        for i, t in enumerate(self.tokens):
+            if ComparisonMixin.is_number(t):
+                self.instructions.append((PUSH, float(t)))
+            elif t in registry.aliases:
+                self.instructions.append((OP, registry.expressions[registry.index(t)]))
+            elif _vector.is_literal(t):
+                self.instructions.append((PUSH, _vector.parse(t)))
+            elif t.isidentifier():
+                _variables.setdefault(t, None)
+                self.instructions.append((VAR, t))
+            else:
+                raise ValueError(f"Invalid token {t!r} at position {i}.")
+
+        self.variables = tuple(_variables)
+
+    def __repr__(self):
+        return f"<Program {' '.join(self.tokens)} >"
+
+    def __len__(self) -> int:
+        return len(self.instructions)
+
+    @property
+    def pure(self) -> bool:
+        """Return True if every operator is pure, so results depend on the
+        bindings alone.
+        """
+        return all(kind != OP or payload.pure for kind, payload in self.instructions)
+
+    @property
+    def elementwise(self) -> bool:
+        """Return True if one run over vector bindings gives the same
+        results as one run per row: every operator is pure and applied
+        element by element, and no vector literal is pushed.  Reductions,
+        `dot` and `matmul` mix rows together.
+        """
+        for kind, payload in self.instructions:
+            if kind == PUSH and _vector.is_operand(payload):
+                return False
+            if kind == OP and (not payload.pure or payload.native or payload.arity == ARITY_ALL
+                               or payload.alias in _vector.NATIVE):
+                return False
+        return True
+
+    def run(self, bindings: dict = None) -> tuple:
+        """Execute program with the same semantics as feeding its tokens
+        to `Rpn.evaluate`.
+
+        Parameters
+        ----------
+        bindings : dict
+            Values for the program's variables.  Values can be scalars or
+            vector operands; vectors evaluate every element in one run.
+
+        Returns
+        -------
+        tuple
+            Return code, message and value on top of the stack (None if empty).
+        """
+        return self.execute(self.instructions, bindings)
+
+    @staticmethod
+    def execute(instructions, bindings: dict = None, stack: list = None) -> tuple:
+        """Execute (kind, payload) instructions, as held by `instructions`
+        or yielded lazily by `_lexer.lex`.
+
+        Parameters
+        ----------
+        instructions : Iterable[tuple]
+            Instructions in program order.
+        bindings : dict
+            Values for the program's variables.
+        stack : list
+            Values to start from, bottom first.  The list is updated in
+            place, so callers can carry a stack from one run to the next.
+
+        Returns
+        -------
+        tuple
+            Return code, message and value on top of the stack (None if empty).
+        """
+        bindings = bindings or {}
+        stack = [] if stack is None else stack
+        scalars = _vector.SCALARS
+        try:
+            for kind, payload in instructions:
+                if kind == PUSH:
+                    stack.append(payload)
+                elif kind == VAR:
+                    stack.append(bindings[payload])
+                else:
+                    arity = payload.arity
+                    if len(stack) == 0:
+                        return 1, "Not enough values to perform operation.", None
+
+                    if arity == ARITY_ALL:
+                        if any(map(_vector.is_operand, stack)):
+                            return 1, f"Operator {payload.alias!r} takes scalar values only.", None
+                        try:
+                            _result = payload.function(reversed(stack))
+                        except TypeError:
+                            return 1, f"Operator {payload.alias!r} takes scalar values only.", None
+                        stack[:] = _result if isinstance(_result, list) else [_result]
+
+                    elif arity == 1:
+                        a = stack.pop()
+                        stack.append(payload.function(a) if type(a) in scalars else _vector.apply(payload, a))
+
+                    elif len(stack) == 1:
+                        # Mirrors `Rpn.execute_next`: the lone value stands as result.
+                        return -1, "", stack[-1]
+
+                    elif len(stack) < arity:
+                        return 1, "Not enough values to perform operation.", None
+
+                    else:
+                        args = [stack.pop() for _ in range(arity)]
+                        if all(type(v) in scalars for v in args):
+                            stack.append(payload.function(*args))
+                        else:
+                            stack.append(_vector.apply(payload, *args))
+
+        except KeyError as e:
+            return 1, f"Missing value for variable {e.args[0]!r}.", None
+        except (ArithmeticError, ValueError) as e:
+            return 1, str(e), None
+
+        return 0, "", stack[-1] if stack else None
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Single-pass reductions over a whole stack.
+
+Each function takes any iterable of numbers, so the persistent stack can
+be passed as is, top value first, without building a list.
+"""
+
+__all__ = [
+    "mean",
+    "median",
+    "top_k",
+    "variance",
+    "stdev",
+    "welford",
+    ]
+
+import math
+import heapq
+import statistics
+
+from ._types import FloatList, Num
+
+
+def welford(values) -> tuple:
+    """Return count, mean and sum of squared deviations from the mean
+    using Welford's online algorithm.
+
+    Returns
+    -------
+    tuple
+        (n, mean, m2)
+    """
+    n, _mean, m2 = 0, 0.0, 0.0
+    for x in values:
+        n += 1
+        delta = x - _mean
+        _mean += delta / n
+        m2 += delta * (x - _mean)
+    return n, _mean, m2
+
+
+def mean(values) -> float:
+    """Return arithmetic mean, summed with `math.fsum`.
+    """
+    if not hasattr(values, "__len__"):
+        values = list(values)
+    return math.fsum(values) / len(values) if len(values) else math.nan
+
+
+def variance(values) -> float:
+    """Return sample variance, or NaN for fewer than two values.
+    """
+    n, _, m2 = welford(values)
+    return m2 / (n - 1) if n > 1 else math.nan
+
+
+def stdev(values) -> float:
+    """Return sample standard deviation, or NaN for fewer than two values.
+    """
+    return math.sqrt(variance(values))
+
+
+def median(values) -> Num:
+    """Return median value.
+    """
+    return statistics.median(values)
+
+
+def top_k(values) -> FloatList:
+    """Return the k largest of the remaining values in ascending order,
+    where k is the first value.
+
+    Returns
+    -------
+    FloatList
+        Values to push, so that the largest one ends up on top.
+
+    Raises
+    ------
+    ValueError
+        If k is not a positive integer.
+    """
+    it = iter(values)
+    k = next(it)
+    if not math.isfinite(k) or k != int(k) or k < 1:
+        raise ValueError(f"Count must be a positive integer, not {k!r}.")
+    k = int(k)
+    _result = heapq.nlargest(k, it)
+    _result.reverse()
+    return _result
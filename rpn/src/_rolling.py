@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Rolling window operators over a stream of values.
+
+    x N rsum    Sum of the last N values of x.
+    x N rmean   Mean of the last N values of x.
+    x N rmin    Least of the last N values of x.
+    x N rmax    Greatest of the last N values of x.
+    x a ewma    Exponentially weighted moving average, s += a * (x - s),
+                with 0 < a <= 1.
+
+Each operator keeps one window per parameter, so `x 5 rmean` and
+`x 20 rmean` in the same stream do not share values.  Windows belong to
+the `Rolling` instance, one per `Rpn`, and outlive the stack: they carry
+across `execute_next` calls, results, compiled programs, CSV chunks and
+lines of `--stream`.  A vector operand is fed to the window in order and
+gives a vector of the values seen after each element.
+
+Every update is O(1) amortized.  `rsum` and `rmean` keep a running
+total, recomputed with `math.fsum` once per N updates so rounding error
+cannot build up, and count non-finite values apart so an infinity that
+has left the window no longer affects the sum.  `rmin` and `rmax` keep
+a monotonic deque of candidates.  A NaN in the window makes the result
+NaN until it leaves.
+"""
+
+__all__ = [
+    "OPERATORS",
+    "Ewma",
+    "Rolling",
+    "RollingExtreme",
+    "RollingSum",
+    ]
+
+import math
+import operator
+from collections import deque
+
+from . import _vector
+
+OPERATORS = ("rsum", "rmean", "rmin", "rmax", "ewma")
+
+
+class RollingSum:
+    """Sum, or mean, of the last `size` values.
+    """
+    def __init__(self, size: int, mean: bool = False) -> None:
+        self.size = size
+        self.mean = mean
+        self.values = deque()
+        self._total = 0.0
+        self._updates = 0
+        # Counts of NaN, +inf and -inf values in the window.
+        self._nan = self._pos = self._neg = 0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __count(self, x: float, n: int) -> bool:
+        # Count non-finite x; return False for finite ones.
+        if x != x:
+            self._nan += n
+        elif x == math.inf:
+            self._pos += n
+        elif x == -math.inf:
+            self._neg += n
+        else:
+            return False
+        return True
+
+    def update(self, x: float) -> float:
+        """Add value to window and return the new sum or mean.
+        """
+        self.values.append(x)
+        if not self.__count(x, 1):
+            self._total += x
+        if len(self.values) > self.size:
+            _old = self.values.popleft()
+            if not self.__count(_old, -1):
+                self._total -= _old
+        self._updates += 1
+        if self._updates >= self.size:
+            self._total = math.fsum(v for v in self.values if math.isfinite(v))
+            self._updates = 0
+
+        if self._nan or (self._pos and self._neg):
+            _result = math.nan
+        elif self._pos:
+            _result = math.inf
+        elif self._neg:
+            _result = -math.inf
+        else:
+            _result = self._total
+        return _result / len(self.values) if self.mean else _result
+
+
+class RollingExtreme:
+    """Least, or greatest, of the last `size` values.
+    """
+    def __init__(self, size: int, greatest: bool = False) -> None:
+        self.size = size
+        # Candidates as (position, value); values increase from the front
+        # for the least, and decrease for the greatest.
+        self.values = deque()
+        self._nans = deque()
+        self._beaten = operator.le if greatest else operator.ge
+        self._seen = 0
+
+    def __len__(self) -> int:
+        return min(self._seen, self.size)
+
+    def update(self, x: float) -> float:
+        """Add value to window and return the new extreme.
+        """
+        i = self._seen
+        self._seen += 1
+        if x != x:
+            self._nans.append(i)
+        else:
+            while self.values and self._beaten(self.values[-1][1], x):
+                self.values.pop()
+            self.values.append((i, x))
+        _start = self._seen - self.size
+        while self.values and self.values[0][0] < _start:
+            self.values.popleft()
+        while self._nans and self._nans[0] < _start:
+            self._nans.popleft()
+        return math.nan if self._nans else self.values[0][1]
+
+
+class Ewma:
+    """Exponentially weighted moving average with smoothing factor `alpha`.
+    """
+    def __init__(self, alpha: float) -> None:
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, x: float) -> float:
+        """Add value and return the new average; the first value starts it.
+        """
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+def _window(n) -> int:
+    if type(n) not in _vector.SCALARS or not math.isfinite(n) or n != int(n) or n < 1:
+        raise ValueError(f"Window must be a positive integer, not {n!r}.")
+    return int(n)
+
+
+def _alpha(a) -> float:
+    if type(a) not in _vector.SCALARS or not 0 < a <= 1:
+        raise ValueError(f"Smoothing factor must be in (0, 1], not {a!r}.")
+    return float(a)
+
+
+# Operators as (parameter check, state factory).
+_STATES = {
+    "rsum": (_window, lambda n: RollingSum(n)),
+    "rmean": (_window, lambda n: RollingSum(n, mean = True)),
+    "rmin": (_window, lambda n: RollingExtreme(n)),
+    "rmax": (_window, lambda n: RollingExtreme(n, greatest = True)),
+    "ewma": (_alpha, Ewma),
+}
+
+
+class Rolling:
+    """Windows of one `Rpn`, and the operators that update them.
+
+    Operators are built per instance, as each closes over its windows,
+    and are impure, so no engine shares or reorders their applications.
+    """
+    def __init__(self) -> None:
+        from ._rpn import Expression
+        self.windows = {}
+        self.expressions = tuple(
+            Expression(alias, self.__operator(alias), func_string = f"rolling {alias} of b over a",
+                       pure = False, native = True)
+            for alias in OPERATORS
+            )
+
+    def __operator(self, alias: str):
+        check, factory = _STATES[alias]
+
+        def rolling(a, b):
+            # `a` is the window or factor on top of the stack, `b` the value.
+            _param = check(a)
+            _np = _vector.np
+            _ndim = b.ndim if _np is not None and isinstance(b, (_np.ndarray, _np.generic)) else (
+                0 if type(b) in _vector.SCALARS else 1 + isinstance(b, list))
+            if _ndim > 1:
+                raise ValueError(f"Operator {alias!r} takes scalars or vectors only.")
+            _state = self.windows.get((alias, _param))
+            if _state is None:
+                _state = self.windows[(alias, _param)] = factory(_param)
+            if _ndim == 0:
+                return _state.update(float(b))
+            if _np is not None and isinstance(b, _np.ndarray):
+                return _np.fromiter((_state.update(float(v)) for v in b), dtype = float, count = len(b))
+            return _vector.as_operand([_state.update(v) for v in b])
+
+        return rolling
+
+    def clear(self) -> None:
+        """Forget every window.
+        """
+        self.windows.clear()
+
+    def describe(self) -> list:
+        """Return one line per window: operator, parameter, and the values
+        held, or the average so far for `ewma`.
+        """
+        return [f"{alias} {param:g}: " + (f"{s.value!r}" if isinstance(s, Ewma) else f"{len(s)} value(s)")
+                for (alias, param), s in self.windows.items()]
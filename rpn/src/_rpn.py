@@ -2,19 +2,23 @@
 # -*- coding: utf-8 -*-
 
 __all__ = [
+    "ARITY_ALL",
     "ComparisonMixin",
     "Expression",
     "OperatorsMixin",
     "Rpn",
+    "Trail",
     ]
 
 import re
-import heapq
+import mmap
+import time
 import inspect
+import threading
+from itertools import islice
 from collections import deque
 
 import math
-import statistics
 
 from ._types import (
     Any,
@@ -30,6 +34,23 @@ from ._types import (
     TupIntHomo,
     TupStrHomo,
     )
+from ._stack import PStack
+from . import _approx, _reduce, _rolling, _snapshot, _vector
+from ._budget import (
+    Budget,
+    BUDGET_DEPTH,
+    BUDGET_MAGNITUDE,
+    BUDGET_TIME,
+    BUDGET_TOKENS,
+    CANCELLED,
+    )
+
+
+# Arity of expressions that reduce the whole stack.
+ARITY_ALL = "all"
+
+# Operators listed per page by `OperatorsMixin.descriptions`.
+DESCRIPTIONS_PAGE_SIZE = 40
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -44,14 +65,33 @@ class Expression:
         Math operator or alias of expression to create.
     cb_function : FuncReturnNum
         Callback function, or main expression to create.
+    func_string : str
+        Description of the function.  Read from the function's
+        source code if not provided.
+    arity : int or str
+        Number of values taken from the stack.  Defaults to the number
+        of parameters of `cb_function`.  `ARITY_ALL` expressions receive
+        the whole stack as one iterable, top value first, and replace it
+        with their result, which may be a single value or a list.
+    pure : bool
+        Whether the result depends on the arguments alone, so that equal
+        applications can be evaluated once and shared.
+    native : bool
+        Whether `cb_function` handles vector operands itself, rather
+        than being applied element by element.
     """
-    def __init__(self, alias_or_name: str, cb_function: FuncReturnNum = None):
+    def __init__(self, alias_or_name: str, cb_function: FuncReturnNum = None, func_string: str = None, arity = None,
+                 pure: bool = True, native: bool = False):
         if len(alias_or_name) > 0:
             self.alias = alias_or_name
         else:
             raise ValueError("Alias or name needs to be at least one character long.")
 
         self.function = cb_function
+        self.func_string = func_string
+        self.arity = arity
+        self.pure = pure
+        self.native = native
         self.__set_attrs()
 
     def __set_lengths(self) -> None:
@@ -64,8 +104,12 @@ class Expression:
     def __set_attrs(self) -> None:
         """Process and set attributes for a given expression instance.
         """
-        self.signature = str(inspect.signature(self.function))
-        self.func_string = self.process_function(self.function)
+        _sig = inspect.signature(self.function)
+        self.signature = str(_sig)
+        if self.arity is None:
+            self.arity = len(_sig.parameters)
+        if self.func_string is None:
+            self.func_string = self.process_function(self.function)
         self.__set_lengths()
 
     @staticmethod
@@ -121,57 +165,193 @@ class Expression:
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class Registry:
+    """Immutable table of expressions with alias lookup.
+
+    Updates return a new registry, so a registry can be shared between
+    any number of instances and threads without locking.
+
+    Parameters
+    ----------
+    expressions : Iterable[Expression]
+        Expressions in lookup order.  The first one wins for duplicate aliases.
+    """
+    __slots__ = ("expressions", "positions", "aliases")
+
+    def __init__(self, expressions = ()) -> None:
+        self.expressions = tuple(expressions)
+        _positions = {}
+        for i, e in enumerate(self.expressions):
+            _positions.setdefault(e.alias, i)
+        self.positions = _positions
+        self.aliases = frozenset(_positions)
+
+    def __len__(self) -> int:
+        return len(self.expressions)
+
+    def index(self, alias: str) -> int:
+        """Return index of alias, or -1 if not registered.
+        """
+        return self.positions.get(alias, -1)
+
+    def added(self, expr: Expression) -> "Registry":
+        """Return new registry with expression appended.
+        """
+        return Registry(self.expressions + (expr,))
+
+    def removed(self, n: int) -> "Registry":
+        """Return new registry without the expression at index n.
+        """
+        return Registry(self.expressions[:n] + self.expressions[n + 1:])
+
+
 class OperatorsMixin:
     """Operators mixin.
     
     Class handles some of the mundane tasks related to 
     simple math expressions.
+
+    Operator tables are immutable.  Each instance starts out with
+    `BUILTINS` and its own rolling window operators, see `_rolling`, and
+    swaps in a new `Registry` when operators are added or removed,
+    leaving every other instance untouched.
+
+    `set_approximate` swaps the transcendental operators for the faster,
+    table-driven ones in `_approx`.
     """
 
     CAPTURE_FUNC_REGEX: str = r"(?:.+:)\s*(.+),"
 
     # Operations with two parameters.
-    OPS_DOUBLE_ARG = [
+    OPS_DOUBLE_ARG = (
         Expression("+", lambda a, b: math.fsum([a, b])),
         Expression("-", lambda a, b: b - a),
         Expression("*", lambda a, b: b * a),
         Expression("/", lambda a, b: b / a if a != 0 else math.inf),
         Expression("^", lambda a, b: math.pow(b, a)),
         Expression("log", lambda n, base: math.log(n, base)),
-    ]
+    )
 
-    OPS_SINGLE_ARG = [
+    OPS_SINGLE_ARG = (
         Expression("log", lambda n, base: math.log(n, base)),
         Expression("sin", lambda n: math.sin(n)),
         Expression("cos", lambda n: math.cos(n)),
-        Expression("tanh", lambda n: math.tan(n)),
+        Expression("tanh", lambda n: math.tanh(n)),
         Expression("acos", lambda n: math.acos(n)),
         Expression("e", lambda n: math.exp(n)),
-    ]
+    )
 
-    NUMBERS = set(map(str, range(10))).union(set(map(str, [i*-1 for i in range(1, 10)])))
+    # Operations that reduce the whole stack in one pass.
+    OPS_REDUCE = (
+        Expression("sum", arity = ARITY_ALL, cb_function = lambda values: math.fsum(values)),
+        Expression("mean", arity = ARITY_ALL, cb_function = lambda values: _reduce.mean(values)),
+        Expression("var", arity = ARITY_ALL, cb_function = lambda values: _reduce.variance(values)),
+        Expression("stdev", arity = ARITY_ALL, cb_function = lambda values: _reduce.stdev(values)),
+        Expression("min", arity = ARITY_ALL, cb_function = lambda values: min(values)),
+        Expression("max", arity = ARITY_ALL, cb_function = lambda values: max(values)),
+        Expression("median", arity = ARITY_ALL, cb_function = lambda values: _reduce.median(values)),
+        Expression("topk", arity = ARITY_ALL, cb_function = lambda values: _reduce.top_k(values)),
+    )
+
+    # Operations on vector and matrix operands.
+    OPS_VECTOR = (
+        Expression("dot", lambda a, b: _vector.dot(b, a)),
+        Expression("matmul", lambda a, b: _vector.matmul(b, a)),
+    )
+
+    BUILTINS = Registry(OPS_DOUBLE_ARG + OPS_SINGLE_ARG + OPS_REDUCE + OPS_VECTOR)
+
+    NUMBERS = frozenset(map(str, range(10))).union(map(str, [i*-1 for i in range(1, 10)]))
 
     def __init__(self) -> None:
         self.description_cols = "Oper", "Args", "Function"
-        self.OPS_DOUBLE_ARG.extend(self.OPS_SINGLE_ARG)
+        self._registry_lock = threading.Lock()
+        self._approx = None
+        self._catalog = None
+        self.rolling = _rolling.Rolling()
+        self.__set_registry(Registry(self.BUILTINS.expressions + self.rolling.expressions))
+
+    def __set_registry(self, registry: Registry) -> None:
+        self.registry = registry
+        self.OPS_DOUBLE_ARG = registry.expressions
+
+    def __remove_nth(self, n: int) -> None:
+        # Caller holds `_registry_lock`.
+        _expr = self.registry.expressions[n]
+        self.__set_registry(self.registry.removed(n))
+        if self._catalog is not None:
+            self._catalog.remove(_expr)
 
-    def __update_ops(self):
-        self.OPS_DOUBLE_ARG.extend(self.OPS_SINGLE_ARG)
+    @property
+    def catalog(self) -> "Catalog":
+        """Return searchable operator table, built on first use and then
+        kept up to date as operators are added and removed.
+        """
+        with self._registry_lock:
+            if self._catalog is None:
+                from ._catalog import Catalog
+                self._catalog = Catalog(self.registry.expressions, self.description_cols)
+            return self._catalog
+
+    @property
+    def operators(self) -> frozenset:
+        return self.registry.aliases
 
     @property
-    def operators(self):
-        return set([o.alias for o in self.OPS_DOUBLE_ARG])
+    def custom_expressions(self) -> list:
+        """Return expressions that are not part of `BUILTINS`, nor rolling
+        or approximate operators.
+        """
+        _approx = self._approx.expressions if self._approx is not None else ()
+        return [e for e in self.registry.expressions
+                if e not in self.BUILTINS.expressions and e not in self.rolling.expressions and e not in _approx]
+
+    @property
+    def approximate(self) -> bool:
+        """Return True if approximate transcendental operators are in use.
+        """
+        return self._approx is not None
+
+    def set_approximate(self, enabled: bool = True, table_size: int = 4096) -> None:
+        """Select approximate or exact `sin`, `cos`, `tanh`, `acos`, `e`
+        and `log`.  Other operators, custom ones included, are kept.
+
+        Parameters
+        ----------
+        enabled : bool
+            True for the approximate operator set, False for `math`.
+        table_size : int
+            Intervals per lookup table, a power of two.  See `_approx`
+            for the error bound each size gives.
+
+        Returns
+        -------
+        None
+        """
+        with self._registry_lock:
+            _old = self._approx.expressions if self._approx is not None else ()
+            _set = _approx.approx_set(table_size) if enabled else None
+            _new = {e.alias: e for e in (_set.expressions if _set is not None else ())}
+            # Built-in operators by alias, in order, as `log` is listed twice.
+            _exact = {}
+            for e in self.BUILTINS.expressions:
+                _exact.setdefault(e.alias, []).append(e)
+            _replaced = []
+            for e in self.registry.expressions:
+                if e in _old:
+                    e = _exact[e.alias].pop(0)
+                if e in self.BUILTINS.expressions:
+                    e = _new.get(e.alias, e)
+                _replaced.append(e)
+            self._approx = _set
+            self._catalog = None
+            self.__set_registry(Registry(_replaced))
 
     def del_nth(self, n):
-        """Use `deque` library to remove item
-        from OPS_DOUBLE_ARG list by the item's index.
+        """Remove item from OPS_DOUBLE_ARG by the item's index.
         """
-        ops = self.OPS_DOUBLE_ARG
-        d = deque(ops)
-        d.rotate(-n)
-        d.popleft()
-        d.rotate(n)
-        self.OPS_DOUBLE_ARG = list(d)
+        with self._registry_lock:
+            self.__remove_nth(n)
 
     def operation_index(self, lookup_value: str) -> int:
         """Return index related to lookup_value, which should be 
@@ -181,20 +361,60 @@ class OperatorsMixin:
         -------
         int      
         """
-        _tmp  = (i for i, o in enumerate(self.OPS_DOUBLE_ARG) if o.alias == lookup_value)
-        return next(_tmp, -1)
+        return self.registry.index(lookup_value)
+
+    def load_plugins(self, group: str = "rpn.operators") -> int:
+        """Register operators declared by installed packages, see
+        `_plugins`.  Their modules are only imported on first use.
+
+        Parameters
+        ----------
+        group : str
+            Entry point group to read.
+
+        Returns
+        -------
+        int
+            Number of operators registered.  Aliases already taken are skipped.
+        """
+        from ._plugins import discover
+        return sum(self.register_expression(e) for e in discover(group))
+
+    def register_expression(self, e: Expression) -> bool:
+        """Add expression to this instance's registry unless its alias
+        is already taken.
+
+        Returns
+        -------
+        bool
+            True if expression was added.
+        """
+        with self._registry_lock:
+            if e.alias in self.registry.aliases:
+                return False
+            self.__set_registry(self.registry.added(e))
+            if self._catalog is not None:
+                self._catalog.add(e)
+            return True
 
-    def add_expression(self, sig: str, fn: str) -> None:
+    def add_expression(self, sig: str, fn: str, pure: bool = True) -> None:
         """Add new function to OPS_DOUBLE_ARG.
 
+        Parameters
+        ----------
+        sig : str
+            Operator alias.
+        fn : FuncReturnNum
+            Function taking the top of the stack first.
+        pure : bool
+            Set to False for functions with side effects or randomness,
+            so that batch compilation never shares their results.
+
         Returns
         -------
         None        
         """
-        e = Expression(sig, fn)
-        if not e.alias in self.operators:
-            self.OPS_DOUBLE_ARG.append(e)
-            self.set_length_data()
+        self.register_expression(Expression(sig, fn, pure = pure))
 
     def remove_expression(self, operator_alias: str) -> None:
         """Delete item from OPS_DOUBLE_ARG collection by key.
@@ -203,9 +423,10 @@ class OperatorsMixin:
         -------
         None        
         """
-        _idx = self.operation_index(operator_alias)
-        if _idx > -1:
-            self.del_nth(_idx)
+        with self._registry_lock:
+            _idx = self.registry.index(operator_alias)
+            if _idx > -1:
+                self.__remove_nth(_idx)
 
 
     def clean_up_whitespace(self, obj: str) -> str:
@@ -243,22 +464,7 @@ class OperatorsMixin:
         IntList
             List of integer values representing text padding for each column.
         """
-        _max_len_list = [0] * 3
-
-        for e in self.OPS_DOUBLE_ARG:
-            for i, length in enumerate(e.lengths):
-                if length > _max_len_list[i]:
-                    _max_len_list[i] = length
-
-        # Consider if column heading is wider than the max
-        # width for a given column.
-        for i, c in enumerate(self.description_cols):
-            if len(c) > _max_len_list[i]:
-                _max_len_list[i] = len(c)
-            
-        # Add padding to columns.
-        p = self.__norm_padding(_padding)
-        return [int(n * p) for n in _max_len_list]
+        return self.catalog.widths(self.__norm_padding(_padding))
         
     
     def __norm_padding(self, p) -> float:
@@ -272,7 +478,8 @@ class OperatorsMixin:
         return p if p < 10.0 else p / 100
 
 
-    def descriptions(self, padding = 1.5) -> None:
+    def descriptions(self, padding = 1.5, pattern: str = None, page: int = 1,
+                     page_size: int = DESCRIPTIONS_PAGE_SIZE) -> None:
         """Print out basic table of operators, signatures, and expressions.
         
         Parameters
@@ -280,21 +487,28 @@ class OperatorsMixin:
         padding : float
             Amount to pad columns by.  If greater than or equal to 10.0, will 
             divide by 100.
+        pattern : str
+            Only list operators whose alias matches, see `Catalog.aliases`.
+        page : int
+            Page to print, counting from 1, when more operators match
+            than fit on one page.
+        page_size : int
+            Operators per page.
 
         Returns
         -------
         None            
         """
-        max_len_list = self.set_length_data(padding)
-
-        _msg = []
-        _submsg = "".join([f"{c:<{l}}" for c, l in zip(self.description_cols, max_len_list)])
-        _msg.append(_submsg)
-        _msg.append("-" * sum(max_len_list))
+        _catalog = self.catalog
+        _matches = _catalog.search(pattern)
+        _pages = max(1, -(-len(_matches) // page_size))
+        page = min(max(page, 1), _pages)
 
-        for expr in self.OPS_DOUBLE_ARG:
-            _submsg = "".join([f"{e:<{L}}" for e, L in zip(expr.values, max_len_list)])
-            _msg.append(_submsg)
+        _msg = _catalog.render(_matches[(page - 1) * page_size:page * page_size], padding)
+        if _pages > 1:
+            _msg.append(f"Page {page} of {_pages} ({len(_matches)} operators).")
+        elif pattern and not _matches:
+            _msg.append(f"No operators match {pattern!r}.")
 
         # Little room for easier reading on prompt.
         _msg.insert(0, "")
@@ -379,31 +593,132 @@ class ComparisonMixin:
         return _result
 
 
+class Trail:
+    """Record of tokens executed since the last reset, with a stack
+    checkpoint stored every `every` tokens.
+
+    Trails are immutable: `record` returns a new trail sharing every
+    token and checkpoint with the one it was derived from.  Since the
+    stack is persistent as well, a checkpoint costs a single reference.
+
+    Parameters
+    ----------
+    every : int
+        Number of tokens between two checkpoints.
+    """
+    __slots__ = ("every", "nodes", "checkpoints")
+
+    def __init__(self, every: int = 64, nodes: PStack = PStack.EMPTY,
+                 checkpoints: PStack = None) -> None:
+        if every < 1:
+            raise ValueError("Checkpoint interval needs to be at least 1.")
+        self.every = every
+        self.nodes = nodes
+        # Checkpoints are (position, stack) pairs, latest on top.
+        self.checkpoints = checkpoints if checkpoints is not None else PStack.EMPTY.push((0, PStack.EMPTY))
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def tokens(self) -> StrList:
+        """Return recorded tokens in execution order.
+        """
+        return self.nodes.to_list()
+
+    @property
+    def positions(self) -> IntList:
+        """Return checkpoint positions in ascending order.
+        """
+        return [p for p, _ in self.checkpoints.to_list()]
+
+    @property
+    def states(self) -> List[PStack]:
+        """Return checkpoint stacks in ascending order of position.
+        """
+        return [s for _, s in self.checkpoints.to_list()]
+
+    def record(self, token: str, stack: PStack) -> "Trail":
+        """Return new trail with executed token appended, checkpointing
+        the stack if due.
+        """
+        _nodes = self.nodes.push(token)
+        _checkpoints = self.checkpoints
+        if len(_nodes) % self.every == 0:
+            _checkpoints = _checkpoints.push((len(_nodes), stack))
+        return Trail(self.every, _nodes, _checkpoints)
+
+    def nearest(self, position: int) -> tuple:
+        """Return latest checkpoint at or before position.
+
+        Returns
+        -------
+        tuple
+            Checkpoint position and stack state at that position.
+        """
+        for _pos, _state in self.checkpoints:
+            if _pos <= position:
+                return _pos, _state
+
+    def branch(self, position: int) -> "Trail":
+        """Return trail holding the first `position` tokens, which
+        must be a checkpoint position, and every checkpoint up to it.
+        """
+        _checkpoints = self.checkpoints
+        while _checkpoints.head[0] > position:
+            _checkpoints = _checkpoints.tail
+        return Trail(self.every, self.nodes.drop(len(self) - position), _checkpoints)
+
+
 class Rpn(OperatorsMixin, ComparisonMixin):
     """Main Reverse Polish Notation (RPN) class.
+
+    The stack is persistent, so every step can be undone and redone
+    at the cost of one stored reference.
+
+    Parameters
+    ----------
+    checkpoint_every : int
+        Number of executed tokens between stack checkpoints.
+    history_depth : int
+        Maximum number of steps that can be undone.
     """
-    def __init__(self) -> None:
+    def __init__(self, checkpoint_every: int = 64, history_depth: int = 100) -> None:
         super().__init__()
-        self.stacker = []
+        self.stack = PStack.EMPTY
         self.current_char = None
+        self.trail = Trail(checkpoint_every)
+        self.undo_states = deque(maxlen = history_depth)
+        self.redo_states = []
+        # Attach a `_trace.Tracer` to record every executed token.
+        self.tracer = None
 
     def __repr__(self):
         return f"<RPN {self.stacker} >"
 
 
     def __str__(self):
-        _msg = "None"
-        if len(self.stacker) > 0:
-            if len(self.stacker) == 1:
-                return f"{self.stacker[-1]}"
+        if len(self.stack) > 0:
+            if len(self.stack) == 1:
+                return f"{self.stack.head}"
             return f"{self.stacker}"
         return "None"
 
+    @property
+    def stacker(self) -> FloatList:
+        """Return stack as list, ordered from bottom to top.
+        """
+        return self.stack.to_list()
+
+    @stacker.setter
+    def stacker(self, values: FloatList) -> None:
+        self.stack = PStack.from_iterable(values)
+
     @property
     def stack_size(self) -> int:
         """Return size of current stacker.
         """
-        return len(self.stacker)
+        return len(self.stack)
 
     @property
     def remove_last(self) -> None:
@@ -414,8 +729,9 @@ class Rpn(OperatorsMixin, ComparisonMixin):
         -------
         None        
         """
-        if len(self.stacker) > 0:
-            self.stacker = self.stacker[:-1]
+        if len(self.stack) > 0:
+            self.save_state()
+            self.stack = self.stack.tail
     
     @property
     def reset(self) -> None:
@@ -425,7 +741,9 @@ class Rpn(OperatorsMixin, ComparisonMixin):
         -------
         None        
         """
-        self.stacker.clear()
+        self.save_state()
+        self.stack = PStack.EMPTY
+        self.trail = Trail(self.trail.every)
 
     @property
     def status(self) -> FloatList:
@@ -455,16 +773,254 @@ class Rpn(OperatorsMixin, ComparisonMixin):
         _result = 0
 
         # Check if stack contains final value.
-        if len(self.stacker) > 0:
+        if len(self.stack) > 0:
             # Set result to final value if True.
-            _result = self.stacker[-1]
+            _result = self.stack.head
 
             if self.is_int(f"{_result}"):
                 _result = int(_result)
 
         return _result
 
-    def execute_next(self, new_char: str) -> None:
+    def save_state(self) -> None:
+        """Store current stack and trail for `undo`, discarding any
+        steps that were available to `redo`.
+        """
+        self.undo_states.append((self.stack, self.trail))
+        self.redo_states.clear()
+
+    def undo(self) -> bool:
+        """Restore state from before the last step.
+
+        Returns
+        -------
+        bool
+            False if there was nothing to undo.
+        """
+        if len(self.undo_states) == 0:
+            return False
+        self.redo_states.append((self.stack, self.trail))
+        self.stack, self.trail = self.undo_states.pop()
+        return True
+
+    def redo(self) -> bool:
+        """Re-apply the last undone step.
+
+        Returns
+        -------
+        bool
+            False if there was nothing to redo.
+        """
+        if len(self.redo_states) == 0:
+            return False
+        self.undo_states.append((self.stack, self.trail))
+        self.stack, self.trail = self.redo_states.pop()
+        return True
+
+    def snapshot(self) -> bytes:
+        """Serialize stack, trail tokens and the aliases of custom operators.
+
+        Returns
+        -------
+        bytes
+            Snapshot in the format described in `_snapshot`.
+        """
+        _values = self.stacker
+        if any(_vector.is_operand(v) for v in _values):
+            raise ValueError("Only stacks of scalar values can be saved.")
+        from ._plugins import LazyExpression
+        # Plugin operators are found again by `load_plugins`, not saved.
+        _ops = [e.alias for e in self.custom_expressions if not isinstance(e, LazyExpression)]
+        return _snapshot.dumps(_values, self.trail.tokens, _ops)
+
+    def restore(self, data) -> None:
+        """Replace session state with the one held in a snapshot.
+
+        Snapshots name custom operators but hold no code, so every one
+        of them must be registered on this instance before restoring.
+
+        Parameters
+        ----------
+        data : bytes-like
+            Output of `snapshot`, or a buffer over it.
+
+        Raises
+        ------
+        ValueError
+            If data is not a snapshot, or an operator it uses is not
+            registered.  State is left unchanged.
+        """
+        _values, _history, _ops = _snapshot.loads(data)
+        _missing = [alias for alias in _ops if alias not in self.operators]
+        if _missing:
+            raise ValueError(f"Register operator(s) {', '.join(map(repr, _missing))} before restoring this snapshot.")
+
+        self.save_state()
+        self.stack = PStack.from_iterable(_values)
+        self.trail = Trail(self.trail.every, PStack.from_iterable(_history))
+
+    def save(self, path: str) -> None:
+        """Write snapshot of session to file.
+        """
+        with open(path, "wb") as f:
+            f.write(self.snapshot())
+
+    def load(self, path: str) -> None:
+        """Restore session from file written by `save`.  The file is
+        memory-mapped rather than read into memory.
+        """
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+                self.restore(mm)
+
+    def compile(self, expr) -> "Program":
+        """Compile expression against this instance's operators.
+
+        Parameters
+        ----------
+        expr : str or StrList
+            Expression string or list of tokens.
+
+        Returns
+        -------
+        Program
+        """
+        # Imported here, as `_program` builds on this module.
+        from ._program import Program
+        tokens = self.clean_up_whitespace(expr).split() if isinstance(expr, str) else expr
+        return Program(tokens, self.registry)
+
+    def evaluate_mapped(self, expr, inputs: dict, out: str, chunk_size: int = 1 << 16) -> int:
+        """Evaluate expression over memory-mapped float64 column files,
+        one chunk at a time, writing results to a memory-mapped file.
+
+        Parameters
+        ----------
+        expr : str or StrList
+            Expression, where identifiers that are not operators are variables.
+        inputs : dict
+            Path of the input column for each variable.
+        out : str
+            Path of the result column.
+        chunk_size : int
+            Number of rows held in memory at a time.
+
+        Returns
+        -------
+        int
+            Number of rows written.  Rows that fail to evaluate are NaN.
+        """
+        from ._mapped import evaluate_mapped
+        return evaluate_mapped(self.compile(expr), inputs, out, chunk_size)
+
+    def evaluate_stream(self, data, bindings: dict = None) -> tuple:
+        """Evaluate one expression while lexing it, without splitting it
+        into a list of tokens first.  Suits lines far too long to hold
+        as strings, e.g. a memory-mapped file.
+
+        Unlike `evaluate`, the instance's stack, trail and undo history
+        are left untouched.
+
+        Parameters
+        ----------
+        data : bytes-like or str
+            Expression.
+        bindings : dict
+            Value of each variable.
+
+        Returns
+        -------
+        tuple
+            Return code, message and value, as returned by `Program.run`.
+        """
+        from ._lexer import evaluate
+        return evaluate(data, self.registry, bindings)
+
+    def compile_batch(self, expressions: list) -> "Dag":
+        """Compile expressions into one DAG sharing common subexpressions.
+
+        Parameters
+        ----------
+        expressions : list
+            Expression strings or lists of tokens.
+
+        Returns
+        -------
+        Dag
+            Call `run(bindings)` for a (code, msg, value) per expression.
+        """
+        from ._dag import Dag
+        return Dag([self.compile(e) for e in expressions])
+
+    def evaluate_parallel(self, expr, bindings: dict = None, processes: int = None,
+                          threshold: int = 1 << 14) -> tuple:
+        """Evaluate one large expression, running independent subtrees
+        of at least `threshold` tokens on a process pool.
+
+        Parameters
+        ----------
+        expr : str or StrList
+            Expression, where identifiers that are not operators are variables.
+        bindings : dict
+            Value of each variable.
+        processes : int
+            Number of worker processes.  Defaults to `os.cpu_count()`.
+        threshold : int
+            Smallest subtree, in tokens, evaluated in a worker.
+
+        Returns
+        -------
+        tuple
+            Return code, message and value, identical to a sequential run.
+        """
+        from ._parallel import evaluate_parallel
+        return evaluate_parallel(self.compile(expr), bindings, processes, threshold)
+
+    def analyze(self, expr) -> "Analysis":
+        """Validate expression and measure its stack depth without
+        executing it.
+
+        Parameters
+        ----------
+        expr : str or StrList
+            Expression, where identifiers that are not operators are variables.
+
+        Returns
+        -------
+        Analysis
+            Validity, position and message of the first error, variables
+            and maximum stack depth.
+        """
+        from ._analysis import analyze
+        tokens = self.clean_up_whitespace(expr).split() if isinstance(expr, str) else expr
+        return analyze(tokens, self.registry)
+
+    def gradient(self, expr, bindings: dict) -> tuple:
+        """Evaluate expression with forward-mode automatic differentiation.
+
+        Parameters
+        ----------
+        expr : str or StrList
+            Expression, where identifiers that are not operators are variables.
+        bindings : dict
+            Value of each variable.  Sequences of values evaluate a batch.
+
+        Returns
+        -------
+        tuple
+            Value and dict of partial derivatives by variable name.
+        """
+        from ._dual import gradient
+        return gradient(self.compile(expr), bindings)
+
+    def push(self, value) -> None:
+        """Push number, vector or matrix onto the stack.  Lists and
+        arrays are converted to the vector backend's operand type.
+        """
+        self.save_state()
+        self.stack = self.stack.push(_vector.as_operand(value))
+
+    def execute_next(self, new_char: str) -> tuple:
         """Update stack with new numeric value or valid expression execution.
         
         Parameters
@@ -474,31 +1030,194 @@ class Rpn(OperatorsMixin, ComparisonMixin):
 
         Returns
         -------
-        None
+        tuple
+            Return code and message.  Tokens that did not fail
+            are recorded to the instance's trail and can be undone.
+        """
+        _previous = self.stack
+        _code, _msg = self.__execute(new_char)
+        if _code != 1:
+            self.undo_states.append((_previous, self.trail))
+            self.redo_states.clear()
+            self.trail = self.trail.record(new_char, self.stack)
+        if self.tracer is not None:
+            self.__trace(new_char, _previous, _code)
+        return _code, _msg
+
+    def __trace(self, token: str, previous: PStack, code: int) -> None:
+        """Record executed token with the stack it was applied to.
+        """
+        _reg = self.registry
+        _idx = _reg.index(token)
+        _consumed = 0
+        if _idx > -1 and code == 0:
+            _arity = _reg.expressions[_idx].arity
+            _consumed = len(previous) if _arity == ARITY_ALL else _arity
+        self.tracer.record(
+            token,
+            _idx < 0 and self.is_number(token),
+            _idx > -1,
+            tuple(islice(previous, min(_consumed, 2))),
+            _consumed,
+            self.stack.head if len(self.stack) > 0 else None,
+            len(self.stack),
+            code,
+            )
+
+    def evaluate(self, tokens: StrList, budget: Budget = None) -> tuple:
+        """Reset stack and execute tokens in order, stopping at the first
+        token that does not return 0.
+
+        Parameters
+        ----------
+        tokens : StrList
+            Tokens to execute.
+        budget : Budget
+            Optional resource limits.  Exceeding one stops evaluation
+            with one of the codes in `_budget`.
+
+        Returns
+        -------
+        tuple
+            Return code and message of the last executed token.  An
+            arithmetic error, such as `2 acos`, gives code 1 and its
+            message, as in `Program.run`.
+        """
+        self.reset
+        return self.__run(tokens, budget)
+
+    def reevaluate(self, tokens: StrList, trail: Trail = None, budget: Budget = None) -> tuple:
+        """Execute edited list of tokens, resuming from the nearest
+        checkpoint before the first token that differs from `trail`.
 
+        Parameters
+        ----------
+        tokens : StrList
+            Full, edited list of tokens.
+        trail : Trail
+            Trail of the previous run.  Defaults to instance's current trail.
+        budget : Budget
+            Optional resource limits, applied to the re-executed tokens only.
+
+        Returns
+        -------
+        tuple
+            Return code and message of the last executed token.
         """
+        trail = trail if trail is not None else self.trail
+        _old = trail.tokens
+        _n = 0
+        _limit = min(len(_old), len(tokens))
+        while _n < _limit and _old[_n] == tokens[_n]:
+            _n += 1
+
+        _pos, _state = trail.nearest(_n)
+        self.save_state()
+        self.trail = trail.branch(_pos)
+        self.stack = _state
+        return self.__run(tokens[_pos:], budget)
+
+    def __step(self, token: str) -> tuple:
+        # Arithmetic errors become code 1, as in `Program.execute`.
+        try:
+            return self.execute_next(token)
+        except (ArithmeticError, ValueError) as e:
+            return 1, str(e)
+
+    def __run(self, tokens: StrList, budget: Budget = None) -> tuple:
+        _code, _msg = 0, ""
+        if budget is None:
+            for t in tokens:
+                _code, _msg = self.__step(t)
+                if _code != 0:
+                    break
+            return _code, _msg
+
+        max_tokens, max_depth, max_mag = budget.max_tokens, budget.max_depth, budget.max_magnitude
+        check_every = budget.check_every
+        deadline = budget.deadline()
+
+        for i, t in enumerate(tokens):
+            if max_tokens is not None and i >= max_tokens:
+                return BUDGET_TOKENS, f"Token budget of {max_tokens} exceeded."
+            # Clock and cancellation flag are only polled every so often.
+            if i % check_every == 0:
+                if budget.cancelled:
+                    return CANCELLED, "Evaluation cancelled."
+                if deadline is not None and time.perf_counter() > deadline:
+                    return BUDGET_TIME, f"Time budget of {budget.max_seconds}s exceeded."
+
+            _code, _msg = self.__step(t)
+            if _code != 0:
+                break
+            if max_depth is not None and len(self.stack) > max_depth:
+                return BUDGET_DEPTH, f"Stack depth budget of {max_depth} exceeded."
+            if max_mag is not None and len(self.stack) > 0 and _vector.max_abs(self.stack.head) > max_mag:
+                return BUDGET_MAGNITUDE, f"Magnitude budget of {max_mag} exceeded."
+        return _code, _msg
+
+    def __execute(self, new_char: str) -> tuple:
         # Character found in valid operator set.
         if self.is_number(new_char):
-            self.stacker.append(float(new_char))
+            self.stack = self.stack.push(float(new_char))
+            return 0, ""
+
+        if _vector.is_literal(new_char):
+            try:
+                self.stack = self.stack.push(_vector.parse(new_char))
+            except ValueError as e:
+                return 1, str(e)
             return 0, ""
         
-        elif new_char in self.operators:
-
-            _idx = self.operation_index(new_char)
-
-            if self.stack_size > 0:
-                # If single number left in stack and current character in single-argument
-                # operator list, run the argument and return -1 to indicate that the 
-                # final output should be processed.
-                if self.stack_size == 1:
-                    if new_char in self.OPS_SINGLE_ARG:
-                        self.stacker.append(self.OPS_SINGLE_ARG[_idx].function(self.stacker.pop()))
-                    return -1, ""
-                    
-                else:
-                    self.stacker.append(self.OPS_DOUBLE_ARG[_idx].function(self.stacker.pop(), self.stacker.pop()))
+        # Read registry once; another thread may swap it in the meantime.
+        _reg = self.registry
+        if new_char in _reg.aliases:
 
-                    return 0, ""
+            _idx = _reg.index(new_char)
+            _expr = _reg.expressions[_idx]
+            try:
+                # Plugin operators are imported here on first use.
+                _expr.function
+            except ValueError as e:
+                return 1, str(e)
+
+            if self.stack_size > 0 and _expr.arity == ARITY_ALL:
+                if any(map(_vector.is_operand, self.stack)):
+                    return 1, f"Operator {new_char!r} takes scalar values only."
+                try:
+                    _result = _expr.function(self.stack)
+                except TypeError:
+                    return 1, f"Operator {new_char!r} takes scalar values only."
+                except (ArithmeticError, ValueError) as e:
+                    return 1, str(e)
+                if isinstance(_result, list):
+                    self.stack = PStack.from_iterable(_result)
+                else:
+                    self.stack = PStack.EMPTY.push(_result)
+                return 0, ""
+
+            elif self.stack_size > 0:
+                # A lone value stands as the result of an operator that needs
+                # more; return -1 to indicate that it should be processed.
+                _arity = _expr.arity
+                if self.stack_size < _arity:
+                    if self.stack_size == 1:
+                        return -1, ""
+                    return 1, "Not enough values to perform operation."
+
+                _args, rest = [], self.stack
+                for _ in range(_arity):
+                    a, rest = rest.pop()
+                    _args.append(a)
+                try:
+                    if all(type(a) in _vector.SCALARS for a in _args):
+                        self.stack = rest.push(_expr.function(*_args))
+                    else:
+                        self.stack = rest.push(_vector.apply(_expr, *_args))
+                except (ArithmeticError, ValueError) as e:
+                    return 1, str(e)
+
+                return 0, ""
 
             else:
                 # If new_char is an operator, but there are not enough values
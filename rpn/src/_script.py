@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+RPN scripts.
+
+A script holds one expression or shell command per line; `#` starts a
+comment.  Lines behave as if typed into the shell: the stack carries over
+from line to line, and a line that ends with an operator and leaves a
+single value prints it as the result and clears the stack.  An operator
+that finds a lone value on the stack leaves it standing and skips the
+rest of its line, so `5` then `+` prints "Result: 5".
+
+The whole script is parsed and validated before anything runs.  Each
+expression line is compiled once and run straight on a list, and output
+is collected and written in one go, so none of the shell's per-line
+echo, colors or prints are paid for.
+
+Commands available in scripts:
+
+    result              Print top of the stack as the result, then clear it.
+    reset, c, ce        Clear the stack.
+    state               Print the stack.
+    ops [PATTERN]       Print the operators whose alias matches PATTERN.
+"""
+
+__all__ = [
+    "ScriptError",
+    "parse",
+    "run",
+    "source",
+    ]
+
+from ._rpn import ComparisonMixin, Registry, Rpn
+from ._program import Program, OP
+from ._stack import PStack
+from ._vector import SCALARS
+
+COMMANDS = frozenset(("result", "reset", "c", "ce", "state", "ops", "operators"))
+
+
+class ScriptError(ValueError):
+    """Error in a script line.
+
+    Parameters
+    ----------
+    line : int
+        Line number, counting from 1.
+    message : str
+        Description of the error.
+    """
+    def __init__(self, line: int, message: str) -> None:
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+def _format(value):
+    """Format value as `Rpn.result` does.
+    """
+    if type(value) in SCALARS and ComparisonMixin.is_int(f"{value}"):
+        return int(value)
+    return value
+
+
+def parse(lines, registry: Registry) -> list:
+    """Parse and validate script.
+
+    Parameters
+    ----------
+    lines : Iterable[str]
+        Script lines.
+    registry : Registry
+        Operators expressions are compiled against.
+
+    Returns
+    -------
+    list
+        (line number, command, argument) per line, where command is None
+        for expressions and the argument is then the compiled `Program`.
+
+    Raises
+    ------
+    ScriptError
+        At the first line that is not a command or valid expression.
+    """
+    _steps = []
+    for n, line in enumerate(lines, 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        word, _, arg = line.partition(" ")
+        if word in COMMANDS:
+            _steps.append((n, word, arg.strip()))
+            continue
+        try:
+            program = Program(line.split(), registry)
+        except ValueError as e:
+            raise ScriptError(n, str(e)) from None
+        if program.variables:
+            raise ScriptError(n, f"Unknown command or variable {program.variables[0]!r}.")
+        _steps.append((n, None, program))
+    return _steps
+
+
+def run(steps: list, rpn: Rpn) -> list:
+    """Execute parsed script on a calculator's stack.
+
+    Parameters
+    ----------
+    steps : list
+        Output of `parse`.
+    rpn : Rpn
+        Calculator whose stack the script starts from and leaves its
+        final stack in.
+
+    Returns
+    -------
+    list
+        Output lines.
+
+    Raises
+    ------
+    ScriptError
+        At the first line that fails.  Output so far is in its `output`
+        attribute.
+    """
+    stack = rpn.stacker
+    _output = []
+    try:
+        for n, command, arg in steps:
+            if command is None:
+                code, msg, _ = Program.execute(arg.instructions, None, stack)
+                if code not in (0, -1):
+                    raise ScriptError(n, msg or "Not enough values to perform operation.")
+                if len(stack) == 1 and arg.instructions and arg.instructions[-1][0] == OP:
+                    _output.append(f"Result: {_format(stack.pop())}")
+            elif command == "result":
+                _output.append(f"Result: {_format(stack[-1] if stack else 0)}")
+                stack.clear()
+            elif command in ("reset", "c", "ce"):
+                stack.clear()
+            elif command == "state":
+                _output.append(f"{stack}")
+            else:
+                _catalog = rpn.catalog
+                _output.extend(_catalog.render(_catalog.search(arg or None)))
+    except ScriptError as e:
+        e.output = _output
+        raise
+    finally:
+        rpn.save_state()
+        rpn.stack = PStack.from_iterable(stack)
+    return _output
+
+
+def source(path: str, rpn: Rpn, out) -> None:
+    """Parse, validate and run script file, writing its output once.
+
+    Parameters
+    ----------
+    path : str
+        Script file.
+    rpn : Rpn
+        Calculator to run on.
+    out : TextIO
+        Destination of the output.  On error, output up to the failing
+        line is still written.
+
+    Raises
+    ------
+    OSError
+        If the file cannot be read.
+    ScriptError
+        At the first invalid or failing line.
+    """
+    with open(path) as f:
+        steps = parse(f, rpn.registry)
+    _output = []
+    try:
+        _output = run(steps, rpn)
+    except ScriptError as e:
+        _output = e.output
+        raise
+    finally:
+        if _output:
+            out.write("\n".join(_output) + "\n")
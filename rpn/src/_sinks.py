@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Binary and JSON result sinks.
+
+Results are written as (return code, value) records, never as formatted
+text meant for people, and buffered into large blocks before they reach
+the file.  Formats:
+
+    raw     9-byte records: little-endian float64 value, then int8 code.
+    npy     NumPy `.npy` file of the same records, as a structured array
+            with fields `value` and `status`.  Needs a seekable file, as
+            the row count is filled in on close.
+    ndjson  One JSON object per line, {"code": 0, "value": 1.5}.  Failed
+            results carry "msg", and non-finite values are written as
+            the strings "NaN", "Infinity" and "-Infinity".
+
+Return codes are those of `Rpn.execute_next` and `_budget`.  raw and npy
+hold scalars only: other values are written as NaN with code 1, as in
+`_batch`.  None of the formats needs NumPy to be written.
+"""
+
+__all__ = [
+    "FORMATS",
+    "NdjsonSink",
+    "NpySink",
+    "RawSink",
+    "open_sink",
+    ]
+
+import json
+import math
+import struct
+
+from . import _vector
+
+RECORD = struct.Struct("<db")
+# Bytes buffered before each write to the file.
+BLOCK_SIZE = 1 << 20
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+NPY_DTYPE = "[('value', '<f8'), ('status', '|i1')]"
+# Header size, room enough for any row count.
+NPY_HEADER_SIZE = 128
+
+
+def _plain(value):
+    """Return NumPy scalars as floats and NumPy arrays as lists, so that
+    results are written the same with or without NumPy.
+    """
+    np = _vector.np
+    if np is not None and isinstance(value, (np.ndarray, np.generic)):
+        return float(value) if np.ndim(value) == 0 else value.tolist()
+    return value
+
+
+class RawSink:
+    """Sink of raw (float64 value, int8 code) records.
+
+    Parameters
+    ----------
+    f : BinaryIO
+        Destination, opened for writing bytes.
+    block_size : int
+        Bytes buffered before each write.
+    """
+    def __init__(self, f, block_size: int = BLOCK_SIZE) -> None:
+        self.f = f
+        self.count = 0
+        self._rows = max(1, block_size // RECORD.size)
+        self._buffer = bytearray(self._rows * RECORD.size)
+        self._used = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, code: int, value, msg: str = "") -> None:
+        """Append one result.  Values of failed results are ignored.
+        """
+        value = _plain(value)
+        if code == 1 or value is None or type(value) not in _vector.SCALARS:
+            code, value = (1 if code in (0, -1) else code), math.nan
+        RECORD.pack_into(self._buffer, self._used * RECORD.size, value, code)
+        self._used += 1
+        self.count += 1
+        if self._used == self._rows:
+            self.flush()
+
+    def write_many(self, codes, values) -> None:
+        """Append results given as parallel sequences, e.g. the `status`
+        and `values` views of a `BatchResult`.
+        """
+        np = _vector.np
+        if np is None:
+            for code, value in zip(codes, values):
+                self.write(code, value)
+            return
+        self.flush()
+        _records = np.empty(min(len(values), self._rows), dtype = [("value", "<f8"), ("status", "i1")])
+        for start in range(0, len(values), self._rows):
+            _block = _records[:min(self._rows, len(values) - start)]
+            _block["value"] = np.asarray(values[start:start + len(_block)], dtype = float)
+            _block["status"] = np.asarray(codes[start:start + len(_block)], dtype = np.int8)
+            _block["value"][_block["status"] == 1] = math.nan
+            self.f.write(_block.tobytes())
+            self.count += len(_block)
+
+    def flush(self) -> None:
+        if self._used:
+            self.f.write(memoryview(self._buffer)[:self._used * RECORD.size])
+            self._used = 0
+
+    def close(self) -> None:
+        self.flush()
+
+
+class NpySink(RawSink):
+    """Sink of records as a `.npy` structured array.
+
+    Raises
+    ------
+    ValueError
+        If the file is not seekable.
+    """
+    def __init__(self, f, block_size: int = BLOCK_SIZE) -> None:
+        if not f.seekable():
+            raise ValueError("The npy format needs a seekable file.")
+        super().__init__(f, block_size)
+        self._start = f.tell()
+        f.write(self.header(0))
+
+    @staticmethod
+    def header(count: int) -> bytes:
+        """Return version 1.0 `.npy` header for `count` records.
+        """
+        _dict = f"{{'descr': {NPY_DTYPE}, 'fortran_order': False, 'shape': ({count},), }}"
+        _size = NPY_HEADER_SIZE - len(NPY_MAGIC) - 2
+        return NPY_MAGIC + struct.pack("<H", _size) + _dict.ljust(_size - 1).encode("latin1") + b"\n"
+
+    def close(self) -> None:
+        self.flush()
+        _end = self.f.tell()
+        self.f.seek(self._start)
+        self.f.write(self.header(self.count))
+        self.f.seek(_end)
+
+
+def _json_number(value: float) -> str:
+    if math.isfinite(value):
+        return repr(float(value))
+    return '"NaN"' if math.isnan(value) else ('"Infinity"' if value > 0 else '"-Infinity"')
+
+
+def _json_value(value) -> str:
+    if type(value) in _vector.SCALARS:
+        return _json_number(value)
+    return "[" + ",".join(_json_value(v) for v in value) + "]"
+
+
+class NdjsonSink:
+    """Sink of newline-delimited JSON results.
+
+    Parameters
+    ----------
+    f : TextIO
+        Destination, opened for writing text.
+    block_size : int
+        Characters buffered before each write.
+    """
+    def __init__(self, f, block_size: int = BLOCK_SIZE) -> None:
+        self.f = f
+        self.count = 0
+        self.block_size = block_size
+        self._lines = []
+        self._size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, code: int, value, msg: str = "") -> None:
+        value = _plain(value)
+        if code == 1 or value is None:
+            _line = f'{{"code":{code},"value":null,"msg":{json.dumps(msg)}}}\n' if msg else f'{{"code":{code},"value":null}}\n'
+        else:
+            _line = f'{{"code":{code},"value":{_json_value(value)}}}\n'
+        self._lines.append(_line)
+        self._size += len(_line)
+        self.count += 1
+        if self._size >= self.block_size:
+            self.flush()
+
+    def write_many(self, codes, values) -> None:
+        for code, value in zip(codes, values):
+            self.write(code, value)
+
+    def flush(self) -> None:
+        if self._lines:
+            self.f.write("".join(self._lines))
+            self._lines.clear()
+            self._size = 0
+
+    def close(self) -> None:
+        self.flush()
+
+
+FORMATS = {
+    "raw": RawSink,
+    "npy": NpySink,
+    "ndjson": NdjsonSink,
+    }
+
+
+def open_sink(fmt: str, f, block_size: int = BLOCK_SIZE):
+    """Return sink for format, writing to `f`, which must be binary for
+    raw and npy, and text for ndjson.
+
+    Raises
+    ------
+    ValueError
+        If the format is unknown.
+    """
+    _cls = FORMATS.get(fmt)
+    if _cls is None:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}.")
+    return _cls(f, block_size)
+
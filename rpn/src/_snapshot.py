@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compact binary format for calculator sessions.
+
+Layout (little-endian):
+
+    header      magic, version, stack size, token table size,
+                history size, operator count (24 bytes)
+    stack       packed float64 values, bottom to top
+    history     uint32 indices into the token table
+    tokens      uint16 length-prefixed UTF-8 strings
+    operators   uint16 length-prefixed UTF-8 aliases
+
+The stack follows the 24 byte header directly, so it stays 8 byte aligned
+and can be read straight out of a memory-mapped file.
+
+Custom operators are stored by alias only, never as code: whoever
+restores a snapshot registers them again first.  Version 1 snapshots,
+which also held each operator's signature and source, are still read,
+and that source is skipped.
+"""
+
+__all__ = [
+    "dumps",
+    "loads",
+    ]
+
+import sys
+import struct
+from array import array
+
+from ._types import StrList
+
+MAGIC = b"RPNS"
+VERSION = 2
+HEADER = struct.Struct("<4sHxxIIII")
+
+
+def _pack_str(obj: str) -> bytes:
+    _raw = obj.encode("utf-8")
+    if len(_raw) > 0xFFFF:
+        raise ValueError("Strings longer than 65535 bytes cannot be stored.")
+    return struct.pack("<H", len(_raw)) + _raw
+
+
+def _unpack_str(view: memoryview, offset: int) -> tuple:
+    if offset + 2 > len(view):
+        raise ValueError("Snapshot is truncated.")
+    (_n,) = struct.unpack_from("<H", view, offset)
+    offset += 2
+    if offset + _n > len(view):
+        raise ValueError("Snapshot is truncated.")
+    return str(view[offset:offset + _n], "utf-8"), offset + _n
+
+
+def dumps(values, history: StrList, operators: StrList) -> bytes:
+    """Serialize session state.
+
+    Parameters
+    ----------
+    values : Iterable[float]
+        Stack values, bottom to top.
+    history : StrList
+        Executed tokens.  Repeated tokens are stored once.
+    operators : StrList
+        Aliases of custom operators.
+
+    Returns
+    -------
+    bytes
+    """
+    _stack = array("d", values)
+    _table = {}
+    _history = array("I", (_table.setdefault(t, len(_table)) for t in history))
+
+    if sys.byteorder == "big":
+        _stack.byteswap()
+        _history.byteswap()
+
+    _parts = [
+        HEADER.pack(MAGIC, VERSION, len(_stack), len(_table), len(_history), len(operators)),
+        _stack.tobytes(),
+        _history.tobytes(),
+        ]
+    _parts.extend(_pack_str(t) for t in _table)
+    _parts.extend(_pack_str(alias) for alias in operators)
+    return b"".join(_parts)
+
+
+def loads(buffer) -> tuple:
+    """Deserialize session state from any bytes-like object, such as
+    a memory-mapped file.
+
+    Returns
+    -------
+    tuple
+        Stack values as `array('d')`, history as list of tokens and
+        list of operator aliases.
+
+    Raises
+    ------
+    ValueError
+        If buffer does not hold a supported snapshot, or is truncated
+        or corrupt.
+    """
+    try:
+        return _loads(buffer)
+    except (struct.error, IndexError) as e:
+        raise ValueError(f"Snapshot is truncated or corrupt: {e}") from None
+
+
+def _loads(buffer) -> tuple:
+    with memoryview(buffer) as view:
+        if len(view) < HEADER.size:
+            raise ValueError("Snapshot is truncated.")
+        _magic, _version, n_stack, n_table, n_history, n_ops = HEADER.unpack_from(view, 0)
+        if _magic != MAGIC or _version not in (1, VERSION):
+            raise ValueError("Not a supported RPN snapshot.")
+
+        offset = HEADER.size
+        if len(view) < offset + 8 * n_stack + 4 * n_history:
+            raise ValueError("Snapshot is truncated.")
+        _stack = array("d")
+        _stack.frombytes(view[offset:offset + 8 * n_stack])
+        offset += 8 * n_stack
+
+        _indices = array("I")
+        _indices.frombytes(view[offset:offset + 4 * n_history])
+        offset += 4 * n_history
+
+        if sys.byteorder == "big":
+            _stack.byteswap()
+            _indices.byteswap()
+
+        _table = []
+        for _ in range(n_table):
+            _token, offset = _unpack_str(view, offset)
+            _table.append(_token)
+
+        _ops = []
+        for _ in range(n_ops):
+            _alias, offset = _unpack_str(view, offset)
+            _ops.append(_alias)
+            if _version == 1:
+                # Signature and function source, never run.
+                for _ in range(2):
+                    _, offset = _unpack_str(view, offset)
+
+    return _stack, [_table[i] for i in _indices], _ops
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Persistent (immutable, structurally shared) stack.
+
+Every push or pop returns a new stack which shares all of its remaining
+nodes with the stack it was derived from, so keeping older versions
+around costs one node per operation instead of a full copy.
+"""
+
+__all__ = [
+    "PStack",
+    ]
+
+from ._types import Any, AnyList
+
+
+class PStack:
+    """Persistent stack node.
+
+    An empty stack is represented by `PStack.EMPTY`.  Use `push` or
+    `from_iterable` to build new stacks rather than the constructor.
+
+    Parameters
+    ----------
+    head : Any
+        Value at the top of the stack.
+    tail : PStack
+        Remainder of the stack below `head`.
+    """
+    __slots__ = ("head", "tail", "size")
+
+    EMPTY: "PStack" = None
+
+    def __init__(self, head: Any = None, tail: "PStack" = None) -> None:
+        self.head = head
+        self.tail = tail
+        self.size = 0 if tail is None else tail.size + 1
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def __iter__(self):
+        """Iterate from top of stack to bottom.
+        """
+        node = self
+        while node.size > 0:
+            yield node.head
+            node = node.tail
+
+    def __repr__(self):
+        return f"<PStack {self.to_list()} >"
+
+    @classmethod
+    def from_iterable(cls, values) -> "PStack":
+        """Return stack with values pushed in order, so that the last
+        value ends up on top.
+        """
+        node = cls.EMPTY
+        for v in values:
+            node = cls(v, node)
+        return node
+
+    def push(self, value: Any) -> "PStack":
+        """Return new stack with value on top.
+        """
+        return PStack(value, self)
+
+    def pop(self) -> tuple:
+        """Return top value and the stack below it.
+
+        Raises
+        ------
+        IndexError
+            If stack is empty.
+        """
+        if self.size == 0:
+            raise IndexError("pop from empty stack")
+        return self.head, self.tail
+
+    def peek(self) -> Any:
+        """Return top value without removing it.
+        """
+        if self.size == 0:
+            raise IndexError("peek at empty stack")
+        return self.head
+
+    def drop(self, n: int) -> "PStack":
+        """Return stack with the top n values removed.
+        """
+        node = self
+        for _ in range(min(n, self.size)):
+            node = node.tail
+        return node
+
+    def to_list(self) -> AnyList:
+        """Return values as list ordered from bottom to top.
+        """
+        _result = list(self)
+        _result.reverse()
+        return _result
+
+
+PStack.EMPTY = PStack()
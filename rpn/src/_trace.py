@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Execution trace recorder.
+
+Every token executed while a `Tracer` is attached to a calculator is
+packed into a fixed-size binary record in a preallocated ring buffer, so
+tracing allocates nothing per step and keeps the most recent `capacity`
+steps.  Record layout, little-endian:
+
+    step      uint64   Sequence number since the tracer was created.
+    token     uint16   Index into `Tracer.names`, or NUMBER for numbers.
+    n_inputs  uint16   Number of values the operator consumed.
+    code      int8     Return code of `Rpn.execute_next`.
+    pad       3 bytes
+    depth     uint32   Stack size after the step.
+    a, b      float64  First two inputs, top of the stack first.
+    output    float64  Value on top of the stack after the step.
+
+Vector operands are recorded as NaN.  `replay` re-applies each recorded
+operator to its recorded inputs and reports any step whose output differs.
+"""
+
+__all__ = [
+    "NUMBER",
+    "RECORD",
+    "TraceRecord",
+    "Tracer",
+    "replay",
+    ]
+
+import math
+import struct
+from typing import NamedTuple
+
+from ._rpn import ARITY_ALL
+from ._vector import SCALARS
+
+RECORD = struct.Struct("<QHHb3xIddd")
+# Token index of numbers, whose token is rebuilt from the output.
+NUMBER = 0xFFFF
+# Token index once `Tracer.names` is full.
+UNKNOWN = 0xFFFE
+
+
+class TraceRecord(NamedTuple):
+    step: int
+    token: str
+    operator: bool
+    inputs: tuple
+    consumed: int
+    output: float
+    depth: int
+    code: int
+
+
+def _as_float(value) -> float:
+    return float(value) if type(value) in SCALARS else math.nan
+
+
+class Tracer:
+    """Ring buffer of trace records.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of most recent steps kept.
+    """
+    def __init__(self, capacity: int = 4096) -> None:
+        if capacity < 1:
+            raise ValueError("Trace capacity must be at least 1.")
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * RECORD.size)
+        self.steps = 0
+        # Interned non-numeric tokens, and whether each is an operator.
+        self.names = []
+        self.operators = []
+        self._ids = {}
+
+    def __len__(self) -> int:
+        return min(self.steps, self.capacity)
+
+    def __token_id(self, token: str, is_operator: bool) -> int:
+        _id = self._ids.get(token)
+        if _id is None:
+            if len(self.names) >= UNKNOWN:
+                return UNKNOWN
+            _id = self._ids[token] = len(self.names)
+            self.names.append(token)
+            self.operators.append(is_operator)
+        return _id
+
+    def record(self, token: str, is_number: bool, is_operator: bool, inputs, n_inputs: int,
+               output, depth: int, code: int) -> None:
+        """Append step, overwriting the oldest one once full.
+
+        Parameters
+        ----------
+        token : str
+            Executed token.
+        is_number : bool
+            Whether the token was pushed as a number.
+        is_operator : bool
+            Whether the token is an operator.
+        inputs : Sequence
+            Up to two inputs, top of the stack first.
+        n_inputs : int
+            Number of values the operator consumed.
+        output : Any
+            Value on top of the stack after the step, or None.
+        depth : int
+            Stack size after the step.
+        code : int
+            Return code of the step.
+        """
+        _id = NUMBER if is_number else self.__token_id(token, is_operator)
+        a = _as_float(inputs[0]) if len(inputs) > 0 else math.nan
+        b = _as_float(inputs[1]) if len(inputs) > 1 else math.nan
+        RECORD.pack_into(self.buffer, (self.steps % self.capacity) * RECORD.size,
+                         self.steps, _id, min(n_inputs, 0xFFFF), code, depth,
+                         a, b, math.nan if output is None else _as_float(output))
+        self.steps += 1
+
+    def clear(self) -> None:
+        self.steps = 0
+
+    def records(self) -> list:
+        """Return retained records, oldest first.
+        """
+        _result = []
+        for step in range(max(0, self.steps - self.capacity), self.steps):
+            _step, _id, n, code, depth, a, b, output = RECORD.unpack_from(self.buffer, (step % self.capacity) * RECORD.size)
+            if _id == NUMBER:
+                token, is_operator = repr(output), False
+            elif _id == UNKNOWN:
+                token, is_operator = "?", False
+            else:
+                token, is_operator = self.names[_id], self.operators[_id]
+            _result.append(TraceRecord(_step, token, is_operator, (a, b)[:min(n, 2)], n, output, depth, code))
+        return _result
+
+    def dump(self, last: int = None) -> list:
+        """Return records formatted one per line, optionally only the last ones.
+        """
+        _records = self.records()
+        if last is not None:
+            _records = _records[-last:] if last > 0 else []
+        return [f"{r.step:>8} {r.token:<10} {', '.join(map(repr, r.inputs)):<40} -> {r.output!r:<24} "
+                f"depth {r.depth:<6} code {r.code}" for r in _records]
+
+
+def replay(records: list, registry) -> list:
+    """Re-apply every recorded operator to its recorded inputs.
+
+    Parameters
+    ----------
+    records : list
+        Output of `Tracer.records`.
+    registry : Registry
+        Operators to replay with, usually the calculator's own.
+
+    Returns
+    -------
+    list
+        (record, replayed output) for every step whose output differs.
+        Failed steps, and steps whose inputs were not all recorded, such
+        as vector operands or more than two values, are skipped.
+    """
+    _mismatches = []
+    for r in records:
+        if not r.operator or r.code != 0 or any(v != v for v in r.inputs):
+            continue
+        _idx = registry.index(r.token)
+        if _idx < 0:
+            continue
+        _expr = registry.expressions[_idx]
+        if r.consumed != len(r.inputs) or _expr.arity not in (ARITY_ALL, r.consumed):
+            continue
+        try:
+            if _expr.arity == ARITY_ALL:
+                _value = _expr.function(list(r.inputs))
+                # Reductions may leave several values; the top one is recorded.
+                if isinstance(_value, list):
+                    _value = _value[-1] if _value else math.nan
+            else:
+                _value = _expr.function(*r.inputs)
+        except (ArithmeticError, ValueError):
+            _value = math.nan
+        if struct.pack("<d", _as_float(_value)) != struct.pack("<d", r.output):
+            _mismatches.append((r, _value))
+    return _mismatches
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Vector and matrix operands.
+
+Vectors are stored as NumPy arrays when NumPy is installed and as
+`array('d')` otherwise.  Without NumPy, matrices are lists of `array('d')`
+rows.  Built-in operators map to a single NumPy call where one exists and
+are applied element-wise otherwise, with scalars broadcast across the
+other operand.
+"""
+
+__all__ = [
+    "apply",
+    "as_operand",
+    "dot",
+    "is_literal",
+    "is_operand",
+    "matmul",
+    "max_abs",
+    "parse",
+    ]
+
+import json
+import math
+from array import array
+from itertools import repeat
+
+from ._types import Any
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Scalar types the evaluator can pass straight to an expression.
+SCALARS = frozenset((int, float))
+
+if np is not None:
+    def _np_divide(a, b):
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            return np.where(a != 0, np.divide(b, a), np.inf)
+
+    def _np_log(n, base):
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            return np.log(n) / np.log(base)
+
+    # Same argument order as the scalar expressions: top of stack first.
+    NUMPY_FUNCS = {
+        "+": lambda a, b: np.add(b, a),
+        "-": lambda a, b: np.subtract(b, a),
+        "*": lambda a, b: np.multiply(b, a),
+        "/": _np_divide,
+        "^": lambda a, b: np.power(b, a),
+        "log": _np_log,
+        "sin": np.sin,
+        "cos": np.cos,
+        "tanh": np.tanh,
+        "acos": np.arccos,
+        "e": np.exp,
+    }
+else:
+    NUMPY_FUNCS = {}
+
+# Operators that handle vector operands themselves.
+NATIVE = frozenset(("dot", "matmul"))
+
+
+def is_operand(obj: Any) -> bool:
+    """Return True if value is a vector or matrix operand.
+    """
+    return isinstance(obj, (array, list)) or (np is not None and isinstance(obj, np.ndarray))
+
+
+def is_literal(token: str) -> bool:
+    """Return True if token looks like a vector or matrix literal,
+    e.g. `[1,2,3]` or `[[1,2],[3,4]]`.
+    """
+    return len(token) > 1 and token[0] == "[" and token[-1] == "]"
+
+
+def as_operand(obj: Any) -> Any:
+    """Convert list of numbers, list of rows or array to the operand
+    type for the current backend.  Scalars are returned as floats.
+    """
+    if type(obj) in SCALARS:
+        return float(obj)
+    if np is not None:
+        return np.asarray(obj, dtype = float)
+    if isinstance(obj, array):
+        return obj
+    if len(obj) > 0 and not isinstance(obj[0], (int, float)):
+        return [array("d", row) for row in obj]
+    return array("d", obj)
+
+
+def parse(token: str) -> Any:
+    """Parse vector or matrix literal.
+
+    Raises
+    ------
+    ValueError
+        If token is not a valid literal.
+    """
+    try:
+        return as_operand(json.loads(token))
+    except (json.JSONDecodeError, TypeError) as e:
+        raise ValueError(f"Invalid vector or matrix: {token}") from e
+
+
+def _rank(obj: Any) -> int:
+    # 0 for scalars, 1 for vectors and 2 for matrices, in either backend.
+    if np is not None and isinstance(obj, np.ndarray):
+        return obj.ndim
+    return 2 if isinstance(obj, list) else int(isinstance(obj, array))
+
+
+def max_abs(obj: Any) -> float:
+    """Return largest absolute value held by a scalar or operand.
+    """
+    if type(obj) in SCALARS:
+        return abs(obj)
+    if np is not None and isinstance(obj, np.ndarray):
+        return float(np.max(np.abs(obj))) if obj.size else 0.0
+    if isinstance(obj, list):
+        return max((max_abs(row) for row in obj), default = 0.0)
+    return max(map(abs, obj), default = 0.0)
+
+
+def _elementwise(fn, *args) -> Any:
+    """Apply scalar function across pure Python operands.
+    """
+    _rows = next((a for a in args if isinstance(a, list)), None)
+    if _rows is not None:
+        for a in args:
+            if isinstance(a, list) and len(a) != len(_rows):
+                raise ValueError(f"Operand row counts differ: {len(a)} and {len(_rows)}.")
+        _args = [a if isinstance(a, list) else repeat(a, len(_rows)) for a in args]
+        return [_elementwise(fn, *row_args) for row_args in zip(*_args)]
+
+    _size = next(len(a) for a in args if isinstance(a, array))
+    _iters = []
+    for a in args:
+        if isinstance(a, array):
+            if len(a) != _size:
+                raise ValueError(f"Operand sizes differ: {len(a)} and {_size}.")
+            _iters.append(a)
+        else:
+            _iters.append(repeat(a, _size))
+    return array("d", map(fn, *_iters))
+
+
+def apply(expr, *args) -> Any:
+    """Apply expression to operands, at least one of which is a vector
+    or matrix.
+
+    Parameters
+    ----------
+    expr : Expression
+        Expression to apply.
+    *args : Any
+        Operands in the order the expression's function takes them.
+
+    Raises
+    ------
+    ValueError
+        If operand shapes are incompatible.
+    """
+    if expr.native or expr.alias in NATIVE:
+        return expr.function(*args)
+    _fn = NUMPY_FUNCS.get(expr.alias)
+    if _fn is not None:
+        return _fn(*args)
+    if np is not None:
+        return np.vectorize(expr.function, otypes = [float])(*args)
+    return _elementwise(expr.function, *args)
+
+
+def dot(a: Any, b: Any) -> float:
+    """Return dot product of two vectors.
+    """
+    if _rank(a) != 1 or _rank(b) != 1:
+        raise ValueError("Dot product needs two vector operands.")
+    if np is not None:
+        return float(np.dot(a, b))
+    if len(a) != len(b):
+        raise ValueError(f"Operand sizes differ: {len(a)} and {len(b)}.")
+    return math.fsum(map(float.__mul__, a, b))
+
+
+def matmul(a: Any, b: Any) -> Any:
+    """Return matrix product `a @ b`.  Vectors are treated as a single
+    row on the left and a single column on the right.
+    """
+    if np is not None:
+        return np.matmul(a, b)
+    if type(a) in SCALARS or type(b) in SCALARS:
+        raise ValueError("Matrix product needs vector or matrix operands.")
+    _a = a if isinstance(a, list) else [a]
+    _b = b if isinstance(b, list) else [array("d", [x]) for x in b]
+    if not _a or len(_a[0]) != len(_b) or not _b:
+        raise ValueError(f"Cannot multiply {len(_a)}x{len(_a[0]) if _a else 0} by {len(_b)}x{len(_b[0]) if _b else 0}.")
+    _cols = list(zip(*_b))
+    _result = [array("d", (math.fsum(map(float.__mul__, row, col)) for col in _cols)) for row in _a]
+    if not isinstance(b, list):
+        return array("d", (row[0] for row in _result))
+    if not isinstance(a, list):
+        return _result[0]
+    return _result
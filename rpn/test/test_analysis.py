@@ -0,0 +1,57 @@
+import unittest
+
+from rpn.src._rpn import Rpn
+
+
+class AnalysisTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+
+    def test_valid(self):
+        a = self.rpn.analyze("x y * 2 3 + - z")
+        self.assertTrue(a.valid)
+        self.assertIsNone(a.position)
+        self.assertEqual(a.variables, ("x", "y", "z"))
+        self.assertEqual((a.max_depth, a.depth), (3, (2, 2)))
+        self.assertEqual(self.rpn.analyze("5 sin cos").max_depth, 1)
+
+    def test_errors(self):
+        """Test that the first error is reported with its position.
+        """
+        for expr, position in (("1 2 + +", 3), ("+", 0), ("1 sin 2 ^ ^", 4), ("1 2 ( 3", 2), ("sum", 0)):
+            with self.subTest(expr = expr):
+                a = self.rpn.analyze(expr)
+                self.assertFalse(a.valid)
+                self.assertEqual(a.position, position)
+                self.assertTrue(a.message)
+
+    def test_reductions(self):
+        """Test that reductions leave a range of depths.
+        """
+        a = self.rpn.analyze("1 2 3 4 topk")
+        self.assertEqual((a.max_depth, a.depth), (4, (1, 4)))
+        self.assertTrue(self.rpn.analyze("1 2 3 4 topk +").valid)
+        self.assertEqual(self.rpn.analyze("1 2 3 sum +").depth, (1, 2))
+
+    def test_matches_execution(self):
+        """Test that valid expressions never run short of values.
+        """
+        for expr in ("3 4 + 2 *", "1 2 3 sum", "2 sin", "[1,2] 3 *", "1 2 3 4 5 6 7 8 9 + + + + + + + +"):
+            with self.subTest(expr = expr):
+                a = self.rpn.analyze(expr)
+                self.assertTrue(a.valid)
+                self.assertEqual(self.rpn.evaluate(expr.split()), (0, ""))
+                self.assertEqual(len(self.rpn.status), a.depth[0])
+
+    def test_single_argument_operators(self):
+        """Test that one-argument operators apply at any stack size.
+        """
+        self.assertEqual(self.rpn.evaluate("0 cos".split()), (0, ""))
+        self.assertEqual(self.rpn.status, [1.0])
+        self.assertEqual(self.rpn.evaluate("1 0 cos +".split()), (0, ""))
+        self.assertEqual(self.rpn.status, [2.0])
+        self.assertEqual(self.rpn.evaluate("3 +".split()), (-1, ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import math
+import random
+import unittest
+from array import array
+
+from rpn.src._rpn import Rpn
+from rpn.src._approx import ApproxSet, approx_set
+from rpn.src import _vector
+
+np = _vector.np
+
+# Reference function and input range for each approximated operator.
+REFERENCE = {
+    "sin": (math.sin, -1e3, 1e3),
+    "cos": (math.cos, -1e3, 1e3),
+    "tanh": (math.tanh, -12.0, 12.0),
+    "acos": (math.acos, -1.0, 1.0),
+    "e": (math.exp, -700.0, 700.0),
+}
+
+
+class ApproxTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.samples = {alias: [rng.uniform(lo, hi) for _ in range(20000)] + [lo, hi, 0.0]
+                        for alias, (_, lo, hi) in REFERENCE.items()}
+        self.samples["log"] = [math.exp(rng.uniform(-700, 700)) for _ in range(20000)] + [0.5, 1.0, 2.0]
+
+    def error(self, alias: str, exact: float, approx: float) -> float:
+        if alias == "e":
+            return abs(approx - exact) / exact if exact else abs(approx)
+        return abs(approx - exact)
+
+    def test_error_bounds(self):
+        """Test that scalar results stay within the documented bounds.
+        """
+        for size in (64, 4096):
+            s = ApproxSet(size)
+            for alias, (fn, _, _) in REFERENCE.items():
+                with self.subTest(size = size, alias = alias):
+                    _worst = max(self.error(alias, fn(x), getattr(s, alias)(x)) for x in self.samples[alias])
+                    self.assertLessEqual(_worst, s.bounds[alias])
+            with self.subTest(size = size, alias = "log"):
+                # ln(2) is exact, so only ln(n) contributes error.
+                for x in self.samples["log"]:
+                    _tolerance = s.bounds["log"] / math.log(2) + 4 * math.ulp(math.log2(x))
+                    self.assertLessEqual(abs(s.log(x, 2.0) - math.log2(x)), _tolerance)
+
+    def test_table_edges(self):
+        """Test inputs that reduce to just outside a table's range, such
+        as (m + 0.5) * ln(2) for `e`.
+        """
+        s = ApproxSet(64)
+        samples = [1.0397207708399179]
+        for m in range(-1010, 1010):
+            c = (m + 0.5) * math.log(2)
+            samples.extend(c + k * math.ulp(c) for k in range(-4, 5) if abs(c) < 700)
+        for x in samples:
+            self.assertLessEqual(self.error("e", math.exp(x), s.e(x)), s.bounds["e"], x)
+        if np is not None:
+            self.assertEqual(s.e(np.array(samples)).tolist(), [s.e(x) for x in samples])
+
+    def test_bounds_shrink(self):
+        self.assertAlmostEqual(ApproxSet(1024).bounds["sin"] / ApproxSet(2048).bounds["sin"], 4.0, places = 3)
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_arrays_match_scalars(self):
+        s = approx_set()
+        for alias in REFERENCE:
+            with self.subTest(alias = alias):
+                x = np.array(self.samples[alias])
+                self.assertEqual(getattr(s, alias)(x).tolist(), [getattr(s, alias)(v) for v in x.tolist()])
+        x = np.array(self.samples["log"])
+        self.assertEqual(s.log(x, 10.0).tolist(), [s.log(v, 10.0) for v in x.tolist()])
+
+    def test_arrays_without_numpy(self):
+        s = approx_set()
+        x = array("d", [0.0, 0.5, 1.0])
+        if np is None:
+            self.assertEqual(list(s.cos(x)), [s.cos(v) for v in x])
+
+    def test_domain(self):
+        """Test that scalars outside the domain fail like `math`.
+        """
+        s = approx_set()
+        for call in (lambda: s.acos(1.5), lambda: s.log(-1.0, 10.0), lambda: s.log(0.0, 10.0), lambda: s.sin(math.inf)):
+            self.assertRaises(ValueError, call)
+        self.assertRaises(OverflowError, s.e, 1000.0)
+        self.assertRaises(ZeroDivisionError, s.log, 5.0, 1.0)
+        self.assertEqual(s.e(-1000.0), 0.0)
+        self.assertEqual(s.tanh(-50.0), -1.0)
+        self.assertEqual(s.acos(1.0), 0.0)
+        self.assertTrue(math.isnan(s.sin(math.nan)))
+
+    def test_invalid_size(self):
+        self.assertRaises(ValueError, ApproxSet, 1000)
+
+
+class RpnApproxTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+
+    def test_set_approximate(self):
+        """Test that switching sets keeps custom operators and other instances.
+        """
+        self.rpn.add_expression("hyp", lambda a, b: math.hypot(a, b))
+        self.rpn.set_approximate(table_size = 256)
+        self.assertTrue(self.rpn.approximate)
+        self.assertEqual([e.alias for e in self.rpn.custom_expressions], ["hyp"])
+        self.assertFalse(Rpn().approximate)
+
+        code, _, value = self.rpn.compile("0.5 sin 2 hyp").run()
+        self.assertEqual(code, 0)
+        self.assertNotEqual(value, math.hypot(math.sin(0.5), 2))
+        self.assertAlmostEqual(value, math.hypot(math.sin(0.5), 2), delta = approx_set(256).bounds["sin"])
+
+        self.rpn.set_approximate(False)
+        self.assertFalse(self.rpn.approximate)
+        self.assertEqual(self.rpn.compile("0.5 sin 2 hyp").run()[2], math.hypot(math.sin(0.5), 2))
+        self.assertEqual(self.rpn.registry.expressions[:len(Rpn.BUILTINS)], Rpn.BUILTINS.expressions)
+
+    def test_snapshot_skips_approx(self):
+        self.rpn.set_approximate()
+        restored = Rpn()
+        restored.restore(self.rpn.snapshot())
+        self.assertEqual(restored.custom_expressions, [])
+
+    def tearDown(self):
+        del self.rpn
+
+
+if __name__ == "__main__":
+    unittest.main()
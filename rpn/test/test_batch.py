@@ -0,0 +1,71 @@
+import math
+import unittest
+
+from rpn.src._batch import evaluate_batch
+from rpn.src._budget import Budget, BUDGET_TOKENS
+from rpn.src._rpn import Rpn
+from rpn.src._vector import is_operand
+
+
+class BatchTestCase(unittest.TestCase):
+    def test_evaluate_batch(self):
+        """Test that results and codes land at their expression's position.
+        """
+        expressions = [f"{i} 2 *" for i in range(100)] + ["1 +", "2 [1,2] +", "3 4 ^"]
+        with evaluate_batch(expressions, processes = 2, chunk_size = 7) as result:
+            self.assertEqual(len(result), 103)
+            self.assertEqual(list(result.values[:100]), [2.0 * i for i in range(100)])
+            self.assertEqual(list(result.status[:100]), [0] * 100)
+            self.assertEqual((result.values[100], result.status[100]), (1.0, -1))
+            self.assertEqual(result.status[101], 1)
+            self.assertTrue(math.isnan(result.values[101]))
+            self.assertEqual((result.values[102], result.status[102]), (81.0, 0))
+
+    def test_evaluate_batch_error(self):
+        """Test that an expression raising an error fails only its own slot.
+        """
+        with evaluate_batch(["1 2 +", "2 acos", "[1,2] [[1,2],[3,4]] dot", "10 400 ^", "3"], processes = 1) as result:
+            self.assertEqual(list(result.status), [0, 1, 1, 1, 0])
+            self.assertEqual((result.values[0], result.values[4]), (3.0, 3.0))
+            self.assertTrue(all(math.isnan(v) for v in result.values[1:4]))
+
+    def test_evaluate_batch_vector_scalar(self):
+        """Test that scalars computed from vectors fill their slot, NumPy ones too.
+        """
+        expressions = ["[1,2] [3,4] dot", "[1,2] [3,4] matmul"]
+        # Without NumPy, matmul of two vectors gives a vector of one value.
+        scalar = not is_operand(Rpn().compile(expressions[1]).run()[2])
+        with evaluate_batch(expressions, processes = 1) as result:
+            self.assertEqual(list(result.status), [0, 0 if scalar else 1])
+            self.assertEqual(result.values[0], 11.0)
+            if scalar:
+                self.assertEqual(result.values[1], 11.0)
+
+    def test_evaluate_batch_impure(self):
+        """Test that rolling windows see the batch in order, however it is sliced.
+        """
+        expressions = [f"{i} 3 rsum" for i in range(50)]
+        rpn = Rpn()
+        expected = []
+        for expr in expressions:
+            rpn.evaluate(expr.split())
+            expected.append(rpn.result)
+        with evaluate_batch(expressions, processes = 4, chunk_size = 3) as result:
+            self.assertEqual(list(result.values), expected)
+
+    def test_evaluate_batch_budget(self):
+        with evaluate_batch(["1 2 + 3 +", "1 2 +"], processes = 1, budget = Budget(max_tokens = 3)) as result:
+            self.assertEqual(list(result.status), [BUDGET_TOKENS, 0])
+
+    def test_evaluate_batch_empty(self):
+        with evaluate_batch([], processes = 1) as result:
+            self.assertEqual(len(result), 0)
+
+    def test_close_twice(self):
+        result = evaluate_batch(["1"], processes = 1)
+        result.close()
+        result.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
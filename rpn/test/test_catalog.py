@@ -0,0 +1,72 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from rpn.src._rpn import Rpn
+from rpn.src._catalog import Catalog
+
+
+class CatalogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+        for i in range(200):
+            self.rpn.add_expression(f"op{i:03d}", lambda a, b: a + b)
+
+    def full_scan(self) -> list:
+        """Widths computed the way `set_length_data` used to.
+        """
+        _widths = [len(c) for c in self.rpn.description_cols]
+        for e in self.rpn.registry.expressions:
+            _widths = [max(w, n) for w, n in zip(_widths, e.lengths)]
+        return [int(w * 1.5) for w in _widths]
+
+    def test_widths_follow_updates(self):
+        """Test that cached widths match a full scan after adds and removals.
+        """
+        self.assertEqual(self.rpn.set_length_data(), self.full_scan())
+        self.rpn.add_expression("a_very_long_operator_name", lambda a, b: a)
+        self.assertEqual(self.rpn.set_length_data(), self.full_scan())
+        self.rpn.remove_expression("a_very_long_operator_name")
+        self.assertEqual(self.rpn.set_length_data(), self.full_scan())
+        self.rpn.del_nth(0)
+        self.assertEqual(len(self.rpn.catalog), len(self.rpn.registry))
+
+    def test_search(self):
+        catalog = self.rpn.catalog
+        self.assertEqual([e.alias for e in catalog.search("lo*")], ["log", "log"])
+        self.assertEqual(catalog.aliases("op19*"), [f"op19{i}" for i in range(10)])
+        self.assertEqual(catalog.aliases("*os"), ["acos", "cos"])
+        self.assertEqual(catalog.aliases("co"), ["acos", "cos"])
+        self.assertEqual(catalog.aliases("p05"), [f"op05{i}" for i in range(10)])
+        self.assertEqual(catalog.aliases("?a[xn]"), ["max"])
+        self.assertEqual(catalog.aliases("*"), catalog.aliases())
+
+    def test_search_matches_scan(self):
+        """Test that indexed lookups agree with matching every alias.
+        """
+        import fnmatch
+        catalog = Catalog(self.rpn.registry.expressions)
+        aliases = sorted(self.rpn.operators)
+        for pattern in ("op1*5", "*00*", "op[12]?0", "m*n", "*", "op", "[", "o?1*", "cos*"):
+            with self.subTest(pattern = pattern):
+                if any(w in pattern for w in "*?["):
+                    expected = [a for a in aliases if fnmatch.fnmatchcase(a, pattern)]
+                else:
+                    expected = [a for a in aliases if pattern in a]
+                self.assertEqual(catalog.aliases(pattern), expected)
+
+    def test_descriptions_pages(self):
+        _out = io.StringIO()
+        with redirect_stdout(_out):
+            self.rpn.descriptions(pattern = "op*", page = 2, page_size = 50)
+        lines = _out.getvalue().strip().splitlines()
+        self.assertTrue(lines[2].startswith("op050"))
+        self.assertEqual(len(lines), 2 + 50 + 1)
+        self.assertEqual(lines[-1], "Page 2 of 4 (200 operators).")
+
+    def tearDown(self):
+        del self.rpn
+
+
+if __name__ == "__main__":
+    unittest.main()
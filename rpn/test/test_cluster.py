@@ -0,0 +1,151 @@
+import io
+import socket
+import threading
+import unittest
+from contextlib import redirect_stderr
+
+from rpn.__main__ import main
+from rpn.src._rpn import Rpn
+from rpn.src._cluster import Cluster, ClusterError, Worker, _send, serve, start_workers
+
+
+class ClusterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.processes = []
+
+    def start(self, count, **kwargs):
+        workers = start_workers(count, **kwargs)
+        self.processes.extend(w.process for w in workers)
+        return [w.address for w in workers]
+
+    def tearDown(self):
+        for p in self.processes:
+            p.terminate()
+            p.join()
+
+    def expected(self, items):
+        rpn = Rpn()
+        return [rpn.compile(e).run(b) for e, b in items]
+
+    def test_results_in_order(self):
+        """Test that results of several workers are merged in input order.
+        """
+        items = [(f"x {i} * y -", {"x": 1.5, "y": i % 7}) for i in range(2000)]
+        items += [("1 +", {}), ("x 2 ^", {}), ("1 2 0 acos", {}), ("[1,2] x *", {"x": 3})]
+        with Cluster(self.start(3), shard_size = 25) as cluster:
+            results = cluster.evaluate(items)
+            self.assertEqual(cluster.stats["retried"], 0)
+        expected = self.expected(items[:-1])
+        self.assertEqual(results[:-1], [(c, m, v) for c, m, v in expected])
+        self.assertEqual(results[-1], (0, "", [3.0, 6.0]))
+
+    def test_plain_expressions(self):
+        with Cluster(self.start(2), shard_size = 3) as cluster:
+            self.assertEqual(cluster.evaluate(["1 2 +", "3 4 *".split(), "2 ("]),
+                             [(0, "", 3.0), (0, "", 12.0), (1, "Invalid token '(' at position 1.", None)])
+            # A second stream on the same connections.
+            self.assertEqual([v for _, _, v in cluster.map(f"{i} 1 +" for i in range(50))],
+                             [i + 1.0 for i in range(50)])
+
+    def test_retry_dead_worker(self):
+        """Test that shards of a worker that stops are sent to the others.
+        """
+        addresses = self.start(1, credits = 4, max_shards = 1) + self.start(2)
+        items = [(f"{i} x +", {"x": 0.5}) for i in range(400)]
+        with Cluster(addresses, shard_size = 5) as cluster:
+            results = cluster.evaluate(items)
+            self.assertEqual(cluster.stats["workers_lost"], 1)
+            self.assertGreater(cluster.stats["retried"], 0)
+            self.assertEqual(len(cluster.workers), 2)
+        self.assertEqual([v for _, _, v in results], [i + 0.5 for i in range(400)])
+
+    def test_timeout(self):
+        """Test that a worker that never answers is given up after `timeout`.
+        """
+        with socket.create_server(("127.0.0.1", 0)) as server:
+            def hang():
+                conn, _ = server.accept()
+                _send(conn, {"op": "hello", "credits": 2})
+                conn.recv(1 << 16)
+                stop.wait()
+                conn.close()
+            stop = threading.Event()
+            thread = threading.Thread(target = hang)
+            thread.start()
+            try:
+                with Cluster([server.getsockname()[:2]] + self.start(1), shard_size = 2, timeout = 0.5) as cluster:
+                    results = cluster.evaluate([f"{i} 2 *" for i in range(40)])
+                    self.assertEqual(cluster.stats["workers_lost"], 1)
+            finally:
+                stop.set()
+                thread.join()
+        self.assertEqual([v for _, _, v in results], [2.0 * i for i in range(40)])
+
+    def test_all_workers_lost(self):
+        addresses = self.start(2, credits = 1, max_shards = 1)
+        with Cluster(addresses, shard_size = 1) as cluster:
+            with self.assertRaises(ClusterError):
+                cluster.evaluate([f"{i} 1 +" for i in range(20)])
+
+    def test_unreachable(self):
+        with socket.create_server(("127.0.0.1", 0)) as s:
+            closed = s.getsockname()[:2]
+        with self.assertRaises(ClusterError):
+            Cluster([closed], connect_timeout = 1.0)
+        with Cluster([closed] + self.start(1)) as cluster:
+            self.assertEqual(len(cluster.workers), 1)
+
+    def test_zero_credits(self):
+        """Test that workers cannot grant no credits, and that a coordinator
+        skips any that do.
+        """
+        with self.assertRaises(ValueError):
+            serve(credits = 0)
+        with self.assertRaises(ValueError):
+            start_workers(1, credits = 0)
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main(["--worker", "127.0.0.1:0", "--credits", "0"])
+
+        with socket.create_server(("127.0.0.1", 0)) as server:
+            def greet():
+                conn, _ = server.accept()
+                with conn:
+                    _send(conn, {"op": "hello", "credits": 0})
+                    conn.recv(1 << 16)
+            thread = threading.Thread(target = greet)
+            thread.start()
+            try:
+                with Cluster([server.getsockname()[:2]] + self.start(1), shard_size = 2) as cluster:
+                    self.assertEqual(len(cluster.workers), 1)
+                    results = cluster.evaluate([f"{i} 2 *" for i in range(10)])
+            finally:
+                thread.join()
+        self.assertEqual([v for _, _, v in results], [2.0 * i for i in range(10)])
+
+    def test_worker_cache(self):
+        worker = Worker(cache_size = 2)
+        self.assertIs(worker.program("x 1 +"), worker.program("x 1 +"))
+        worker.program("x 2 +")
+        worker.program("x 3 +")
+        self.assertEqual(list(worker._programs), ["x 2 +", "x 3 +"])
+        self.assertEqual(worker.evaluate([["x 1 +", {"x": [1, 2]}]]), [[0, "", [2.0, 3.0]]])
+
+    def test_worker_item_errors(self):
+        """Test that failing and malformed items get code 1 in their slot.
+        """
+        worker = Worker()
+        worker.rpn.add_expression("boom", lambda a: None + a)
+        results = worker.evaluate([["1 boom", {}], ["x 1 +", {"x": "abc"}], ["x 1 +", None], [3, {}], ["1 2 +", {}]])
+        self.assertEqual([r[0] for r in results], [1, 1, 1, 1, 0])
+        self.assertEqual(results[-1], [0, "", 3.0])
+
+    def test_bad_item_keeps_connection(self):
+        items = [("x 1 +", {"x": 1}), ("x 1 +", {"x": [[1], None]}), ("x 1 +", {"x": 2})]
+        with Cluster(self.start(1), shard_size = 3, max_retries = 0) as cluster:
+            results = cluster.evaluate(items)
+            self.assertEqual(cluster.stats["workers_lost"], 0)
+        self.assertEqual([(c, v) for c, _, v in results], [(0, 2.0), (1, None), (0, 3.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
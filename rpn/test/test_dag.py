@@ -0,0 +1,64 @@
+import math
+import random
+import unittest
+
+from rpn.src._rpn import Rpn
+
+
+class DagTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+
+    def test_shared_prefix_evaluated_once(self):
+        """Test that a prefix shared by every expression is one set of nodes.
+        """
+        prefix = "x 10 - 3 /"
+        expressions = [f"{prefix} {i} *" for i in range(100)]
+        dag = self.rpn.compile_batch(expressions)
+        self.assertEqual(dag.operator_count, 2 + 100)
+        results = dag.run({"x": 16.0})
+        self.assertEqual([v for _, _, v in results], [2.0 * i for i in range(100)])
+
+    def test_matches_programs(self):
+        """Test that DAG results and codes match running each program.
+        """
+        expressions = [
+            "x y + x y + *", "x y -", "y x -", "1 +", "+", "x 0 /", "x y 1 sum",
+            "5 1 9 3 7 2 topk +", "x -1 ^ 0.5 ^", "x missing +", "0.0 x *", "-0.0 x *",
+            "x [1,2] max", "x 0 topk", "x nan topk",
+        ]
+        dag = self.rpn.compile_batch(expressions)
+        bindings = {"x": 3.0, "y": 4.0}
+        for expr, result in zip(expressions, dag.run(bindings)):
+            with self.subTest(expr = expr):
+                expected = self.rpn.compile(expr).run(bindings)
+                self.assertEqual(result[0], expected[0])
+                if expected[0] != 1:
+                    self.assertEqual(repr(result[2]), repr(expected[2]))
+
+    def test_impure_not_shared(self):
+        self.rpn.add_expression("noise", lambda a, b: a + b + random.random(), pure = False)
+        dag = self.rpn.compile_batch(["x 1 noise", "x 1 noise"])
+        self.assertEqual(dag.operator_count, 2)
+        first, second = dag.run({"x": 0.0})
+        self.assertNotEqual(first[2], second[2])
+
+    def test_impure_program_not_shared(self):
+        """Test that programs run as a whole are not shared when impure.
+        """
+        self.rpn.add_expression("noise", lambda a, b: a + b + random.random(), pure = False)
+        dag = self.rpn.compile_batch(["1 2 sum x noise", "1 2 sum x noise"])
+        first, second = dag.run({"x": 0.0})
+        self.assertNotEqual(first[2], second[2])
+
+    def test_pure_custom_shared(self):
+        self.rpn.add_expression("hyp", lambda a, b: math.hypot(a, b))
+        dag = self.rpn.compile_batch(["x 1 hyp", "x 1 hyp 2 *"])
+        self.assertEqual(dag.operator_count, 2)
+
+    def tearDown(self):
+        del self.rpn
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import math
+import unittest
+
+from rpn.src._rpn import Rpn
+
+
+class DualTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+
+    def finite_difference(self, program, bindings, name, h = 1e-6):
+        up, down = dict(bindings), dict(bindings)
+        up[name] += h
+        down[name] -= h
+        return (program.run(up)[2] - program.run(down)[2]) / (2 * h)
+
+    def test_gradient_matches_finite_differences(self):
+        """Test every derivative rule against central differences.
+        """
+        bindings = {"x": 0.7, "y": 1.9}
+        cases = [
+            "x y +", "x y -", "y x -", "x y *", "x y /", "y x /", "x y ^", "x 3 ^",
+            "x y log", "y x log", "x sin", "x cos", "x tanh", "x acos", "x e",
+            "x y * sin y e + x /",
+        ]
+        for expr in cases:
+            with self.subTest(expr = expr):
+                program = self.rpn.compile(expr)
+                value, grad = self.rpn.gradient(expr, bindings)
+                self.assertEqual(value, program.run(bindings)[2])
+                for name in program.variables:
+                    self.assertAlmostEqual(grad[name], self.finite_difference(program, bindings, name), places = 6)
+
+    def test_gradient_constant_exponent_negative_base(self):
+        value, grad = self.rpn.gradient("x 2 ^", {"x": -3.0})
+        self.assertEqual((value, grad["x"]), (9.0, -6.0))
+
+    def test_gradient_division_by_zero(self):
+        value, grad = self.rpn.gradient("x y /", {"x": 1.0, "y": 0.0})
+        self.assertEqual(value, math.inf)
+        self.assertTrue(math.isnan(grad["x"]))
+
+    def test_gradient_batch(self):
+        value, grad = self.rpn.gradient("x x * y +", {"x": [1.0, 2.0, 3.0], "y": 1.0})
+        self.assertEqual(list(value), [2.0, 5.0, 10.0])
+        self.assertEqual(list(grad["x"]), [2.0, 4.0, 6.0])
+        self.assertEqual(list(grad["y"]), [1.0, 1.0, 1.0])
+
+    def test_gradient_unsupported(self):
+        with self.assertRaises(ValueError):
+            self.rpn.gradient("x y sum", {"x": 1.0, "y": 2.0})
+
+    def tearDown(self):
+        del self.rpn
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,401 @@
+"""
+Differential fuzzing of the evaluation engines.
+
+Random programs over every built-in operator, valid and deliberately
+broken, run through the reference path, `Rpn.execute_next`, and through
+each fast path, which must agree on the return code and, bit for bit,
+on the value, NaN and infinities included.  Engines are also timed
+against the reference, so a speed regression fails as well.
+
+Column engines run each program over several rows at once, and must
+match running the compiled program on each row.  Bulk engines run the
+whole corpus in one call, on worker processes.
+
+Environment variables:
+
+    RPN_FUZZ_CASES      Programs per run, default 300.
+    RPN_FUZZ_SEED       Seed of the first run, default 0.
+    RPN_FUZZ_SLACK      Multiplier of the speed limits, default 1.
+"""
+
+import io
+import math
+import os
+import random
+import tempfile
+import time
+import unittest
+from array import array
+
+from rpn.src._rpn import ARITY_ALL, Rpn
+from rpn.src._batch import evaluate_batch
+from rpn.src._cluster import Cluster, start_workers
+from rpn.src._csvio import evaluate_csv
+from rpn.src._dual import RULES, gradient
+from rpn.src._mapped import evaluate_mapped
+from rpn.src import _numexpr, _vector
+
+CASES = int(os.environ.get("RPN_FUZZ_CASES", 300))
+SEED = int(os.environ.get("RPN_FUZZ_SEED", 0))
+SLACK = float(os.environ.get("RPN_FUZZ_SLACK", 1.0))
+
+# Slowest each engine may be over the valid corpus, relative to the reference.
+SPEED_LIMITS = {"program": 1.0, "dag": 2.0, "lexer": 2.0}
+
+BINDINGS = {"x": 0.5, "y": -2.0, "z": 3.0}
+# Rows of the column engines, the first one being `BINDINGS`.
+ROWS = {"x": [0.5, 2.0, -1.0, 0.0, 1e300], "y": [-2.0, 0.5, 1e308, -0.0, 3.0], "z": [3.0, -0.5, 2.0, 1.0, -1e-300]}
+VECTORS = ["[1,2]", "[0.5,-1,3]"]
+OPERANDS = ["x", "y", "z", "0", "1", "-1", "2", "0.5", "-0.0", "1e308"] + VECTORS
+# Tokens no engine accepts, or variables without a value.
+NOISE = ["w", "1..2", "(", "[1,", "[]", "+-"]
+
+OK, LONE, ERROR = 0, -1, 1
+
+
+def _arity(expr) -> int:
+    return 1 if expr.arity == ARITY_ALL else expr.arity
+
+
+def generate(rng: random.Random, expressions: list, length: int) -> list:
+    """Return tokens that never run short of values.
+    """
+    tokens, depth = [], 0
+    for _ in range(length):
+        _ops = [e for e in expressions if _arity(e) <= depth]
+        if _ops and rng.random() < 0.45:
+            e = rng.choice(_ops)
+            if e.arity == ARITY_ALL and rng.random() < 0.3:
+                # Reductions take scalars only.
+                tokens.append(rng.choice(VECTORS))
+            tokens.append(e.alias)
+            depth = 1 if e.arity == ARITY_ALL else depth - e.arity + 1
+        else:
+            tokens.append(rng.choice(OPERANDS))
+            depth += 1
+    return tokens
+
+
+def mutate(rng: random.Random, tokens: list, expressions: list) -> list:
+    """Return tokens with one token dropped, inserted or replaced by noise.
+    """
+    tokens = list(tokens)
+    i = rng.randrange(len(tokens) + 1)
+    _choice = rng.randrange(3)
+    if _choice == 0 and tokens:
+        del tokens[min(i, len(tokens) - 1)]
+    elif _choice == 1:
+        tokens.insert(i, rng.choice(expressions).alias)
+    else:
+        tokens.insert(i, rng.choice(NOISE))
+    return tokens
+
+
+def key(value):
+    """Return value in a form that compares bit for bit, -0.0 and NaN included.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        # NumPy float64 included.
+        return float(value).hex()
+    if _vector.np is not None and isinstance(value, _vector.np.ndarray):
+        value = value.tolist()
+    return tuple(key(v) for v in value)
+
+
+def same(value: float, expected: float) -> bool:
+    """Return True if a column engine's value matches the one of a row.
+
+    Bit for bit without NumPy.  With NumPy, to rounding wherever the row
+    succeeds: ufuncs may round differently from `math`, and report
+    domain errors as NaN rather than failing, even below the top of the
+    stack, where they do not reach the result.
+    """
+    if _vector.np is None or key(value) == key(expected):
+        return key(value) == key(expected)
+    return math.isnan(expected) or math.isclose(value, expected, rel_tol = 1e-9, abs_tol = 1e-300)
+
+
+def _substitute(tokens: list) -> list:
+    return [repr(BINDINGS[t]) if t in BINDINGS else t for t in tokens]
+
+
+def _reference(rpn: Rpn, tokens: list) -> tuple:
+    code, _ = rpn.evaluate(_substitute(tokens))
+    if code == ERROR:
+        return ERROR, None
+    return code, rpn.stack.head if len(rpn.stack) > 0 else None
+
+
+def _outcome(result: tuple) -> tuple:
+    code, _, value = result
+    return (ERROR, None) if code == ERROR else (code, value)
+
+
+# Engines as (prepare, run): `prepare(rpn, tokens)` does the work done
+# once per expression, and is not timed.  Compiled engines reject
+# invalid tokens before running anything, with ValueError, unlike the
+# reference, which may stop short of them.  Running never raises.
+ENGINES = {
+    "reference": (lambda rpn, tokens: tokens, _reference),
+    "program": (lambda rpn, tokens: rpn.compile(tokens), lambda rpn, p: _outcome(p.run(BINDINGS))),
+    "dag": (lambda rpn, tokens: rpn.compile_batch([tokens]), lambda rpn, d: _outcome(d.run(BINDINGS)[0])),
+    "lexer": (lambda rpn, tokens: " ".join(tokens).encode(),
+              lambda rpn, data: _outcome(rpn.evaluate_stream(data, BINDINGS))),
+}
+COMPILED = frozenset(("program", "dag"))
+
+
+def by_row(program) -> list:
+    """Return value of program on each row, NaN where it fails or leaves
+    a vector, as column engines store it.
+    """
+    _result = []
+    for i in range(len(ROWS["x"])):
+        code, _, value = program.run({k: v[i] for k, v in ROWS.items()})
+        _ok = code in (OK, LONE) and value is not None and not _vector.is_operand(value)
+        _result.append(float(value) if _ok else math.nan)
+    return _result
+
+
+def _mapped(program, directory: str) -> list:
+    out = os.path.join(directory, "out")
+    evaluate_mapped(program, {k: os.path.join(directory, k) for k in ROWS}, out, chunk_size = 3)
+    _result = array("d")
+    with open(out, "rb") as f:
+        _result.frombytes(f.read())
+    return _result.tolist()
+
+
+def _csv(program, directory: str) -> list:
+    src = io.StringIO("x,y,z\n" + "".join(f"{x!r},{y!r},{z!r}\n" for x, y, z in zip(*ROWS.values())))
+    dst = io.StringIO()
+    evaluate_csv(program, src, dst, chunk_rows = 3)
+    return [float(v) for v in dst.getvalue().split()[1:]]
+
+
+# Column engines as `run(program, directory)`, where the directory holds
+# one float64 file per column of `ROWS`.  They return one value per row.
+COLUMNAR = {
+    "mapped": _mapped,
+    "csv": _csv,
+}
+
+
+def _batch(corpus: list, workers: list) -> list:
+    with evaluate_batch([_substitute(t) for t in corpus], processes = 2) as result:
+        return list(zip(result.status.tolist(), result.values.tolist()))
+
+
+def _cluster(corpus: list, workers: list) -> list:
+    with Cluster(workers, shard_size = 16) as cluster:
+        return [_outcome(r) for r in cluster.evaluate([(t, BINDINGS) for t in corpus])]
+
+
+def _as_batch(outcome: tuple) -> tuple:
+    # Batch results are scalars, NaN where evaluation fails.
+    code, value = outcome
+    if code == ERROR or _vector.is_operand(value):
+        return ERROR, math.nan
+    return code, math.nan if value is None else float(value)
+
+
+def _compiled(rpn: Rpn, tokens: list) -> tuple:
+    # Reference outcome of engines that compile, with empty windows.
+    rpn.rolling.clear()
+    try:
+        rpn.compile(tokens)
+    except ValueError:
+        return ERROR, None
+    return _reference(rpn, tokens)
+
+
+# Bulk engines as (run, expected, impure): `run(corpus, workers)`, given
+# the addresses of cluster workers, returns outcomes that must equal
+# `expected(rpn, tokens)` for each program in turn, on one `Rpn`.
+# Impure programs are left out unless the engine runs them in order.
+BULK = {
+    "batch": (_batch, lambda rpn, tokens: _as_batch(_reference(rpn, tokens)), True),
+    "cluster": (_cluster, _compiled, False),
+}
+
+
+def run(name: str, rpn: Rpn, tokens: list) -> tuple:
+    """Return code and value of tokens run through engine, with empty
+    rolling windows, so every engine starts from the same state.
+    """
+    prepare, _run = ENGINES[name]
+    rpn.rolling.clear()
+    try:
+        prepared = prepare(rpn, tokens)
+    except ValueError:
+        return ERROR, None
+    return _run(rpn, prepared)
+
+
+class FuzzTestCase(unittest.TestCase):
+    # Seconds per engine over the valid corpus, filled in by `test_speed`.
+    timings = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.rpn = Rpn()
+        cls.expressions = list(cls.rpn.registry.expressions)
+        rng = random.Random(SEED)
+        cls.valid = [generate(rng, cls.expressions, rng.randint(1, 24)) for _ in range(CASES)]
+        cls.invalid = [mutate(rng, t, cls.expressions) for t in cls.valid]
+
+    def compiles(self, tokens: list) -> bool:
+        try:
+            self.rpn.compile(tokens)
+        except ValueError:
+            return False
+        return True
+
+    def pure(self, tokens: list) -> bool:
+        registry = self.rpn.registry
+        return all(registry.expressions[registry.index(t)].pure for t in tokens if t in registry.aliases)
+
+    def check(self, corpus: list) -> None:
+        for tokens in corpus:
+            expected = run("reference", self.rpn, tokens)
+            compiles = self.compiles(tokens)
+            for name in ENGINES:
+                code, value = run(name, self.rpn, tokens)
+                with self.subTest(engine = name, expr = " ".join(tokens)):
+                    if name in COMPILED and not compiles:
+                        self.assertEqual(code, ERROR)
+                        continue
+                    self.assertEqual(code, expected[0])
+                    self.assertEqual(key(value), key(expected[1]))
+
+    def test_valid(self):
+        self.check(self.valid)
+
+    def test_invalid(self):
+        self.check(self.invalid)
+
+    def test_columnar(self):
+        """Test that column engines match running the program on each row,
+        with rolling windows fed the rows in order.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            for name, values in ROWS.items():
+                with open(os.path.join(directory, name), "wb") as f:
+                    array("d", values).tofile(f)
+            for tokens in self.valid + self.invalid:
+                if not self.compiles(tokens) or not set(self.rpn.compile(tokens).variables) <= set(ROWS):
+                    continue
+                program = self.rpn.compile(tokens)
+                self.rpn.rolling.clear()
+                expected = by_row(program)
+                for name, _run in COLUMNAR.items():
+                    self.rpn.rolling.clear()
+                    values = _run(program, directory)
+                    with self.subTest(engine = name, expr = " ".join(tokens)):
+                        self.assertTrue(all(map(same, values, expected)), (values, expected))
+
+    def test_bulk(self):
+        """Test that bulk engines match the reference on every program.
+        """
+        workers = start_workers(2)
+        try:
+            for name, (_run, _expected, impure) in BULK.items():
+                corpus = [t for t in self.valid + self.invalid if impure or self.pure(t)]
+                rpn = Rpn()
+                expected = [_expected(rpn, t) for t in corpus]
+                results = _run(corpus, [w.address for w in workers])
+                for tokens, result, outcome in zip(corpus, results, expected):
+                    with self.subTest(engine = name, expr = " ".join(tokens)):
+                        self.assertEqual(result[0], outcome[0])
+                        self.assertEqual(key(result[1]), key(outcome[1]))
+        finally:
+            for w in workers:
+                w.process.terminate()
+                w.process.join()
+
+    def test_gradient(self):
+        """Test that forward-mode values match, where every operator has a rule.
+
+        Programs may also fail where a derivative is undefined, such as
+        `acos` at -1, and the rules add without `math.fsum`, which fails
+        on overflow, so values are compared where both succeed.
+        """
+        for tokens in self.valid + self.invalid:
+            if any(t in self.rpn.operators and t not in RULES for t in tokens) or any("[" in t for t in tokens):
+                continue
+            code, value = run("reference", self.rpn, tokens)
+            if code == ERROR or value is None:
+                continue
+            with self.subTest(expr = " ".join(tokens)):
+                try:
+                    result = gradient(self.rpn.compile(tokens), BINDINGS)[0]
+                except ValueError:
+                    continue
+                self.assertEqual(key(result), key(value))
+
+    @unittest.skipIf(_vector.np is None, "NumPy is not installed.")
+    def test_arrays(self):
+        """Test that array backends match to rounding wherever the reference succeeds.
+
+        Elementwise ufuncs may round differently from `math`, and report
+        domain errors as NaN rather than failing.
+        """
+        backends = ["numpy"] + ["numexpr"] * (_numexpr.numexpr is not None)
+        for tokens in self.valid:
+            if any("[" in t for t in tokens) or any(t in self.rpn.operators and t not in _numexpr.TEMPLATES for t in tokens):
+                continue
+            code, value = run("reference", self.rpn, tokens)
+            if code != OK or value is None:
+                continue
+            for backend in backends:
+                with self.subTest(backend = backend, expr = " ".join(tokens)):
+                    try:
+                        result = float(_numexpr.evaluate(self.rpn.compile(tokens), dict(BINDINGS), backend))
+                    except ValueError:
+                        continue
+                    if math.isnan(value):
+                        self.assertTrue(math.isnan(result))
+                    else:
+                        self.assertTrue(math.isclose(result, value, rel_tol = 1e-9, abs_tol = 1e-300), (result, value))
+
+    def test_parallel(self):
+        """Test that subtrees run in worker processes give identical results.
+        """
+        rng = random.Random(SEED)
+        binary = [e for e in self.expressions if e.arity != ARITY_ALL and e.pure and e.alias not in ("dot", "matmul")]
+        for _ in range(2):
+            tokens = generate(rng, binary, 600)
+            expected = run("reference", self.rpn, tokens)
+            code, _, value = self.rpn.evaluate_parallel(tokens, BINDINGS, processes = 2, threshold = 16)
+            with self.subTest(expr = " ".join(tokens)):
+                self.assertEqual(ERROR if code == ERROR else code, expected[0])
+                if code != ERROR:
+                    self.assertEqual(key(value), key(expected[1]))
+
+    def test_speed(self):
+        """Test that no engine is slower than the reference beyond its limit.
+        """
+        for name, (prepare, _run) in ENGINES.items():
+            _prepared = []
+            for tokens in self.valid:
+                try:
+                    _prepared.append(prepare(self.rpn, tokens))
+                except ValueError:
+                    pass
+            _best = math.inf
+            for _ in range(5):
+                _start = time.perf_counter()
+                for p in _prepared:
+                    _run(self.rpn, p)
+                _best = min(_best, time.perf_counter() - _start)
+            self.timings[name] = _best
+
+        for name, limit in SPEED_LIMITS.items():
+            with self.subTest(engine = name):
+                self.assertLessEqual(self.timings[name], self.timings["reference"] * limit * SLACK, self.timings)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import mmap
+import os
+import tempfile
+import types
+import unittest
+
+from rpn.src._rpn import Rpn
+from rpn.src._lexer import lex
+from rpn.src._program import OP, PUSH
+from rpn.src._cmd import parse_arg
+
+
+class LexerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+        self.registry = self.rpn.registry
+
+    def test_lex_matches_program(self):
+        """Test that bytes, memoryview and str give the instructions of `Program`.
+        """
+        expr = "  3 x\t4.5e1 + \n [1,2] * -2 nan sum "
+        expected = self.rpn.compile(expr).instructions
+        for data in (expr, expr.encode(), bytearray(expr.encode()), memoryview(expr.encode())):
+            with self.subTest(kind = type(data).__name__):
+                result = list(lex(data, self.registry))
+                self.assertEqual([k for k, _ in result], [k for k, _ in expected])
+                self.assertEqual(repr([p for k, p in result if k != OP]), repr([p for k, p in expected if k != OP]))
+                self.assertEqual([p for k, p in result if k == OP], [p for k, p in expected if k == OP])
+
+    def test_block_boundaries(self):
+        """Test that tokens cut by a block boundary are carried over whole.
+        """
+        data = b"12.5 345 +  6 \t 78 * xyz -"
+        expected = list(lex(data, self.registry))
+        for block_size in range(1, len(data) + 2):
+            with self.subTest(block_size = block_size):
+                self.assertEqual(list(lex(data, self.registry, block_size)), expected)
+                self.assertEqual(list(lex(data.decode(), self.registry, block_size)), expected)
+
+    def test_lex_is_lazy(self):
+        tokens = lex(b"1 2 + $ 3", self.registry)
+        self.assertIsInstance(tokens, types.GeneratorType)
+        self.assertEqual(next(tokens), (PUSH, 1.0))
+        self.assertEqual(next(tokens), (PUSH, 2.0))
+        self.assertEqual(next(tokens)[0], OP)
+        with self.assertRaises(ValueError) as cm:
+            next(tokens)
+        self.assertIn("position 3", str(cm.exception))
+
+    def test_evaluate_stream(self):
+        """Test that streamed evaluation matches `Program.run` and leaves the stack alone.
+        """
+        self.rpn.push(7.0)
+        for expr in ("1 2 + 3 *", "x 2 ^ x -", "5 1 -", "1 +", "+", "2 x $ +", b"\xff 1", ""):
+            with self.subTest(expr = expr):
+                code, _, value = self.rpn.evaluate_stream(expr, {"x": 3.0})
+                text = expr.decode(errors = "replace") if isinstance(expr, bytes) else expr
+                if "$" in text or "�" in text:
+                    self.assertEqual(code, 1)
+                else:
+                    self.assertEqual((code, value), self.rpn.compile(text).run({"x": 3.0})[::2])
+        self.assertEqual(self.rpn.stacker, [7.0])
+
+    def test_evaluate_mmap(self):
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(b"0 " + b"1 + " * 100000 + b"\n")
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+                self.assertEqual(self.rpn.evaluate_stream(mm), (0, "", 100000.0))
+        finally:
+            os.remove(path)
+
+    def test_parse_arg(self):
+        self.assertEqual(parse_arg("  1  2\t+ foo [1,2] ", self.rpn), ["1", "2", "+", "[1,2]"])
+        self.assertIsNone(parse_arg("", self.rpn))
+
+    def tearDown(self):
+        del self.rpn
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from array import array
+
+from rpn.src._rpn import Rpn
+from rpn.src._numexpr import evaluate, to_numexpr
+
+
+class NumexprTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+
+    def test_to_numexpr(self):
+        """Test translation keeps operand order of non-commutative operators.
+        """
+        tests = [
+            dict(expr = "x y -", expected = "(x - y)"),
+            dict(expr = "x y /", expected = "where(y != 0, x / y, _inf)"),
+            dict(expr = "x 2 ^ y +", expected = "((x ** 2.0) + y)"),
+            dict(expr = "x y 2 log", expected = "(log(2.0) / log(y))"),
+            dict(expr = "x cos", expected = "cos(x)"),
+            dict(expr = "x -", expected = "x"),
+        ]
+        for t in tests:
+            with self.subTest(expr = t["expr"]):
+                self.assertEqual(to_numexpr(self.rpn.compile(t["expr"])), t["expected"])
+
+    def test_to_numexpr_unsupported(self):
+        for expr in ["x y sum", "+", "[1,2] x +"]:
+            with self.subTest(expr = expr):
+                with self.assertRaises(ValueError):
+                    to_numexpr(self.rpn.compile(expr))
+
+    def test_evaluate_fallback(self):
+        """Test evaluation through the fallback path matches row by row.
+        """
+        program = self.rpn.compile("x y * 2 ^ x 1 + /")
+        x, y = array("d", [1, 2, 3]), array("d", [4, 5, 6])
+        result = evaluate(program, {"x": x, "y": y}, backend = "numpy")
+        expected = [program.run({"x": a, "y": b})[2] for a, b in zip(x, y)]
+        self.assertEqual(list(result), expected)
+
+    def test_evaluate_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            evaluate(self.rpn.compile("x"), {"x": 1.0}, backend = "gpu")
+
+    def tearDown(self):
+        del self.rpn
+
+
+if __name__ == "__main__":
+    unittest.main()
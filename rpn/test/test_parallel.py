@@ -0,0 +1,64 @@
+import random
+import unittest
+
+from rpn.src._rpn import Rpn
+from rpn.src._parallel import subtrees
+
+
+def balanced(depth: int, rng: random.Random) -> list:
+    """Return tokens of a random balanced tree of binary operators, with
+    `^` only applied to positive leaves.
+    """
+    if depth == 0:
+        return [rng.choice(["x", "y", str(rng.uniform(0.5, 2.0))])]
+    return balanced(depth - 1, rng) + balanced(depth - 1, rng) + [rng.choice(["+", "-", "*", "/"] + ["^"] * (depth == 1))]
+
+
+class ParallelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+        self.bindings = {"x": 1.25, "y": 0.75}
+
+    def test_subtrees(self):
+        """Test that slices are disjoint, in order and each one subtree.
+        """
+        program = self.rpn.compile(balanced(8, random.Random(1)))
+        slices = subtrees(program, 64, 16)
+        self.assertGreater(len(slices), 1)
+        self.assertEqual(slices, sorted(slices))
+        for (_, b), (c, _) in zip(slices, slices[1:]):
+            self.assertLessEqual(b, c)
+        for a, b in slices:
+            self.assertLessEqual(b - a, 64)
+            self.assertEqual(self.rpn.compile(list(program.tokens[a:b])).run(self.bindings)[0], 0)
+
+    def test_matches_sequential(self):
+        """Test that results are bit-identical to a sequential run.
+        """
+        for seed in range(3):
+            tokens = balanced(9, random.Random(seed))
+            expected = self.rpn.compile(tokens).run(self.bindings)
+            result = self.rpn.evaluate_parallel(tokens, self.bindings, processes = 2, threshold = 32)
+            self.assertEqual(result[0], expected[0])
+            self.assertEqual(repr(result[2]), repr(expected[2]))
+
+            self.rpn.evaluate([str(self.bindings.get(t, t)) for t in tokens])
+            self.assertEqual(repr(result[2]), repr(self.rpn.stack.head))
+
+    def test_fallbacks(self):
+        """Test failures, reductions and custom operators keep sequential results.
+        """
+        self.rpn.add_expression("hyp", lambda a, b: (a * a + b * b) ** 0.5)
+        left = " ".join(balanced(6, random.Random(5)))
+        for expr in (f"{left} {left} 0 0 / +", f"{left} {left} sum", f"{left} {left} hyp", f"{left} 1 - {left} +"):
+            with self.subTest(expr = expr[-12:]):
+                expected = self.rpn.compile(expr).run(self.bindings)
+                self.assertEqual(self.rpn.evaluate_parallel(expr, self.bindings, processes = 2, threshold = 8),
+                                 expected)
+
+    def tearDown(self):
+        del self.rpn
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import sys
+import shutil
+import tempfile
+import textwrap
+import unittest
+
+from rpn.src._rpn import Rpn, ARITY_ALL
+from rpn.src._plugins import LazyExpression, discover
+from rpn.src._cmd import parse_arg
+
+GROUP = "rpn.test_operators"
+EXTRA_GROUP = "rpn.test_operators_extra"
+MODULE = "rpn_test_plugin_ops"
+
+
+class PluginTestCase(unittest.TestCase):
+    def setUp(self):
+        """Install a distribution declaring three operators, and one
+        broken declaration, on a temporary path entry.
+        """
+        self.path = tempfile.mkdtemp()
+        dist_info = os.path.join(self.path, "rpn_test_plugin-1.0.dist-info")
+        os.mkdir(dist_info)
+        with open(os.path.join(dist_info, "METADATA"), "w") as f:
+            f.write("Metadata-Version: 2.1\nName: rpn-test-plugin\nVersion: 1.0\n")
+        with open(os.path.join(dist_info, "entry_points.txt"), "w") as f:
+            f.write(textwrap.dedent(f"""\
+                [{GROUP}]
+                gcd/2 = {MODULE}:gcd
+                neg/1 = {MODULE}:neg
+                spread/all = {MODULE}:spread
+                broken = {MODULE}:neg
+
+                [{EXTRA_GROUP}]
+                tick/1/impure = {MODULE}:tick
+                neg2/1/pure = {MODULE}:neg
+                missing/1 = rpn_test_missing_module:f
+                """))
+        with open(os.path.join(self.path, f"{MODULE}.py"), "w") as f:
+            f.write(textwrap.dedent("""\
+                import math
+
+                def gcd(a, b):
+                    return float(math.gcd(int(b), int(a)))
+
+                def neg(n):
+                    return -n
+
+                def spread(values):
+                    values = list(values)
+                    return max(values) - min(values)
+
+                _ticks = []
+
+                def tick(n):
+                    _ticks.append(n)
+                    return float(len(_ticks))
+                """))
+        sys.path.insert(0, self.path)
+        self.rpn = Rpn()
+
+    def test_discover(self):
+        with self.assertWarns(UserWarning):
+            expressions = discover(GROUP)
+        self.assertEqual([(e.alias, e.arity, e.func_string) for e in expressions],
+                         [("gcd", 2, f"{MODULE}:gcd"), ("neg", 1, f"{MODULE}:neg"), ("spread", ARITY_ALL, f"{MODULE}:spread")])
+        self.assertEqual([e.signature for e in expressions], ["(a, b)", "(a)", "(values)"])
+
+    def test_lazy_import(self):
+        """Test that aliases are recognized before the module is imported.
+        """
+        with self.assertWarns(UserWarning):
+            self.assertEqual(self.rpn.load_plugins(GROUP), 3)
+        self.assertIn("gcd", self.rpn.operators)
+        self.assertEqual(parse_arg("12 18 gcd neg", self.rpn), ["12", "18", "gcd", "neg"])
+        self.assertNotIn(MODULE, sys.modules)
+
+        self.assertEqual(self.rpn.compile("12 18 gcd neg").run(), (0, "", -6.0))
+        self.assertIn(MODULE, sys.modules)
+        self.assertEqual(self.rpn.compile("4 9 1 spread").run(), (0, "", 8.0))
+
+    def test_purity(self):
+        """Test that the "/impure" suffix keeps engines from sharing applications.
+        """
+        self.assertEqual([(e.alias, e.arity, e.pure) for e in discover(EXTRA_GROUP)],
+                         [("tick", 1, False), ("neg2", 1, True), ("missing", 1, True)])
+        self.rpn.load_plugins(EXTRA_GROUP)
+        results = self.rpn.compile_batch([["0", "tick", "0", "tick", "+"]]).run()
+        self.assertEqual(results[0][2], 3.0)
+
+    def test_import_error(self):
+        """Test that an operator whose module is missing fails as code 1.
+        """
+        self.rpn.load_plugins(EXTRA_GROUP)
+        code, msg = self.rpn.evaluate("1 missing".split())
+        self.assertEqual(code, 1)
+        self.assertIn("'missing'", msg)
+        self.assertEqual(self.rpn.execute_next("missing")[0], 1)
+        self.assertEqual(self.rpn.compile("1 missing").run()[0], 1)
+        self.assertEqual(self.rpn.compile_batch([["1", "missing"]]).run()[0][0], 1)
+
+    def test_taken_alias_skipped(self):
+        self.rpn.add_expression("gcd", lambda a, b: a * b)
+        with self.assertWarns(UserWarning):
+            self.assertEqual(self.rpn.load_plugins(GROUP), 2)
+        self.assertNotIsInstance(self.rpn.registry.expressions[self.rpn.operation_index("gcd")], LazyExpression)
+
+    def test_snapshot_skips_plugins(self):
+        with self.assertWarns(UserWarning):
+            self.rpn.load_plugins(GROUP)
+        restored = Rpn()
+        restored.restore(self.rpn.snapshot())
+        self.assertNotIn("gcd", restored.operators)
+
+    def tearDown(self):
+        sys.path.remove(self.path)
+        sys.modules.pop(MODULE, None)
+        shutil.rmtree(self.path)
+        del self.rpn
+
+
+if __name__ == "__main__":
+    unittest.main()
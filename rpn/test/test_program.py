@@ -0,0 +1,160 @@
+import io
+import math
+import os
+import tempfile
+import unittest
+from array import array
+
+from rpn.src._rpn import Rpn
+from rpn.src._csvio import evaluate_csv
+from rpn.src import _vector
+
+
+class ProgramTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+
+    def test_program_variables(self):
+        program = self.rpn.compile("x y + x *")
+        self.assertEqual(program.variables, ("x", "y"))
+        self.assertEqual(program.run({"x": 2.0, "y": 3.0}), (0, "", 10.0))
+
+    def test_program_matches_evaluate(self):
+        """Test that compiled programs give the same results and codes
+        as `Rpn.evaluate`.
+        """
+        cases = ["5 5 5 8 + + -", "5 9 1 - /", "1 +", "+", "2 0 /", "1 2 3 sum", "3 4 ^ 2 log"]
+        for expr in cases:
+            with self.subTest(expr = expr):
+                code, _ = self.rpn.evaluate(expr.split())
+                p_code, _, value = self.rpn.compile(expr).run()
+                self.assertEqual(p_code, code)
+                if code != 1:
+                    self.assertEqual(value, self.rpn.stack.head)
+
+    def test_program_invalid_token(self):
+        with self.assertRaises(ValueError):
+            self.rpn.compile("1 2 {")
+
+    def test_program_missing_variable(self):
+        code, _, _ = self.rpn.compile("x 1 +").run()
+        self.assertEqual(code, 1)
+
+    def test_program_vector_binding(self):
+        code, _, value = self.rpn.compile("x 2 *").run({"x": array("d", [1, 2, 3])})
+        self.assertEqual(list(value), [2.0, 4.0, 6.0])
+
+    def tearDown(self):
+        del self.rpn
+
+
+class MappedTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+        self.dir = tempfile.TemporaryDirectory()
+
+    def column(self, name, values):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "wb") as f:
+            array("d", values).tofile(f)
+        return path
+
+    def read(self, path):
+        result = array("d")
+        with open(path, "rb") as f:
+            result.frombytes(f.read())
+        return list(result)
+
+    def test_evaluate_mapped(self):
+        """Test chunked evaluation over columns with a final partial chunk.
+        """
+        inputs = {"x": self.column("x", range(10)), "y": self.column("y", [2.0] * 10)}
+        out = os.path.join(self.dir.name, "out")
+        n = self.rpn.evaluate_mapped("x y ^ 1 +", inputs, out, chunk_size = 3)
+        self.assertEqual(n, 10)
+        self.assertEqual(self.read(out), [i * i + 1.0 for i in range(10)])
+
+    def test_evaluate_mapped_row_errors(self):
+        """Test that rows failing to evaluate are written as NaN.
+        """
+        inputs = {"x": self.column("x", [1.0, -1.0, 4.0])}
+        out = os.path.join(self.dir.name, "out")
+        self.rpn.evaluate_mapped("x 0.5 ^", inputs, out)
+        result = self.read(out)
+        self.assertEqual(result[0], 1.0)
+        self.assertTrue(math.isnan(result[1]))
+        self.assertEqual(result[2], 2.0)
+
+    def test_evaluate_mapped_matches_rows(self):
+        """Test that mapped results match running the program on each row,
+        including programs that mix rows or push vectors.
+        """
+        xs, ys = [1.0, -2.0, 3.0, 0.5, 4.0], [2.0, 5.0, -1.0, 0.5, 8.0]
+        inputs = {"x": self.column("x", xs), "y": self.column("y", ys)}
+        out = os.path.join(self.dir.name, "out")
+        for expr in ("x y max", "x y dot", "x [1,2] +", "x y sum", "x y + 2 *", "x y matmul", "x 0.5 ^"):
+            with self.subTest(expr = expr):
+                self.rpn.evaluate_mapped(expr, inputs, out, chunk_size = 2)
+                program = self.rpn.compile(expr)
+                expected = []
+                for x, y in zip(xs, ys):
+                    code, _, value = program.run({"x": x, "y": y})
+                    scalar = code in (0, -1) and value is not None and not _vector.is_operand(value)
+                    expected.append(float(value) if scalar else math.nan)
+                self.assertEqual(repr(self.read(out)), repr(expected))
+
+    def test_evaluate_mapped_length_mismatch(self):
+        inputs = {"x": self.column("x", [1.0]), "y": self.column("y", [1.0, 2.0])}
+        with self.assertRaises(ValueError):
+            self.rpn.evaluate_mapped("x y +", inputs, os.path.join(self.dir.name, "out"))
+
+    def test_evaluate_mapped_missing_input(self):
+        with self.assertRaises(ValueError):
+            self.rpn.evaluate_mapped("x y +", {"x": self.column("x", [1.0])}, os.path.join(self.dir.name, "out"))
+
+    def tearDown(self):
+        self.dir.cleanup()
+        del self.rpn
+
+class CsvTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+
+    def test_evaluate_csv(self):
+        """Test column binding by header across several chunks, with
+        NaN for rows that cannot be parsed.
+        """
+        src = io.StringIO("qty,price,fee\n3,2,1\n5,4,0.5\n1,x,1\n10,10,0\n2,2\n")
+        dst = io.StringIO()
+        n, _ = evaluate_csv(self.rpn.compile("price qty * fee -"), src, dst, chunk_rows = 2)
+        self.assertEqual(n, 5)
+        self.assertEqual(dst.getvalue().split(), ["result", "5.0", "19.5", "nan", "100.0", "nan"])
+
+    def test_evaluate_csv_matches_rows(self):
+        """Test that CSV results match running the program on each row,
+        including programs that mix rows or push vectors.
+        """
+        data = "x,y\n1,2\n-2,5\n3,-1\n0.5,0.5\n4,8\n"
+        rows = [(1.0, 2.0), (-2.0, 5.0), (3.0, -1.0), (0.5, 0.5), (4.0, 8.0)]
+        for expr in ("x y max", "x y dot", "x [1,2] +", "x y sum", "x y + 2 *", "x y matmul", "x 0.5 ^"):
+            with self.subTest(expr = expr):
+                dst = io.StringIO()
+                evaluate_csv(self.rpn.compile(expr), io.StringIO(data), dst, chunk_rows = 2)
+                program = self.rpn.compile(expr)
+                expected = []
+                for x, y in rows:
+                    code, _, value = program.run({"x": x, "y": y})
+                    scalar = code in (0, -1) and value is not None and not _vector.is_operand(value)
+                    expected.append(str(float(value) if scalar else math.nan))
+                self.assertEqual(dst.getvalue().split()[1:], expected)
+
+    def test_evaluate_csv_missing_column(self):
+        with self.assertRaises(ValueError):
+            evaluate_csv(self.rpn.compile("a b +"), io.StringIO("a,c\n1,2\n"), io.StringIO())
+
+    def tearDown(self):
+        del self.rpn
+
+
+if __name__ == "__main__":
+    unittest.main()
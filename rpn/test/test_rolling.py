@@ -0,0 +1,139 @@
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import unittest
+from array import array
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+from rpn.__main__ import main
+from rpn.src._csvio import evaluate_csv
+from rpn.src._rolling import Ewma, RollingExtreme, RollingSum
+from rpn.src._rpn import Rpn
+from rpn.src import _vector
+
+
+def naive_sum(window: list) -> float:
+    if any(math.isnan(v) for v in window) or (math.inf in window and -math.inf in window):
+        return math.nan
+    if math.inf in window or -math.inf in window:
+        return math.inf if math.inf in window else -math.inf
+    return math.fsum(window)
+
+
+def naive_extreme(window: list, fn) -> float:
+    _values = [v for v in window if not math.isnan(v)]
+    return math.nan if len(_values) < len(window) else fn(_values)
+
+
+def same(a: float, b: float) -> bool:
+    return (math.isnan(a) and math.isnan(b)) or math.isclose(a, b, rel_tol = 1e-12, abs_tol = 1e-9)
+
+
+class RollingStateTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.values = [rng.uniform(-1e6, 1e6) for _ in range(2000)]
+        for i, v in ((100, math.inf), (400, -math.inf), (405, math.inf), (900, math.nan)):
+            self.values[i] = v
+
+    def test_windows_match_naive(self):
+        """Test that every update matches a full pass over the window.
+        """
+        for size in (1, 3, 16, 250):
+            states = RollingSum(size), RollingSum(size, mean = True), RollingExtreme(size), RollingExtreme(size, greatest = True)
+            for i, x in enumerate(self.values):
+                window = self.values[max(0, i - size + 1):i + 1]
+                results = [s.update(x) for s in states]
+                expected = [naive_sum(window), naive_sum(window) / len(window),
+                            naive_extreme(window, min), naive_extreme(window, max)]
+                with self.subTest(size = size, i = i):
+                    self.assertTrue(all(map(same, results, expected)), (results, expected))
+
+    def test_ewma(self):
+        state = Ewma(0.5)
+        self.assertEqual([state.update(x) for x in (4.0, 2.0, 0.0)], [4.0, 3.0, 1.5])
+
+
+class RollingOperatorsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+
+    def test_state_carries_across_results(self):
+        """Test that windows outlive the stack between expressions.
+        """
+        means = []
+        for v in (1, 2, 3, 4, 5):
+            self.rpn.evaluate(f"{v} 3 rmean".split())
+            means.append(self.rpn.stack.head)
+        self.assertEqual(means, [1.0, 1.5, 2.0, 3.0, 4.0])
+        self.assertEqual(self.rpn.compile("6 3 rmean").run()[2], 5.0)
+        self.assertEqual(self.rpn.compile("x 0.5 ewma").run({"x": 2.0})[2], 2.0)
+
+    def test_vector_matches_scalars(self):
+        program = self.rpn.compile("x 4 rmax")
+        values = [3.0, 1.0, 4.0, 1.0, 5.0, 9.0, 2.0, 6.0]
+        expected = [program.run({"x": v})[2] for v in values]
+        self.rpn.rolling.clear()
+        code, _, result = program.run({"x": _vector.as_operand(values)})
+        self.assertEqual(code, 0)
+        self.assertEqual(list(result), expected)
+
+    def test_windows_per_instance(self):
+        other = Rpn()
+        self.rpn.compile("5 2 rsum").run()
+        self.assertEqual(other.compile("1 2 rsum").run()[2], 1.0)
+        self.assertEqual(self.rpn.custom_expressions, [])
+        restored = Rpn()
+        restored.restore(self.rpn.snapshot())
+        self.assertEqual(restored.operators, self.rpn.operators)
+
+    def test_invalid_parameters(self):
+        for expr in ("1 0 rsum", "1 2.5 rmean", "1 -3 rmin", "1 [1,2] rmax", "1 0 ewma", "1 1.5 ewma", "[[1,2],[3,4]] 2 rsum"):
+            with self.subTest(expr = expr):
+                self.assertEqual(self.rpn.compile(expr).run()[0], 1)
+        self.assertEqual(self.rpn.rolling.windows, {})
+
+    def test_csv_chunks(self):
+        """Test that windows carry across chunks, one row at a time.
+        """
+        data = "x,y\n1,10\n2,20\n3,x\n4,40\n5,50\n6,60\n"
+        outputs = []
+        for chunk_rows in (2, 100):
+            rpn, out = Rpn(), io.StringIO()
+            evaluate_csv(rpn.compile("x 2 rsum y 2 rmax +"), io.StringIO(data), out, chunk_rows)
+            outputs.append(out.getvalue().split()[1:])
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], ["11.0", "23.0", "nan", "nan", "59.0", "71.0"])
+
+    def test_mapped(self):
+        """Test that mapped mode feeds each row once, in order, even when
+        a chunk has failing rows.
+        """
+        values = [0.1, 0.2, 5.0, 0.1]
+        expected = [self.rpn.compile("x 2 rsum acos").run({"x": v}) for v in values]
+        with tempfile.TemporaryDirectory() as d:
+            path, out = os.path.join(d, "x"), os.path.join(d, "out")
+            with open(path, "wb") as f:
+                array("d", values).tofile(f)
+            self.assertEqual(Rpn().evaluate_mapped("x 2 rsum acos", {"x": path}, out, chunk_size = 4), 4)
+            result = array("d")
+            with open(out, "rb") as f:
+                result.frombytes(f.read())
+        self.assertEqual([code for code, _, _ in expected], [0, 0, 1, 1])
+        self.assertEqual(result[:2].tolist(), [value for _, _, value in expected[:2]])
+        self.assertTrue(all(math.isnan(v) for v in result[2:]))
+
+    def test_stream(self):
+        stdin = io.StringIO("1 2 rsum\n2 2 rsum\n3 2 rsum\n")
+        with mock.patch.object(sys, "stdin", stdin), redirect_stdout(io.StringIO()) as out, redirect_stderr(io.StringIO()):
+            self.assertEqual(main(["--stream"]), 0)
+        self.assertEqual([json.loads(line)["value"] for line in out.getvalue().splitlines()], [1.0, 3.0, 5.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,22 @@
 
+import os
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 import math
-from rpn.src._rpn import Expression, OperatorsMixin, Rpn
+import statistics
+from rpn.src._rpn import Expression, OperatorsMixin, Rpn, Trail
+from rpn.src._budget import (
+    Budget,
+    BUDGET_DEPTH,
+    BUDGET_MAGNITUDE,
+    BUDGET_TIME,
+    BUDGET_TOKENS,
+    CANCELLED,
+    )
 from rpn.src._exceptions import ValueCountError
+from rpn.src import _snapshot
 
 
 
@@ -66,6 +79,54 @@ class RpnTestCase(unittest.TestCase):
         """
         self.assertEqual(self.rpn.stacker, [])
 
+    def test_rpn_reduce_operators(self):
+        """Test whole-stack reductions against `statistics`.
+        """
+        values = [0.1 * i for i in range(1, 101)]
+        cases = {
+            "sum": math.fsum(values),
+            "mean": statistics.mean(values),
+            "var": statistics.variance(values),
+            "stdev": statistics.stdev(values),
+            "min": min(values),
+            "max": max(values),
+            "median": statistics.median(values),
+        }
+        for oper, expected in cases.items():
+            with self.subTest(oper = oper):
+                self.rpn.evaluate([str(v) for v in values] + [oper])
+                self.assertEqual(self.rpn.stack_size, 1)
+                self.assertAlmostEqual(self.rpn.stack.head, expected, places = 12)
+
+    def test_rpn_reduce_topk(self):
+        self.rpn.evaluate("5 1 9 3 7 3 topk".split())
+        self.assertEqual(self.rpn.status, [5.0, 7.0, 9.0])
+
+    def test_rpn_reduce_invalid(self):
+        """Test that reductions reject vector operands and bad counts,
+        leaving the stack as it was.
+        """
+        for expr in ("[1,2] [3,4] max", "1 [3,4] 2 min", "[1,2] 2 topk", "5 1 9 0 topk",
+                     "5 1 9 -1 topk", "5 1 nan topk", "5 1 9 1.5 topk", "inf -inf sum"):
+            with self.subTest(expr = expr):
+                rpn = Rpn()
+                tokens = expr.split()
+                rpn.evaluate(tokens[:-1])
+                before = rpn.stack
+                self.assertEqual(rpn.execute_next(tokens[-1])[0], 1)
+                self.assertIs(rpn.stack, before)
+                self.assertEqual(rpn.compile(expr).run()[0], 1)
+
+    def test_rpn_reduce_single_pass_sum(self):
+        """Test that `sum` is exact where pairwise addition is not.
+        """
+        self.rpn.evaluate("1e100 1 -1e100 sum".split())
+        self.assertEqual(self.rpn.result, 1)
+
+    def test_rpn_reduce_arity(self):
+        self.assertEqual(self.rpn.registry.expressions[self.rpn.operation_index("mean")].arity, "all")
+        self.assertEqual(self.rpn.registry.expressions[self.rpn.operation_index("-")].arity, 2)
+
     def test_rpn_basic_operators(self):
         """Test that all initial operators appear when initializing Rpn().
         """
@@ -264,6 +325,303 @@ class RpnExecutionTestCase(unittest.TestCase):
         del self.rpn
 
 
+class RpnTrailTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn(checkpoint_every = 4)
+
+    def test_trail_checkpoints(self):
+        """Test that a checkpoint is stored every 4 tokens.
+        """
+        self.rpn.evaluate("1 2 + 3 4 + * 5 6".split())
+        self.assertEqual(self.rpn.trail.positions, [0, 4, 8])
+        self.assertEqual(self.rpn.trail.states[1].to_list(), [3.0, 3.0])
+        self.assertEqual(self.rpn.trail.states[2].to_list(), [21.0, 5.0])
+
+    def test_trail_skips_failed_tokens(self):
+        """Test that tokens returning an error are not recorded.
+        """
+        self.rpn.execute_next("+")
+        self.assertEqual(len(self.rpn.trail), 0)
+
+    def test_reevaluate_matches_full_run(self):
+        """Test that an edited expression gives the same result when
+        resumed from a checkpoint as when run from the start.
+        """
+        tokens = "1 2 + 3 4 + * 5 6 - - 7 8 * +".split()
+        self.rpn.evaluate(tokens)
+        tokens[9] = "+"
+        self.rpn.reevaluate(tokens)
+
+        expected = Rpn()
+        expected.evaluate(tokens)
+        self.assertEqual(self.rpn.status, expected.status)
+        self.assertEqual(self.rpn.trail.tokens, tokens)
+
+    def test_reevaluate_resumes_from_checkpoint(self):
+        """Test that tokens before the nearest checkpoint are not re-run.
+        """
+        tokens = "1 2 + 3 4 + * 5 6 -".split()
+        self.rpn.evaluate(tokens)
+        previous = self.rpn.trail
+        tokens[9] = "+"
+        self.rpn.reevaluate(tokens)
+        self.assertIs(self.rpn.trail.states[2], previous.states[2])
+
+    def test_reset_clears_trail(self):
+        self.rpn.evaluate("1 2 +".split())
+        self.rpn.reset
+        self.assertEqual(len(self.rpn.trail), 0)
+
+    def test_trail_invalid_interval(self):
+        with self.assertRaises(ValueError):
+            Trail(0)
+
+    def tearDown(self):
+        del self.rpn
+
+
+class RpnUndoTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn(history_depth = 3)
+
+    def test_undo_operator(self):
+        """Test that undoing an operator restores both operands.
+        """
+        self.rpn.evaluate("2 3 +".split())
+        self.assertTrue(self.rpn.undo())
+        self.assertEqual(self.rpn.status, [2.0, 3.0])
+        self.assertEqual(self.rpn.trail.tokens, ["2", "3"])
+
+    def test_redo(self):
+        """Test that redo re-applies undone steps in order.
+        """
+        self.rpn.evaluate("2 3 +".split())
+        self.rpn.undo()
+        self.rpn.undo()
+        self.assertEqual(self.rpn.status, [2.0])
+        self.assertTrue(self.rpn.redo())
+        self.assertTrue(self.rpn.redo())
+        self.assertFalse(self.rpn.redo())
+        self.assertEqual(self.rpn.status, [5.0])
+
+    def test_new_step_clears_redo(self):
+        self.rpn.evaluate("2 3 +".split())
+        self.rpn.undo()
+        self.rpn.execute_next("*")
+        self.assertFalse(self.rpn.redo())
+        self.assertEqual(self.rpn.status, [6.0])
+
+    def test_undo_depth_limit(self):
+        """Test that no more than `history_depth` steps can be undone.
+        """
+        self.rpn.evaluate("1 2 3 4 5".split())
+        for _ in range(3):
+            self.assertTrue(self.rpn.undo())
+        self.assertFalse(self.rpn.undo())
+        self.assertEqual(self.rpn.status, [1.0, 2.0])
+
+    def test_undo_remove_last(self):
+        self.rpn.evaluate("1 2".split())
+        self.rpn.remove_last
+        self.assertEqual(self.rpn.status, [1.0])
+        self.rpn.undo()
+        self.assertEqual(self.rpn.status, [1.0, 2.0])
+
+    def test_undo_shares_structure(self):
+        """Test that stored states share their nodes with the live stack.
+        """
+        self.rpn.evaluate("1 2 3".split())
+        previous, _ = self.rpn.undo_states[-1]
+        self.assertIs(self.rpn.stack.tail, previous)
+
+    def tearDown(self):
+        del self.rpn
+
+class RpnSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+
+    def test_snapshot_roundtrip(self):
+        """Test that stack and history survive snapshot and restore.
+        """
+        self.rpn.evaluate("1.5 2 3 + 4 4".split())
+        other = Rpn()
+        other.restore(self.rpn.snapshot())
+        self.assertEqual(other.status, [1.5, 5.0, 4.0, 4.0])
+        self.assertEqual(other.trail.tokens, ["1.5", "2", "3", "+", "4", "4"])
+
+    def test_snapshot_interns_tokens(self):
+        """Test that repeated tokens are stored once.
+        """
+        self.rpn.evaluate(["1"] * 10)
+        once = len(self.rpn.snapshot())
+        self.rpn.evaluate(["1"] * 20)
+        self.assertEqual(len(self.rpn.snapshot()) - once, 10 * (8 + 4))
+
+    def test_snapshot_custom_operator(self):
+        """Test that custom operators are saved by name and must be
+        registered again before restoring.
+        """
+        self.rpn.add_expression("hyp", lambda a, b: math.hypot(a, b))
+        self.rpn.evaluate("1 2".split())
+        data = self.rpn.snapshot()
+        other = Rpn()
+        with self.assertRaisesRegex(ValueError, "'hyp'"):
+            other.restore(data)
+        self.assertEqual(other.status, [])
+        other.add_expression("hyp", lambda a, b: math.hypot(a, b))
+        other.restore(data)
+        other.evaluate("3 4 hyp".split())
+        self.assertEqual(other.result, 5)
+
+    def test_snapshot_code_not_run(self):
+        """Test that the operator source held by version 1 snapshots is never run.
+        """
+        code = "__import__('os').environ.__setitem__('RPN_SNAPSHOT_PWNED', '1')"
+        data = _snapshot.HEADER.pack(_snapshot.MAGIC, 1, 0, 0, 0, 1) + b"".join(
+            _snapshot._pack_str(s) for s in ("x2", "(a)", code))
+        with self.assertRaisesRegex(ValueError, "'x2'"):
+            self.rpn.restore(data)
+        self.rpn.add_expression("x2", lambda a: a * 2)
+        self.rpn.restore(data)
+        self.rpn.evaluate("3 x2".split())
+        self.assertEqual(self.rpn.result, 6)
+        self.assertNotIn("RPN_SNAPSHOT_PWNED", os.environ)
+
+    def test_save_load(self):
+        self.rpn.evaluate("7 8 9".split())
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "session.rpn")
+            self.rpn.save(path)
+            other = Rpn()
+            other.load(path)
+        self.assertEqual(other.status, [7.0, 8.0, 9.0])
+
+    def test_restore_invalid(self):
+        with self.assertRaises(ValueError):
+            self.rpn.restore(b"not a snapshot at all!!!")
+
+    def test_restore_truncated(self):
+        """Test that a snapshot cut at any offset is rejected with ValueError.
+        """
+        self.rpn.evaluate("1 2 + 3 sq".split())
+        self.rpn.add_expression("hyp", lambda a, b: math.hypot(a, b))
+        data = self.rpn.snapshot()
+        other = Rpn()
+        other.add_expression("hyp", lambda a, b: math.hypot(a, b))
+        for n in range(len(data)):
+            with self.subTest(n = n), self.assertRaises(ValueError):
+                other.restore(data[:n])
+        other.restore(data)
+        self.assertEqual(other.status, self.rpn.status)
+
+    def tearDown(self):
+        del self.rpn
+
+class RpnConcurrencyTestCase(unittest.TestCase):
+    def test_registry_per_instance(self):
+        """Test that operators added to one instance do not leak into
+        another, nor into the shared builtin table.
+        """
+        first, second = Rpn(), Rpn()
+        first.add_expression("gcd", lambda a, b: math.gcd(int(b), int(a)))
+        self.assertIn("gcd", first.operators)
+        self.assertNotIn("gcd", second.operators)
+        self.assertNotIn("gcd", Rpn.BUILTINS.aliases)
+        self.assertEqual(len(second.OPS_DOUBLE_ARG), len(Rpn.BUILTINS) + len(second.rolling.expressions))
+
+    def test_remove_builtin_per_instance(self):
+        first, second = Rpn(), Rpn()
+        first.remove_expression("+")
+        self.assertNotIn("+", first.operators)
+        self.assertIn("+", second.operators)
+
+    def test_threads_isolated(self):
+        """Test that threads evaluating and registering operators
+        concurrently each get their own results.
+        """
+        def work(n):
+            rpn = Rpn()
+            rpn.add_expression(f"op{n}", lambda a, b: a + b)
+            for _ in range(200):
+                rpn.evaluate(f"{n} 2 * 1 +".split())
+                if rpn.result != 2 * n + 1 or len(rpn.operators) != len(Rpn.BUILTINS.aliases) + len(rpn.rolling.expressions) + 1:
+                    return False
+            return True
+
+        with ThreadPoolExecutor(max_workers = 8) as pool:
+            self.assertTrue(all(pool.map(work, range(32))))
+
+class RpnBudgetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+
+    def test_within_budget(self):
+        budget = Budget(max_tokens = 3, max_depth = 2, max_seconds = 10, max_magnitude = 10)
+        self.assertEqual(self.rpn.evaluate("2 3 +".split(), budget), (0, ""))
+        self.assertEqual(self.rpn.result, 5)
+
+    def test_token_budget(self):
+        code, _ = self.rpn.evaluate("1 2 + 3 +".split(), Budget(max_tokens = 4))
+        self.assertEqual(code, BUDGET_TOKENS)
+        self.assertEqual(self.rpn.status, [3.0, 3.0])
+
+    def test_depth_budget(self):
+        code, _ = self.rpn.evaluate("1 2 3 + +".split(), Budget(max_depth = 2))
+        self.assertEqual(code, BUDGET_DEPTH)
+
+    def test_magnitude_budget(self):
+        code, _ = self.rpn.evaluate("10 300 ^ 10 300 ^ *".split(), Budget(max_magnitude = 1e300))
+        self.assertEqual(code, BUDGET_MAGNITUDE)
+
+    def test_time_budget(self):
+        code, _ = self.rpn.evaluate(["1"] * 1000, Budget(max_seconds = -1, check_every = 100))
+        self.assertEqual(code, BUDGET_TIME)
+
+    def test_cancel(self):
+        budget = Budget()
+        budget.cancel()
+        code, _ = self.rpn.evaluate("1 2 +".split(), budget)
+        self.assertEqual(code, CANCELLED)
+
+    def test_magnitude_budget_empty_stack(self):
+        self.assertEqual(self.rpn.evaluate("2 topk".split(), Budget(max_magnitude = 10))[0], 0)
+        self.assertEqual(self.rpn.status, [])
+
+    def test_arithmetic_errors(self):
+        """Test that scalar operator errors are results, with or without a budget.
+        """
+        for expr in ("10 400 ^", "2 acos", "-1 0.5 ^", "1 2 log", "1 0 log"):
+            for budget in (None, Budget(max_depth = 10)):
+                with self.subTest(expr = expr, budget = budget):
+                    code, msg = self.rpn.evaluate(expr.split(), budget)
+                    self.assertEqual(code, 1)
+                    self.assertEqual(msg, self.rpn.compile(expr).run()[1])
+
+    def test_arithmetic_errors_execute_next(self):
+        """Test that operator errors are returned by `execute_next`, as
+        the shell calls it, leaving the stack as it was.
+        """
+        for expr in ("2 acos", "10 400 ^", "5 0 rsum", "[1,2] 0 rsum"):
+            with self.subTest(expr = expr):
+                rpn = Rpn()
+                tokens = expr.split()
+                for t in tokens[:-1]:
+                    rpn.execute_next(t)
+                before = rpn.stack
+                self.assertEqual(rpn.execute_next(tokens[-1]), rpn.compile(expr).run()[:2])
+                self.assertIs(rpn.stack, before)
+
+    def test_budget_reevaluate(self):
+        tokens = "1 2 + 3 +".split()
+        self.rpn.evaluate(tokens)
+        tokens[4] = "*"
+        code, _ = self.rpn.reevaluate(tokens, budget = Budget(max_magnitude = 5))
+        self.assertEqual(code, BUDGET_MAGNITUDE)
+
+    def tearDown(self):
+        del self.rpn
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,84 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+from rpn.__main__ import main
+from rpn.src._rpn import Rpn
+from rpn.src._script import ScriptError, parse, source
+
+
+class ScriptTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, text):
+        path = os.path.join(self.dir.name, "script.rpn")
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def source(self, text):
+        out = io.StringIO()
+        source(self.write(text), self.rpn, out)
+        return out.getvalue().splitlines()
+
+    def test_results(self):
+        """Test that lines share the stack and print results as the shell does.
+        """
+        lines = self.source("# comment\n3 4 +\n2 5   # no result yet\n*\n1 2 3 sum\n1.5 2 *\n")
+        self.assertEqual(lines, ["Result: 7", "Result: 10", "Result: 6", "Result: 3"])
+        self.assertEqual(list(self.rpn.stack), [])
+
+    def test_lone_value(self):
+        """Test that an operator applied to a lone value gives it as the
+        result, as in the shell.
+        """
+        self.assertEqual(self.source("5\n+\n"), ["Result: 5"])
+        self.assertEqual(list(self.rpn.stack), [])
+        self.assertEqual(self.source("4 5\n+ +\n7 + 3\n"), ["Result: 9"])
+        self.assertEqual(list(self.rpn.stack), [7.0])
+
+    def test_commands(self):
+        lines = self.source("1 2\nstate\nresult\n5 6\nc\n7\nops acos\n")
+        self.assertEqual(lines[:2], ["[1.0, 2.0]", "Result: 2"])
+        self.assertTrue(lines[-1].startswith("acos"))
+        self.assertEqual(list(self.rpn.stack), [7.0])
+
+    def test_validation(self):
+        """Test that an invalid line is reported before anything runs.
+        """
+        with self.assertRaises(ScriptError) as cm:
+            self.source("1 2 +\n\n3 foo\n")
+        self.assertEqual(cm.exception.line, 3)
+        self.assertEqual(list(self.rpn.stack), [])
+        with self.assertRaises(ScriptError):
+            parse(["1 2 +", "4 ("], self.rpn.registry)
+
+    def test_runtime_error(self):
+        """Test that execution stops at the failing line, keeping earlier output.
+        """
+        out = io.StringIO()
+        with self.assertRaises(ScriptError) as cm:
+            source(self.write("1 2 +\n4 5\n2 acos\n9 9 +\n"), self.rpn, out)
+        self.assertEqual(cm.exception.line, 3)
+        self.assertEqual(out.getvalue(), "Result: 3\n")
+
+    def test_main(self):
+        path = self.write("2 3 ^\n")
+        with redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main([path]), 0)
+        self.assertEqual(out.getvalue(), "Result: 8\n")
+        path = self.write("1 bar\n")
+        with redirect_stderr(io.StringIO()) as err:
+            self.assertEqual(main([path]), 1)
+        self.assertIn("line 1", err.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import ast
+import io
+import json
+import math
+import struct
+import sys
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+from rpn.__main__ import main
+from rpn.src._csvio import evaluate_csv
+from rpn.src._rpn import Rpn
+from rpn.src._sinks import NdjsonSink, NpySink, RawSink, open_sink
+from rpn.src import _vector
+
+RESULTS = [(0, 1.5), (-1, 2.0), (1, None), (0, math.inf), (0, -0.0), (0, _vector.as_operand([1.0, 2.0])), (4, None)]
+
+
+class CountingIO(io.BytesIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return super().write(data)
+
+
+def records(data: bytes) -> list:
+    return list(struct.iter_unpack("<db", data))
+
+
+class SinksTestCase(unittest.TestCase):
+    def test_raw(self):
+        """Test that records are a float64 and a status byte, scalars only.
+        """
+        f = io.BytesIO()
+        with RawSink(f) as sink:
+            for code, value in RESULTS:
+                sink.write(code, value)
+        rows = records(f.getvalue())
+        self.assertEqual(len(f.getvalue()), 9 * len(RESULTS))
+        self.assertEqual([c for _, c in rows], [0, -1, 1, 0, 0, 1, 4])
+        self.assertEqual([v for v, _ in rows][:2], [1.5, 2.0])
+        self.assertEqual(math.copysign(1.0, rows[4][0]), -1.0)
+        self.assertTrue(math.isnan(rows[2][0]) and math.isnan(rows[5][0]))
+
+    def test_buffered(self):
+        """Test that records reach the file in blocks.
+        """
+        f = CountingIO()
+        sink = RawSink(f, block_size = 9 * 100)
+        for i in range(1000):
+            sink.write(0, float(i))
+        sink.close()
+        self.assertEqual(f.writes, 10)
+        self.assertEqual([v for v, _ in records(f.getvalue())], [float(i) for i in range(1000)])
+
+    def test_write_many(self):
+        codes, values = [0, 1, -1] * 50, [1.0, 7.0, 3.0] * 50
+        one, many = io.BytesIO(), io.BytesIO()
+        with RawSink(one) as sink:
+            for c, v in zip(codes, values):
+                sink.write(c, v)
+        with RawSink(many, block_size = 9 * 16) as sink:
+            sink.write_many(codes, values)
+        self.assertEqual(one.getvalue().hex(), many.getvalue().hex())
+
+    def test_npy(self):
+        f = io.BytesIO()
+        with NpySink(f) as sink:
+            for code, value in RESULTS:
+                sink.write(code, value)
+        data = f.getvalue()
+        self.assertEqual(data[:6], b"\x93NUMPY")
+        header_size = struct.unpack_from("<H", data, 8)[0]
+        header = ast.literal_eval(data[10:10 + header_size].decode("latin1"))
+        self.assertEqual(header["shape"], (len(RESULTS),))
+        self.assertEqual((10 + header_size) % 64, 0)
+        self.assertEqual(records(data[10 + header_size:])[0], (1.5, 0))
+        if _vector.np is not None:
+            array = _vector.np.load(io.BytesIO(data))
+            self.assertEqual(list(array["status"]), [0, -1, 1, 0, 0, 1, 4])
+            self.assertEqual(array["value"][0], 1.5)
+
+    def test_ndjson(self):
+        f = io.StringIO()
+        with open_sink("ndjson", f) as sink:
+            for code, value in RESULTS:
+                sink.write(code, value, "Failed." if code == 1 else "")
+        lines = [json.loads(line) for line in f.getvalue().splitlines()]
+        self.assertEqual(lines[0], {"code": 0, "value": 1.5})
+        self.assertEqual(lines[2], {"code": 1, "value": None, "msg": "Failed."})
+        self.assertEqual(lines[3]["value"], "Infinity")
+        self.assertEqual(lines[5]["value"], [1.0, 2.0])
+        self.assertEqual(lines[6], {"code": 4, "value": None})
+
+    @unittest.skipIf(_vector.np is None, "NumPy is not installed.")
+    def test_numpy_values(self):
+        """Test that NumPy scalars and arrays are written as floats and lists.
+        """
+        np = _vector.np
+        results = [(0, np.float64(11.0)), (0, np.array([1.0, 2.0])), (0, np.array([[1.0], [2.0]]))]
+        raw, text = io.BytesIO(), io.StringIO()
+        with RawSink(raw) as sink:
+            for code, value in results:
+                sink.write(code, value)
+        self.assertEqual([c for _, c in records(raw.getvalue())], [0, 1, 1])
+        self.assertEqual(records(raw.getvalue())[0], (11.0, 0))
+        with NdjsonSink(text) as sink:
+            for code, value in results:
+                sink.write(code, value)
+        lines = [json.loads(line) for line in text.getvalue().splitlines()]
+        self.assertEqual([line["value"] for line in lines], [11.0, [1.0, 2.0], [[1.0], [2.0]]])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            open_sink("xml", io.BytesIO())
+
+    def test_evaluate_csv(self):
+        """Test that batch mode writes a record per row, with its code.
+        """
+        f = io.BytesIO()
+        with RawSink(f) as sink:
+            n, _ = evaluate_csv(Rpn().compile("a b /"), io.StringIO("a,b\n1,2\n3,x\n5,0\n"), None, 2, sink = sink)
+        self.assertEqual(n, 3)
+        rows = records(f.getvalue())
+        self.assertEqual([rows[0], rows[2]], [(0.5, 0), (math.inf, 0)])
+
+    def test_stream(self):
+        stdin = io.StringIO("1 2 +\n\n3 (\n1 +\n")
+        with mock.patch.object(sys, "stdin", stdin), redirect_stdout(io.StringIO()) as out, redirect_stderr(io.StringIO()):
+            self.assertEqual(main(["--stream"]), 0)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([line["code"] for line in lines], [0, 1, -1])
+        self.assertEqual(lines[0]["value"], 3.0)
+
+    def test_stream_vectors(self):
+        stdin = io.StringIO("[1,2] 2 *\n[1,2] [3,4] dot\n")
+        with mock.patch.object(sys, "stdin", stdin), redirect_stdout(io.StringIO()) as out, redirect_stderr(io.StringIO()):
+            self.assertEqual(main(["--stream"]), 0)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(lines, [{"code": 0, "value": [2.0, 4.0]}, {"code": 0, "value": 11.0}])
+
+
+if __name__ == "__main__":
+    unittest.main()
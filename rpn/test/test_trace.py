@@ -0,0 +1,76 @@
+import math
+import unittest
+
+from rpn.src._rpn import Rpn
+from rpn.src._trace import RECORD, Tracer, replay
+
+
+class TraceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+        self.rpn.tracer = Tracer(capacity = 16)
+
+    def test_records(self):
+        """Test that each step records token, inputs, output and depth.
+        """
+        self.rpn.evaluate("5 2 - 10 *".split())
+        records = self.rpn.tracer.records()
+        self.assertEqual([r.token for r in records], ["5.0", "2.0", "-", "10.0", "*"])
+        self.assertEqual([r.operator for r in records], [False, False, True, False, True])
+        self.assertEqual(records[2].inputs, (2.0, 5.0))
+        self.assertEqual((records[2].output, records[2].depth), (3.0, 1))
+        self.assertEqual((records[4].inputs, records[4].output), ((10.0, 3.0), 30.0))
+        self.assertEqual([r.step for r in records], list(range(5)))
+
+    def test_failures_and_reductions(self):
+        self.rpn.evaluate("1 2 3 sum foo".split())
+        sum_record, foo_record = self.rpn.tracer.records()[-2:]
+        self.assertEqual((sum_record.consumed, sum_record.inputs, sum_record.output), (3, (3.0, 2.0), 6.0))
+        self.assertEqual((foo_record.token, foo_record.code, foo_record.operator), ("foo", 1, False))
+
+    def test_ring_buffer(self):
+        """Test that only the most recent steps are kept, oldest first.
+        """
+        self.rpn.evaluate(["1"] + ["1", "+"] * 20)
+        records = self.rpn.tracer.records()
+        self.assertEqual(len(records), 16)
+        self.assertEqual([r.step for r in records], list(range(25, 41)))
+        self.assertEqual(records[-1].output, 21.0)
+        self.assertEqual(len(self.rpn.tracer.buffer), 16 * RECORD.size)
+
+    def test_replay(self):
+        """Test that replay reproduces every step, and reports a changed one.
+        """
+        self.rpn.evaluate("2 3 ^ 7 / 1 2 3 sum 4 log".split())
+        self.assertEqual(replay(self.rpn.tracer.records(), self.rpn.registry), [])
+
+        # Corrupt the output of `^`, the third step.
+        step = RECORD.unpack_from(self.rpn.tracer.buffer, 2 * RECORD.size)
+        RECORD.pack_into(self.rpn.tracer.buffer, 2 * RECORD.size, *step[:-1], 9.0)
+        mismatches = replay(self.rpn.tracer.records(), self.rpn.registry)
+        self.assertEqual([(r.token, r.output, value) for r, value in mismatches], [("^", 9.0, 8.0)])
+
+    def test_dump(self):
+        self.rpn.evaluate("1 2 +".split())
+        self.assertEqual(len(self.rpn.tracer.dump()), 3)
+        self.assertEqual(len(self.rpn.tracer.dump(1)), 1)
+        self.assertIn("->", self.rpn.tracer.dump(1)[0])
+        self.rpn.tracer.clear()
+        self.assertEqual(self.rpn.tracer.dump(), [])
+
+    def test_off(self):
+        self.rpn.tracer = None
+        self.assertEqual(self.rpn.evaluate("1 2 +".split()), (0, ""))
+
+    def test_vector_inputs(self):
+        self.rpn.evaluate("[1,2] 2 *".split())
+        record = self.rpn.tracer.records()[-1]
+        self.assertTrue(math.isnan(record.inputs[1]))
+        self.assertEqual(replay([record], self.rpn.registry), [])
+
+    def tearDown(self):
+        del self.rpn
+
+
+if __name__ == "__main__":
+    unittest.main()
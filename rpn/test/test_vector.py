@@ -0,0 +1,108 @@
+import operator
+import unittest
+from array import array
+
+from rpn.src._rpn import Rpn
+from rpn.src._vector import _elementwise, as_operand, is_literal, parse
+
+
+def as_list(obj):
+    """Convert operand from either backend to nested lists of floats.
+    """
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if isinstance(obj, list):
+        return [list(row) for row in obj]
+    return list(obj)
+
+
+class VectorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpn = Rpn()
+
+    def test_is_literal(self):
+        tests = [
+            dict(candidate = "[1,2,3]", expected = True),
+            dict(candidate = "[[1,2],[3,4]]", expected = True),
+            dict(candidate = "[", expected = False),
+            dict(candidate = "1", expected = False),
+        ]
+        for t in tests:
+            with self.subTest():
+                self.assertEqual(is_literal(t["candidate"]), t["expected"])
+
+    def test_parse_invalid(self):
+        with self.assertRaises(ValueError):
+            parse("[1,2")
+
+    def test_elementwise_vectors(self):
+        """Test element-wise operators keep operand order of scalars.
+        """
+        cases = [
+            dict(oper = "+", expected = [11.0, 22.0, 33.0]),
+            dict(oper = "-", expected = [9.0, 18.0, 27.0]),
+            dict(oper = "*", expected = [10.0, 40.0, 90.0]),
+            dict(oper = "/", expected = [10.0, 10.0, 10.0]),
+        ]
+        for case in cases:
+            with self.subTest(oper = case["oper"]):
+                self.rpn.evaluate(["[10,20,30]", "[1,2,3]", case["oper"]])
+                self.assertEqual(as_list(self.rpn.stack.head), case["expected"])
+
+    def test_scalar_broadcast(self):
+        self.rpn.evaluate(["[1,2,3]", "2", "^"])
+        self.assertEqual(as_list(self.rpn.stack.head), [1.0, 4.0, 9.0])
+        self.rpn.evaluate(["10", "[1,2,4]", "/"])
+        self.assertEqual(as_list(self.rpn.stack.head), [10.0, 5.0, 2.5])
+
+    def test_size_mismatch(self):
+        code, _ = self.rpn.evaluate(["[1,2,3]", "[1,2]", "+"])
+        self.assertEqual(code, 1)
+
+    def test_dot(self):
+        self.rpn.evaluate(["[1,2,3]", "[4,5,6]", "dot"])
+        self.assertEqual(self.rpn.result, 32)
+
+    def test_dot_rank(self):
+        for tokens in (["[1,2]", "[[1,2],[3,4]]", "dot"], ["[[1,2],[3,4]]", "[1,2]", "dot"], ["[1,2]", "2", "dot"]):
+            with self.subTest(expr = " ".join(tokens)):
+                self.assertEqual(self.rpn.evaluate(tokens)[0], 1)
+                self.assertEqual(self.rpn.compile(tokens).run()[0], 1)
+
+    def test_matrix_shape_mismatch(self):
+        """Test that matrices with different row counts are rejected, not truncated.
+        """
+        with self.assertRaises(ValueError):
+            _elementwise(operator.add, [array("d", [1, 2]), array("d", [3, 4])], [array("d", [1, 2])])
+        code, _ = self.rpn.evaluate(["[[1,2],[3,4]]", "[[1,2],[3,4],[5,6]]", "+"])
+        self.assertEqual(code, 1)
+
+    def test_matmul(self):
+        self.rpn.evaluate(["[[1,2],[3,4]]", "[[5,6],[7,8]]", "matmul"])
+        self.assertEqual(as_list(self.rpn.stack.head), [[19.0, 22.0], [43.0, 50.0]])
+
+    def test_matmul_vector(self):
+        self.rpn.evaluate(["[[1,2],[3,4]]", "[1,1]", "matmul"])
+        self.assertEqual(as_list(self.rpn.stack.head), [3.0, 7.0])
+
+    def test_matrix_elementwise(self):
+        self.rpn.evaluate(["[[1,2],[3,4]]", "1", "+"])
+        self.assertEqual(as_list(self.rpn.stack.head), [[2.0, 3.0], [4.0, 5.0]])
+
+    def test_push(self):
+        self.rpn.push(range(5))
+        self.rpn.push(as_operand([1.0] * 5))
+        self.rpn.execute_next("+")
+        self.assertEqual(as_list(self.rpn.stack.head), [1.0, 2.0, 3.0, 4.0, 5.0])
+
+    def test_snapshot_rejects_vectors(self):
+        self.rpn.evaluate(["[1,2]"])
+        with self.assertRaises(ValueError):
+            self.rpn.snapshot()
+
+    def tearDown(self):
+        del self.rpn
+
+
+if __name__ == "__main__":
+    unittest.main()
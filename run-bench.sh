@@ -0,0 +1,18 @@
+#!/bin/sh
+
+# Run every benchmark, or one with its own arguments, e.g.:
+#   ./run-bench.sh approx --help
+# Use another interpreter with e.g.: PYTHON=python3.13t ./run-bench.sh
+PYTHON="${PYTHON:-python3}"
+
+if [ $# -gt 0 ]; then
+    name="$1"
+    shift
+    exec "$PYTHON" -m "rpn.bench.bench_$name" "$@"
+fi
+
+for bench in ./rpn/bench/bench_*.py; do
+    module=$(echo "$bench" | sed -e 's|^\./||' -e 's|\.py$||' -e 's|/|.|g')
+    echo "== $module"
+    "$PYTHON" -m "$module"
+done